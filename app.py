@@ -11,8 +11,6 @@ from flask_login import LoginManager, UserMixin
 from flask_wtf.csrf import CSRFProtect
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from pymongo import MongoClient
-from pymongo.errors import ServerSelectionTimeoutError
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -39,6 +37,12 @@ def create_app():
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     app.config['MONGODB_URI'] = os.getenv('MONGODB_URI')
     app.config['MONGODB_DB_NAME'] = os.getenv('MONGODB_DB_NAME', 'ecoreborn')
+    app.config['MONGODB_PROBE_INTERVAL'] = int(os.getenv('MONGODB_PROBE_INTERVAL', 30))
+    # Include MongoDB pool/error details and cache counters in /healthz (keep off on public hosts)
+    app.config['HEALTHZ_DETAILS'] = os.getenv('HEALTHZ_DETAILS', 'False').lower() == 'true'
+    # Connection pool, timeouts, compression and read preference
+    from database import mongo_settings_from_env
+    app.config.update(mongo_settings_from_env())
     
     # Email configuration
     app.config['SMTP_HOST'] = os.getenv('SMTP_HOST')
@@ -47,10 +51,43 @@ def create_app():
     app.config['SMTP_PASS'] = os.getenv('SMTP_PASS')
     app.config['SMTP_FROM'] = os.getenv('SMTP_FROM', 'noreply@ecoreborn.example')
     app.config['ADMIN_EMAIL'] = os.getenv('ADMIN_EMAIL', 'admin@ecoreborn.example')
+    app.config['SMTP_TIMEOUT'] = int(os.getenv('SMTP_TIMEOUT', 10))
+    app.config['SMTP_POOL_SIZE'] = int(os.getenv('SMTP_POOL_SIZE', 2))
+    
+    # Background mail queue
+    app.config['MAIL_ASYNC'] = os.getenv('MAIL_ASYNC', 'True').lower() == 'true'
+    app.config['MAIL_QUEUE_SIZE'] = int(os.getenv('MAIL_QUEUE_SIZE', 100))
+    app.config['MAIL_WORKERS'] = int(os.getenv('MAIL_WORKERS', 2))
+    app.config['MAIL_MAX_RETRIES'] = int(os.getenv('MAIL_MAX_RETRIES', 3))
+    app.config['MAIL_RETRY_BACKOFF'] = float(os.getenv('MAIL_RETRY_BACKOFF', 1.0))
+    
+    # Disposable email domain blocklist
+    app.config['DISPOSABLE_DOMAINS_FILE'] = os.getenv(
+        'DISPOSABLE_DOMAINS_FILE', os.path.join(app.root_path, 'data', 'disposable_domains.txt')
+    )
+    app.config['DISPOSABLE_DOMAINS_RELOAD_INTERVAL'] = int(os.getenv('DISPOSABLE_DOMAINS_RELOAD_INTERVAL', 30))
+    
+    # Services catalog (reloaded when the file changes)
+    app.config['SERVICES_FILE'] = os.getenv(
+        'SERVICES_FILE', os.path.join(app.root_path, 'data', 'services.json')
+    )
+    app.config['SERVICES_RELOAD_INTERVAL'] = int(os.getenv('SERVICES_RELOAD_INTERVAL', 30))
+    
+    # Email domain (MX) lookup cache
+    app.config['MX_CACHE_SIZE'] = int(os.getenv('MX_CACHE_SIZE', 4096))
+    app.config['MX_LOOKUP_TIMEOUT'] = float(os.getenv('MX_LOOKUP_TIMEOUT', 2.0))
+    app.config['MX_CACHE_MAX_TTL'] = int(os.getenv('MX_CACHE_MAX_TTL', 86400))
+    app.config['MX_NEGATIVE_TTL'] = int(os.getenv('MX_NEGATIVE_TTL', 300))
     
     # Upload configuration
     app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', './uploads')
     app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_FILE_SIZE', 2097152))  # 2MB default
+    # Per-file limit, enforced while the upload streams to disk
+    app.config['UPLOAD_MAX_SIZE'] = int(os.getenv('UPLOAD_MAX_SIZE', app.config['MAX_CONTENT_LENGTH']))
+    # Background thumbnails for image attachments (0 workers disables)
+    app.config['IMAGE_WORKERS'] = int(os.getenv('IMAGE_WORKERS', 2))
+    app.config['IMAGE_QUEUE_SIZE'] = int(os.getenv('IMAGE_QUEUE_SIZE', 32))
+    app.config['THUMBNAIL_MAX_SIZE'] = int(os.getenv('THUMBNAIL_MAX_SIZE', 320))
     
     # Session configuration
     app.config['SESSION_COOKIE_SECURE'] = os.getenv('SESSION_COOKIE_SECURE', 'False').lower() == 'true'
@@ -58,6 +95,56 @@ def create_app():
     app.config['SESSION_COOKIE_SAMESITE'] = os.getenv('SESSION_COOKIE_SAMESITE', 'Lax')
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(seconds=int(os.getenv('PERMANENT_SESSION_LIFETIME', 3600)))
     
+    # Password hashing pool (bcrypt runs off the request thread, capped)
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.getenv('PASSWORD_HASH_QUEUE', 16))
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5.0))
+    app.config['BCRYPT_ROUNDS'] = int(os.getenv('BCRYPT_ROUNDS', 12))
+    
+    # Cache of logged-in user identities (used by the user loader)
+    app.config['USER_CACHE_TTL'] = int(os.getenv('USER_CACHE_TTL', 60))
+    app.config['USER_CACHE_SIZE'] = int(os.getenv('USER_CACHE_SIZE', 1024))
+    
+    # Rate limiting / login lockout
+    app.config['RATELIMIT_STORAGE_URL'] = os.getenv('RATELIMIT_STORAGE_URL', 'memory://')
+    app.config['LOCKOUT_CACHE_SIZE'] = int(os.getenv('LOCKOUT_CACHE_SIZE', 10000))
+    app.config['LOCKOUT_SHARED'] = os.getenv('LOCKOUT_SHARED', 'False').lower() == 'true'
+    
+    # Full-page cache for anonymous GETs of public pages
+    app.config['PAGE_CACHE_ENABLED'] = os.getenv('PAGE_CACHE_ENABLED', 'True').lower() == 'true'
+    app.config['PAGE_CACHE_TTL'] = int(os.getenv('PAGE_CACHE_TTL', 300))
+    app.config['PAGE_CACHE_SIZE'] = int(os.getenv('PAGE_CACHE_SIZE', 256))
+    
+    # Rendered layout fragments ({% cache %} in base.html); TTL 0 disables
+    app.config['FRAGMENT_CACHE_TTL'] = int(os.getenv('FRAGMENT_CACHE_TTL', 3600))
+    app.config['FRAGMENT_CACHE_SIZE'] = int(os.getenv('FRAGMENT_CACHE_SIZE', 256))
+    
+    # Compiled template cache shared by workers; warm-up precompiles at startup
+    app.config['TEMPLATE_CACHE_DIR'] = os.getenv(
+        'TEMPLATE_CACHE_DIR', os.path.join(app.instance_path, 'jinja_cache')
+    )
+    app.config['TEMPLATE_WARMUP'] = os.getenv('TEMPLATE_WARMUP', 'False').lower() == 'true'
+    
+    # Sitemap: URLs per file before sharding, seconds URL sources are cached
+    app.config['SITEMAP_MAX_URLS'] = int(os.getenv('SITEMAP_MAX_URLS', 50000))
+    app.config['SITEMAP_CACHE_TTL'] = int(os.getenv('SITEMAP_CACHE_TTL', 300))
+    
+    # Inline above-the-fold CSS and load main.css at the end of <body>
+    app.config['CRITICAL_CSS_ENABLED'] = os.getenv('CRITICAL_CSS_ENABLED', 'True').lower() == 'true'
+    app.config['CRITICAL_CSS_RELOAD_INTERVAL'] = int(os.getenv('CRITICAL_CSS_RELOAD_INTERVAL', 30))
+    
+    # gzip/brotli response compression
+    app.config['COMPRESSION_ENABLED'] = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    app.config['COMPRESSION_MIN_SIZE'] = int(os.getenv('COMPRESSION_MIN_SIZE', 500))
+    app.config['COMPRESSION_LEVEL'] = int(os.getenv('COMPRESSION_LEVEL', 6))
+    app.config['COMPRESSION_BROTLI_QUALITY'] = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+    # Comma-separated content types; empty uses compression.DEFAULT_MIMETYPES
+    app.config['COMPRESSION_MIMETYPES'] = [
+        m.strip() for m in os.getenv('COMPRESSION_MIMETYPES', '').split(',') if m.strip()
+    ]
+    app.config['COMPRESSION_CACHE_SIZE'] = int(os.getenv('COMPRESSION_CACHE_SIZE', 128))
+    app.config['COMPRESSION_CACHE_TTL'] = int(os.getenv('COMPRESSION_CACHE_TTL', 300))
+    
     # Application URL
     app.config['APP_URL'] = os.getenv('APP_URL', 'http://localhost:5000')
     
@@ -74,23 +161,70 @@ def create_app():
         ]
     )
     
-    # Initialize MongoDB
-    try:
-        mongo_client = MongoClient(
-            app.config['MONGODB_URI'],
-            serverSelectionTimeoutMS=5000
-        )
-        # Test connection
-        mongo_client.server_info()
-        app.db = mongo_client[app.config['MONGODB_DB_NAME']]
-        app.logger.info('MongoDB connection established')
-    except ServerSelectionTimeoutError as e:
-        app.logger.error(f'Failed to connect to MongoDB: {e}')
-        raise Exception('Cannot connect to MongoDB. Please check your connection string.')
+    # Initialize MongoDB lazily: the client connects on first use in each
+    # process and a background probe reports readiness on /healthz
+    from database import MongoConnection, LazyDatabase, client_options
+    mongo = MongoConnection(
+        app.config['MONGODB_URI'],
+        app.config['MONGODB_DB_NAME'],
+        probe_interval=app.config['MONGODB_PROBE_INTERVAL'],
+        **client_options(app.config)
+    )
+    app.extensions['mongo'] = mongo
+    app.db = LazyDatabase(mongo)
+    
+    @app.before_request
+    def start_mongo_probe():
+        """Start the readiness probe in this worker on its first request."""
+        mongo.start_probe()
+    
+    # Configure disposable domain blocklist
+    from blocklist import disposable_domains
+    disposable_domains.configure(
+        path=app.config['DISPOSABLE_DOMAINS_FILE'],
+        check_interval=app.config['DISPOSABLE_DOMAINS_RELOAD_INTERVAL']
+    )
+    
+    # Configure services catalog
+    from catalog import service_catalog
+    service_catalog.configure(
+        path=app.config['SERVICES_FILE'],
+        check_interval=app.config['SERVICES_RELOAD_INTERVAL']
+    )
+    
+    # Size the shared password hashing pool
+    from passwords import password_hasher
+    password_hasher.configure(
+        max_workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_QUEUE'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+        rounds=app.config['BCRYPT_ROUNDS']
+    )
+    
+    # Configure shared MX resolver
+    from mx_cache import mx_resolver
+    mx_resolver.configure(
+        max_entries=app.config['MX_CACHE_SIZE'],
+        timeout=app.config['MX_LOOKUP_TIMEOUT'],
+        max_ttl=app.config['MX_CACHE_MAX_TTL'],
+        negative_ttl=app.config['MX_NEGATIVE_TTL']
+    )
     
     # Initialize extensions
     csrf = CSRFProtect(app)
     
+    # Start background mail queue (no-op when SMTP is not configured)
+    from mailer import init_mailer
+    init_mailer(app)
+    
+    # Stream uploaded files to UPLOAD_FOLDER while the request body is parsed
+    from uploads import init_uploads
+    init_uploads(app)
+    
+    # Thumbnail image attachments on a worker pool
+    from thumbnails import init_images
+    init_images(app)
+    
     # Initialize Flask-Login
     login_manager = LoginManager()
     login_manager.init_app(app)
@@ -98,11 +232,17 @@ def create_app():
     login_manager.login_message = 'Please login to access this page.'
     login_manager.login_message_category = 'info'
     
+    from models import user_identity_cache
+    user_identity_cache.configure(
+        max_entries=app.config['USER_CACHE_SIZE'],
+        ttl=app.config['USER_CACHE_TTL']
+    )
+    
     @login_manager.user_loader
     def load_user(user_id):
         """Load user for Flask-Login."""
         from models import User
-        user = User.find_by_id(app.db, user_id)
+        user = User.find_identity(app.db, user_id)
         if user:
             return UserLogin(str(user['_id']), user['email'], user['name'])
         return None
@@ -112,18 +252,68 @@ def create_app():
         app=app,
         key_func=get_remote_address,
         default_limits=["200 per day", "50 per hour"],
-        storage_uri=os.getenv('RATELIMIT_STORAGE_URL', 'memory://')
+        storage_uri=app.config['RATELIMIT_STORAGE_URL']
     )
     
+    # Locked-out login emails (shares the limiter's storage when LOCKOUT_SHARED)
+    from lockout import init_lockout_cache
+    init_lockout_cache(app)
+    
     # Apply rate limiting to auth routes
     from auth import auth_bp
     limiter.limit("10 per hour")(auth_bp)
     
     # Register blueprints
-    from routes import main_bp
+    from routes import main_bp, healthz
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp)
     
+    # Health checks must never be rate limited
+    limiter.exempt(healthz)
+    
+    # Hashed, precompressed CSS built by `python assets.py`
+    from assets import init_assets
+    init_assets(app)
+    
+    # Template url_for: precomputed paths for argument-free routes
+    from url_table import init_url_table
+    init_url_table(app)
+    
+    if app.config['CRITICAL_CSS_ENABLED']:
+        from critical_css import CriticalCSS
+        CriticalCSS(
+            app,
+            stylesheet='css/main.css',
+            check_interval=app.config['CRITICAL_CSS_RELOAD_INTERVAL']
+        )
+    
+    # Compress HTML/XML/text responses (wraps app.wsgi_app)
+    if app.config['COMPRESSION_ENABLED']:
+        from compression import init_compression
+        init_compression(app)
+    
+    # sitemap.xml built from @sitemap_entry routes (and registered sources)
+    from sitemap import Sitemap
+    Sitemap(app, max_urls=app.config['SITEMAP_MAX_URLS'], ttl=app.config['SITEMAP_CACHE_TTL'])
+    
+    # ETag/Last-Modified and 304 responses for public pages
+    # (registered before the page cache so it also covers cache hits)
+    from conditional import ConditionalGet
+    ConditionalGet(app, blueprints=('main',))
+    
+    # Serve anonymous public pages from memory
+    if app.config['PAGE_CACHE_ENABLED']:
+        from page_cache import PageCache
+        PageCache(app, max_entries=app.config['PAGE_CACHE_SIZE'], ttl=app.config['PAGE_CACHE_TTL'])
+    
+    # {% cache %} tag for layout fragments
+    from fragment_cache import FragmentCacheExtension, fragment_cache
+    fragment_cache.configure(
+        max_entries=app.config['FRAGMENT_CACHE_SIZE'],
+        ttl=app.config['FRAGMENT_CACHE_TTL']
+    )
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    
     # Jinja2 filters
     @app.template_filter('datetime')
     def format_datetime_filter(value, format='%B %d, %Y'):
@@ -144,18 +334,36 @@ def create_app():
     
     @app.context_processor
     def inject_forms():
-        """Inject newsletter form into all templates."""
-        from forms import NewsletterForm
-        return {'footer_newsletter_form': NewsletterForm()}
+        """Inject the footer newsletter form into all templates."""
+        from forms import footer_newsletter_form
+        return {'footer_newsletter_form': footer_newsletter_form}
+    
+    # Bytecode cache (and optional warm-up, once all filters are registered)
+    from template_cache import init_template_cache, warm_templates
+    init_template_cache(app)
+    if app.config['TEMPLATE_WARMUP']:
+        warm_templates(app)
     
     return app
 
 
-# Create app instance
-app = create_app()
+def __getattr__(name):
+    """
+    Create the module-level ``app`` on first access (``gunicorn app:app``).
+    
+    Importing this module no longer builds an app, so tests, the Flask CLI
+    (which finds ``create_app``) and forked workers start instantly.
+    """
+    global app
+    if name == 'app':
+        app = create_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 if __name__ == '__main__':
+    app = create_app()
+    
     # Run the application
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_ENV') == 'development'
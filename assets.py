@@ -0,0 +1,176 @@
+"""
+Fingerprinted, precompressed static assets.
+
+``python assets.py`` minifies the stylesheets, writes content-hashed
+copies to ``static/dist/`` with ``.gz`` (and ``.br`` when the optional
+``brotli`` package is installed) siblings, and records the mapping in
+``static/dist/manifest.json``. At runtime ``url_for('static', ...)``
+resolves to the hashed file, which is served precompressed according to
+``Accept-Encoding`` with a far-future immutable ``Cache-Control``.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+ASSETS = ['css/main.css', 'css/print.css']
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_MAX_AGE = 31536000
+
+# Strings and comments are matched first so their contents are never rewritten
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)', re.S)
+
+
+def minify_css(css):
+    """
+    Strip comments and redundant whitespace from a stylesheet.
+
+    Quoted strings are left untouched. Spaces around ``+``/``-`` are kept
+    because ``calc()`` needs them.
+    """
+    out = []
+    pos = 0
+    for match in _CSS_TOKENS.finditer(css):
+        out.append(_minify_code(css[pos:match.start()]))
+        if match.group(1):
+            out.append(match.group(1))
+        pos = match.end()
+    out.append(_minify_code(css[pos:]))
+    return ''.join(out).replace(';}', '}').strip()
+
+
+def _minify_code(code):
+    code = re.sub(r'\s+', ' ', code)
+    code = re.sub(r' ?([{};,>]) ?', r'\1', code)
+    return re.sub(r': ', ':', code)
+
+
+def build_assets(static_folder, assets=ASSETS):
+    """
+    Minify, fingerprint and precompress static assets.
+
+    Args:
+        static_folder: Path to the app's static folder
+        assets: Asset paths relative to the static folder
+
+    Returns:
+        Manifest dict mapping original to hashed paths
+    """
+    manifest = {}
+    for asset in assets:
+        with open(os.path.join(static_folder, asset), encoding='utf-8') as f:
+            source = f.read()
+
+        if asset.endswith('.css'):
+            source = minify_css(source)
+        data = source.encode('utf-8')
+
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        name, ext = os.path.splitext(asset)
+        hashed = f'{DIST_DIR}/{name}.{digest}{ext}'
+        path = os.path.join(static_folder, hashed)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, 'wb') as f:
+            f.write(data)
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+
+        manifest[asset] = hashed
+
+    with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    """Load the asset manifest, or an empty one if assets were not built."""
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_assets(app):
+    """
+    Resolve ``url_for('static', ...)`` to built assets and serve them precompressed.
+
+    Does nothing if ``python assets.py`` has not been run.
+    """
+    manifest = load_manifest(app.static_folder)
+    app.extensions['asset_manifest'] = manifest
+    if not manifest:
+        return
+
+    hashed_files = set(manifest.values())
+
+    def asset_url_for(endpoint, **values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+        return url_for(endpoint, **values)
+
+    app.jinja_env.globals['url_for'] = asset_url_for
+
+    static_view = app.view_functions['static']
+
+    def static_with_precompressed(filename):
+        if filename not in hashed_files:
+            return static_view(filename=filename)
+
+        encoding = _pick_encoding(app.static_folder, filename)
+        if encoding:
+            response = send_from_directory(
+                app.static_folder, f'{filename}.{encoding[1]}',
+                mimetype=mimetypes.guess_type(filename)[0],
+                download_name=os.path.basename(filename)
+            )
+            response.headers['Content-Encoding'] = encoding[0]
+        else:
+            response = send_from_directory(app.static_folder, filename)
+
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static_with_precompressed
+
+
+def _pick_encoding(static_folder, filename):
+    """Return (content-encoding, file suffix) for the best precompressed sibling."""
+    accepted = request.accept_encodings
+    for encoding, suffix in (('br', 'br'), ('gzip', 'gz')):
+        if accepted[encoding] and os.path.exists(os.path.join(static_folder, f'{filename}.{suffix}')):
+            return encoding, suffix
+    return None
+
+
+if __name__ == '__main__':
+    static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    built = build_assets(static_dir, sys.argv[1:] or ASSETS)
+    for original, hashed in built.items():
+        size = os.path.getsize(os.path.join(static_dir, original))
+        minified = os.path.getsize(os.path.join(static_dir, hashed))
+        gzipped = os.path.getsize(os.path.join(static_dir, hashed + '.gz'))
+        print(f'{original} -> {hashed} ({size} -> {minified} bytes, {gzipped} gzipped)')
+    if brotli is None:
+        print('brotli not installed: skipped .br files (pip install brotli)')
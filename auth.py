@@ -8,7 +8,10 @@ from datetime import datetime, timedelta
 from bson import ObjectId
 
 from models import User, PasswordResetToken, LoginAttempt
+from passwords import PasswordHasherBusy
+from lockout import lockout_cache
 from forms import SignupForm, LoginForm, ForgotPasswordForm, ResetPasswordForm
+from sitemap import sitemap_entry
 from utils import (
     send_email, generate_reset_token, get_client_ip,
     create_password_reset_email
@@ -18,7 +21,15 @@ from utils import (
 auth_bp = Blueprint('auth', __name__)
 
 
+def _minutes_until(unlock_at):
+    """Format the wait until a lockout ends, e.g. '3 minutes' (rounded up)."""
+    seconds = (unlock_at - datetime.utcnow()).total_seconds()
+    minutes = max(1, -(-int(seconds) // 60))
+    return f'{minutes} minute' if minutes == 1 else f'{minutes} minutes'
+
+
 @auth_bp.route('/signup', methods=['GET', 'POST'])
+@sitemap_entry(priority='0.5', changefreq='monthly')
 def signup():
     """User registration page with enhanced validation."""
     if current_user.is_authenticated:
@@ -58,6 +69,7 @@ def signup():
 
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@sitemap_entry(priority='0.5', changefreq='monthly')
 def login():
     """User login page with enhanced error messages."""
     if current_user.is_authenticated:
@@ -70,10 +82,20 @@ def login():
         email = form.email.data.lower()  # Normalize email to lowercase
         password = form.password.data
         
-        # Check for too many failed attempts
-        failed_attempts = LoginAttempt.get_recent_failed_attempts(db, email, minutes=15)
-        if failed_attempts >= 5:
-            flash('🔒 Account temporarily locked due to too many failed login attempts. Please wait 15 minutes or <a href="{}">reset your password</a>.'.format(url_for('auth.forgot_password')), 'error')
+        # Known-locked accounts are rejected without touching MongoDB.
+        # Otherwise check the lockout and record this attempt in one round
+        # trip; the attempt counts as a failure until the password checks out.
+        unlock_at = lockout_cache.get_unlock_time(email)
+        locked = unlock_at is not None
+        if not locked:
+            attempt = LoginAttempt.register_attempt(db, email, get_client_ip(request))
+            unlock_at = attempt['unlock_at']
+            if unlock_at:
+                lockout_cache.lock(email, unlock_at)
+            locked = attempt['locked']
+        
+        if locked:
+            flash('🔒 Account temporarily locked due to too many failed login attempts. Please wait {} or <a href="{}">reset your password</a>.'.format(_minutes_until(unlock_at), url_for('auth.forgot_password')), 'error')
             return render_template('login.html', form=form, title='Login')
         
         # Find user
@@ -83,8 +105,18 @@ def login():
             # User exists, check password
             if User.verify_password(user['password_hash'], password):
                 # Successful login
-                LoginAttempt.record_attempt(db, email, True, get_client_ip(request))
                 LoginAttempt.clear_attempts(db, email)
+                if attempt['unlock_at']:
+                    # This attempt reached the limit but the password was right
+                    lockout_cache.unlock(email)
+                
+                # Move the stored hash to the configured bcrypt cost. Optional:
+                # a busy hashing pool must not turn a valid login into a 503.
+                try:
+                    if User.rehash_password_if_needed(db, user, password):
+                        current_app.logger.info(f'Rehashed password for {email} at the configured cost')
+                except PasswordHasherBusy as e:
+                    current_app.logger.warning(f'Skipped password rehash for {email}: {e}')
                 
                 # Update last login
                 User.update_last_login(db, email)
@@ -104,16 +136,14 @@ def login():
                     return redirect(next_page)
                 return redirect(url_for('main.dashboard'))
             else:
-                # Wrong password
-                LoginAttempt.record_attempt(db, email, False, get_client_ip(request))
-                remaining_attempts = 5 - (failed_attempts + 1)
+                # Wrong password (already recorded above)
+                remaining_attempts = LoginAttempt.MAX_FAILURES - attempt['failures']
                 if remaining_attempts > 0:
                     flash(f'❌ Incorrect password. You have {remaining_attempts} attempt(s) remaining. <a href="{url_for("auth.forgot_password")}">Forgot password?</a>', 'error')
                 else:
-                    flash('🔒 Too many failed attempts. Account locked for 15 minutes.', 'error')
+                    flash(f'🔒 Too many failed attempts. Account locked for {_minutes_until(unlock_at)}.', 'error')
         else:
-            # User doesn't exist - don't reveal this for security, but record attempt
-            LoginAttempt.record_attempt(db, email, False, get_client_ip(request))
+            # User doesn't exist - don't reveal this for security (attempt already recorded)
             flash('❌ Invalid email or password. Please check your credentials and try again. <a href="{}">Need an account?</a>'.format(url_for('auth.signup')), 'error')
     elif form.errors:
         # Display form validation errors
@@ -195,6 +225,12 @@ def reset_password(token):
         # Mark token as used
         PasswordResetToken.mark_as_used(db, token)
         
+        # A new password ends any lockout from earlier failed attempts
+        user = User.find_by_id(db, token_doc['user_id'])
+        if user:
+            LoginAttempt.clear_attempts(db, user['email'])
+            lockout_cache.unlock(user['email'])
+        
         flash('Your password has been reset successfully. Please login.', 'success')
         return redirect(url_for('auth.login'))
     
@@ -0,0 +1,72 @@
+"""
+Benchmark password verification throughput at different bcrypt cost factors.
+
+Reports logins/sec through the shared hashing pool so the work factor can
+be tuned against the CPU available to each worker.
+
+Usage:
+    python benchmarks/bench_bcrypt.py --rounds 10 11 12 --workers 2 --duration 5
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import PasswordHasher, PasswordHasherBusy
+
+
+def bench_rounds(hasher, rounds, duration, clients):
+    """Verify the same password from several client threads for `duration` seconds."""
+    stored_hash = hasher.hash('Bench123!@#', rounds=rounds)
+    done = 0
+    rejected = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        nonlocal done, rejected
+        while time.perf_counter() < deadline:
+            try:
+                hasher.verify('Bench123!@#', stored_hash)
+                with lock:
+                    done += 1
+            except PasswordHasherBusy:
+                with lock:
+                    rejected += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return done / elapsed, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, nargs='+', default=[10, 11, 12, 13])
+    parser.add_argument('--workers', type=int, default=2, help='hashing pool size')
+    parser.add_argument('--queue', type=int, default=16, help='hashing pool queue depth')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent login threads')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per cost factor')
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(max_workers=args.workers, max_pending=args.queue, timeout=60)
+
+    print(f'workers={args.workers} queue={args.queue} clients={args.clients}')
+    print(f'{"rounds":>6} {"ms/login":>10} {"logins/sec":>12} {"rejected":>10}')
+    for rounds in args.rounds:
+        rate, rejected = bench_rounds(hasher, rounds, args.duration, args.clients)
+        ms = 1000 * args.workers / rate if rate else float('inf')
+        print(f'{rounds:>6} {ms:>10.1f} {rate:>12.1f} {rejected:>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare render-blocking CSS bytes with and without critical-CSS inlining.
+
+"Before" is the full main.css that every page blocks on. "After" is the
+critical CSS inlined into the page head; the rest of the stylesheet loads
+at the end of <body>. Also reports cold extraction time and cached lookups.
+
+Usage:
+    python benchmarks/bench_critical_css.py --templates home.html services.html
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask
+
+from assets import minify_css
+from critical_css import CriticalCSS
+
+
+def gzipped_size(text):
+    return len(gzip.compress(text.encode('utf-8'), compresslevel=9))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--templates', nargs='+', default=[
+        'home.html', 'services.html', 'contact.html', 'login.html', 'signup.html'
+    ])
+    parser.add_argument('--lookups', type=int, default=10000, help='cached lookups to time')
+    args = parser.parse_args()
+
+    app = Flask(__name__, root_path=ROOT)
+    critical = CriticalCSS(app, stylesheet='css/main.css')
+
+    with open(os.path.join(app.static_folder, 'css', 'main.css'), encoding='utf-8') as f:
+        full = f.read()
+    minified = minify_css(full)
+    print(f'main.css: {len(full)} bytes ({gzipped_size(full)} gzipped), '
+          f'minified {len(minified)} bytes ({gzipped_size(minified)} gzipped)')
+
+    print(f'{"template":<16} {"before":>9} {"before.gz":>10} {"after":>8} {"after.gz":>9} {"saved":>7} {"cold ms":>8}')
+    for name in args.templates:
+        start = time.perf_counter()
+        css = critical.for_template(name)
+        cold = (time.perf_counter() - start) * 1000
+        saved = 100 * (1 - len(css) / len(full))
+        print(f'{name:<16} {len(full):>9} {gzipped_size(full):>10} {len(css):>8} '
+              f'{gzipped_size(css):>9} {saved:>6.1f}% {cold:>8.1f}')
+
+    start = time.perf_counter()
+    for _ in range(args.lookups):
+        critical.for_template(args.templates[0])
+    elapsed = time.perf_counter() - start
+    print(f'cached lookup: {elapsed / args.lookups * 1e6:.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Measure the per-upload cost of magic-byte sniffing.
+
+Times ``filetypes.sniff`` on a sample of each allowed type, then saves
+uploads of several sizes through ``UploadStream`` (which captures the
+sniff window while streaming) and compares that with a plain chunked
+write plus SHA-256, the save path without sniffing.
+
+Usage:
+    python benchmarks/bench_upload_sniff.py --sizes 65536 2097152 --runs 50
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filetypes import SNIFF_BYTES, sniff
+from uploads import DEFAULT_CHUNK_SIZE, UploadStream
+
+
+SAMPLES = {
+    'pdf': b'%PDF-1.7\n' + b'\x00' * SNIFF_BYTES,
+    'png': b'\x89PNG\r\n\x1a\n' + b'\x00' * SNIFF_BYTES,
+    'jpg': b'\xff\xd8\xff\xe0' + b'\x00' * SNIFF_BYTES,
+    'gif': b'GIF89a' + b'\x00' * SNIFF_BYTES,
+    'doc': b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + b'\x00' * SNIFF_BYTES,
+    'docx': b'PK\x03\x04' + b'\x00' * 26 + b'[Content_Types].xml' + b'\x00' * SNIFF_BYTES,
+    'txt': (b'Reborn fabrics. Reborn future.\n' * 200),
+}
+
+
+def time_sniff(calls):
+    """Return mean microseconds per sniff() for each sample type."""
+    results = {}
+    for kind, data in SAMPLES.items():
+        head = data[:SNIFF_BYTES]
+        assert sniff(head) == kind, kind
+        start = time.perf_counter()
+        for _ in range(calls):
+            sniff(head)
+        results[kind] = (time.perf_counter() - start) * 1e6 / calls
+    return results
+
+
+def plain_save(directory, chunks):
+    """Chunked write plus SHA-256, without the sniff window."""
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        for chunk in chunks:
+            digest.update(chunk)
+            f.write(chunk)
+    os.unlink(path)
+    return digest.hexdigest()
+
+
+def sniffing_save(directory, chunks):
+    """UploadStream write (captures the head) plus the content check."""
+    upload = UploadStream(directory, filename='upload.txt')
+    for chunk in chunks:
+        upload.write(chunk)
+    matches = upload.content_matches()
+    upload.discard()
+    return matches
+
+
+def time_save(save, directory, chunks, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        save(directory, chunks)
+    return (time.perf_counter() - start) * 1e6 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4096, 65536, 2097152], help='upload sizes in bytes')
+    parser.add_argument('--runs', type=int, default=50, help='saves per size and variant')
+    parser.add_argument('--calls', type=int, default=20000, help='sniff() calls per type')
+    args = parser.parse_args()
+
+    print(f'sniff() on {SNIFF_BYTES}-byte heads')
+    for kind, us in time_sniff(args.calls).items():
+        print(f'  {kind:<5} {us:8.2f} us')
+
+    print(f'\n{"size":>10} {"plain us":>10} {"sniff us":>10} {"overhead":>10}')
+    line = b'Reborn fabrics. Reborn future.\n'
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            data = (line * (size // len(line) + 1))[:size]
+            chunks = [data[i:i + DEFAULT_CHUNK_SIZE] for i in range(0, size, DEFAULT_CHUNK_SIZE)]
+            plain = time_save(plain_save, directory, chunks, args.runs)
+            sniffing = time_save(sniffing_save, directory, chunks, args.runs)
+            print(f'{size:>10} {plain:>10.1f} {sniffing:>10.1f} {sniffing - plain:>+10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Compare template url_for through the precomputed route table with Flask's url_for.
+
+Renders home.html (and times single url_for calls) with the table-backed
+helper and with the original url_for. The fragment cache is disabled by
+default so header and footer links are rendered every time.
+
+Usage:
+    python benchmarks/bench_url_for.py --renders 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def time_renders(app, renders):
+    """Return mean milliseconds to render home.html."""
+    from flask import render_template
+    with app.test_request_context('/'):
+        render_template('home.html', title='Home')
+        start = time.perf_counter()
+        for _ in range(renders):
+            render_template('home.html', title='Home')
+        return (time.perf_counter() - start) * 1000 / renders
+
+
+def time_calls(app, calls):
+    """Return mean microseconds per template url_for('main.services') call."""
+    url_for = app.jinja_env.globals['url_for']
+    with app.test_request_context('/'):
+        start = time.perf_counter()
+        for _ in range(calls):
+            url_for('main.services')
+        return (time.perf_counter() - start) * 1e6 / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--renders', type=int, default=500, help='home.html renders per variant')
+    parser.add_argument('--calls', type=int, default=100000, help='url_for calls per variant')
+    parser.add_argument('--fragment-cache', action='store_true', help='keep the header/footer fragment cache on')
+    args = parser.parse_args()
+
+    if not args.fragment_cache:
+        os.environ['FRAGMENT_CACHE_TTL'] = '0'
+    os.environ.setdefault('PAGE_CACHE_ENABLED', 'False')
+
+    from app import create_app
+
+    app = create_app()
+    table_url_for = app.jinja_env.globals['url_for']
+    print(f'{len(app.extensions["url_table"])} endpoints precomputed')
+    print(f'{"variant":<10} {"us/url_for":>11} {"ms/render":>10}')
+
+    results = {}
+    for variant in ('werkzeug', 'table'):
+        if variant == 'werkzeug':
+            from flask import url_for
+            app.jinja_env.globals['url_for'] = url_for
+        else:
+            app.jinja_env.globals['url_for'] = table_url_for
+        # Templates bind globals when loaded, so start each variant fresh
+        app.jinja_env.cache.clear()
+        results[variant] = (time_calls(app, args.calls), time_renders(app, args.renders))
+        print(f'{variant:<10} {results[variant][0]:>11.2f} {results[variant][1]:>10.3f}')
+
+    saved = results['werkzeug'][1] - results['table'][1]
+    print(f'render saving: {saved:.3f} ms ({100 * saved / results["werkzeug"][1]:.1f}%)')
+
+
+if __name__ == '__main__':
+    main()
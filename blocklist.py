@@ -0,0 +1,103 @@
+"""
+Disposable email domain blocklist.
+
+The list is loaded once from a plain text file into a frozenset. A domain
+is blocked if it or any of its parent domains is listed, so matching costs
+one set lookup per label. The file is re-read when its mtime changes.
+"""
+
+import os
+import threading
+import time
+
+
+DEFAULT_BLOCKLIST_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'disposable_domains.txt'
+)
+
+
+def parse_domains(lines):
+    """Parse blocklist lines into a frozenset of lowercase domains."""
+    domains = set()
+    for line in lines:
+        line = line.split('#', 1)[0].strip().lower().rstrip('.')
+        if line:
+            domains.add(line)
+    return frozenset(domains)
+
+
+class DomainBlocklist:
+    """
+    Suffix-matching domain blocklist backed by a file.
+
+    Args:
+        path: Blocklist file (one domain per line)
+        check_interval: Minimum seconds between mtime checks for hot reload
+    """
+
+    def __init__(self, path=DEFAULT_BLOCKLIST_PATH, check_interval=30):
+        self.path = path
+        self.check_interval = check_interval
+        self._domains = frozenset()
+        self._mtime = None
+        self._next_check = 0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def configure(self, path=None, check_interval=None):
+        """Point the blocklist at a different file or change the reload interval."""
+        if check_interval is not None:
+            self.check_interval = check_interval
+        if path and path != self.path:
+            self.path = path
+            self.reload()
+
+    def reload(self):
+        """Re-read the blocklist file. Keeps the old list if the file is missing."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, encoding='utf-8') as f:
+                domains = parse_domains(f)
+        except OSError:
+            return False
+
+        self._domains = domains
+        self._mtime = mtime
+        return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                return
+            if mtime != self._mtime:
+                self.reload()
+
+    def is_blocked(self, domain):
+        """Check whether a domain or any parent domain is blocklisted."""
+        self._maybe_reload()
+        domains = self._domains
+
+        domain = domain.lower().rstrip('.')
+        while domain:
+            if domain in domains:
+                return True
+            _, _, domain = domain.partition('.')
+        return False
+
+    def __contains__(self, domain):
+        return self.is_blocked(domain)
+
+    def __len__(self):
+        return len(self._domains)
+
+
+# Shared blocklist used by form validators
+disposable_domains = DomainBlocklist()
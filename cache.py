@@ -0,0 +1,81 @@
+"""
+Small thread-safe in-process caches.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    LRU cache whose entries also expire after a time-to-live.
+
+    Args:
+        max_entries: Maximum number of entries before the least recently
+            used one is evicted
+        ttl: Default lifetime of an entry in seconds
+    """
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_entries=None, ttl=None):
+        """Change the size limit or default TTL."""
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if ttl is not None:
+                self.ttl = ttl
+            self._evict()
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """Store a value, optionally with its own TTL."""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            self._evict()
+
+    def delete(self, key):
+        """Remove a key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
+
+    def __len__(self):
+        return len(self._data)
+
+    def _evict(self):
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
@@ -0,0 +1,153 @@
+"""
+Services catalog.
+
+The catalog is loaded once from ``data/services.json`` into an immutable
+index by id (and by display name, which the services form posts). The
+file is re-read when its mtime changes, and each reload bumps
+``version`` so pre-rendered HTML fragments are rebuilt only on change.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from types import MappingProxyType
+
+
+DEFAULT_CATALOG_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'services.json'
+)
+
+Service = namedtuple('Service', ['id', 'name', 'description', 'pricing'])
+
+
+def parse_services(entries):
+    """Parse catalog entries into a tuple of Service records (in display order)."""
+    services = []
+    for entry in entries:
+        services.append(Service(
+            id=entry['id'],
+            name=entry['name'],
+            description=entry.get('description', ''),
+            pricing=entry.get('pricing', '')
+        ))
+    return tuple(services)
+
+
+class ServiceCatalog:
+    """
+    Read-only services index backed by a JSON file.
+
+    Args:
+        path: Catalog file (a JSON list of services)
+        check_interval: Minimum seconds between mtime checks for hot reload
+    """
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH, check_interval=30):
+        self.path = path
+        self.check_interval = check_interval
+        self._services = ()
+        self._by_id = MappingProxyType({})
+        self._by_name = MappingProxyType({})
+        self._mtime = None
+        self._next_check = 0
+        self._fragments = (None, MappingProxyType({}))
+        self._lock = threading.Lock()
+        self.version = 0
+        self.reload()
+
+    def configure(self, path=None, check_interval=None):
+        """Point the catalog at a different file or change the reload interval."""
+        if check_interval is not None:
+            self.check_interval = check_interval
+        if path and path != self.path:
+            self.path = path
+            self.reload()
+
+    def reload(self):
+        """Re-read the catalog file. Keeps the old catalog if the file is missing or invalid."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, encoding='utf-8') as f:
+                services = parse_services(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+        # Swap all indexes at once so readers never see a mix of versions
+        self._services = services
+        self._by_id = MappingProxyType({service.id: service for service in services})
+        self._by_name = MappingProxyType({service.name: service for service in services})
+        self._mtime = mtime
+        self.version += 1
+        return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                return
+            if mtime != self._mtime:
+                self.reload()
+
+    def all(self):
+        """Return every service in display order."""
+        self._maybe_reload()
+        return self._services
+
+    def get(self, service_id):
+        """Return the service with this id, or None."""
+        self._maybe_reload()
+        return self._by_id.get(service_id)
+
+    def resolve(self, value):
+        """Return the service matching an id or display name, or None."""
+        self._maybe_reload()
+        return self._by_id.get(value) or self._by_name.get(value)
+
+    @property
+    def last_modified(self):
+        """When the loaded catalog file was last changed (UTC), or None."""
+        self._maybe_reload()
+        if self._mtime is None:
+            return None
+        return datetime.fromtimestamp(self._mtime, timezone.utc)
+
+    def fragments(self, render):
+        """
+        Return pre-rendered HTML for each service, keyed by id.
+
+        Args:
+            render: Callable taking a Service and returning its HTML
+
+        Returns:
+            Read-only mapping of service id to HTML, rebuilt only when
+            the catalog has been reloaded since the last call
+        """
+        self._maybe_reload()
+        version, fragments = self._fragments
+        if version != self.version:
+            fragments = MappingProxyType({service.id: render(service) for service in self._services})
+            self._fragments = (self.version, fragments)
+        return fragments
+
+    def __contains__(self, value):
+        return self.resolve(value) is not None
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __len__(self):
+        return len(self._services)
+
+
+# Shared catalog used by the services view and form validator
+service_catalog = ServiceCatalog()
@@ -0,0 +1,249 @@
+"""
+WSGI response compression (gzip, and brotli when installed).
+
+Responses are compressed when the client accepts it, the content type is
+on the allowlist, nothing upstream already encoded the body and it is at
+least ``min_size`` bytes. Responses without a Content-Length (generators)
+are compressed chunk by chunk as they stream. Compressed bodies of
+shareable responses are kept in a small cache keyed by a digest of the
+uncompressed body, so a page served byte-for-byte again (sitemap, robots,
+cached pages without a per-session token) is not recompressed.
+"""
+
+import hashlib
+import threading
+import zlib
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+from cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+DEFAULT_MIMETYPES = (
+    'text/html', 'text/plain', 'text/css', 'text/xml', 'application/xml',
+    'application/json', 'application/javascript', 'image/svg+xml'
+)
+
+# Statuses that never carry a body worth compressing
+_NO_BODY_STATUSES = ('1', '204', '206', '304')
+
+
+class _GzipCompressor:
+    def __init__(self, level):
+        # wbits 31 = gzip container
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def sync_flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def sync_flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses from a WSGI application.
+
+    Args:
+        app: WSGI application to wrap
+        min_size: Smallest body (bytes) worth compressing
+        level: gzip compression level (1-9)
+        brotli_quality: brotli quality (0-11) when ``brotli`` is installed
+        mimetypes: Content types that may be compressed
+        cache_size: Compressed bodies kept for repeat hits (0 disables)
+        cache_ttl: Seconds a compressed body is kept
+    """
+
+    def __init__(self, app, min_size=500, level=6, brotli_quality=4,
+                 mimetypes=DEFAULT_MIMETYPES, cache_size=128, cache_ttl=300):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.mimetypes = frozenset(mimetypes)
+        self.cache = TTLCache(max_entries=cache_size, ttl=cache_ttl if cache_size else 0)
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def stats(self):
+        """Return how many responses were compressed and the bytes before and after."""
+        with self._lock:
+            return {
+                'compressed': self.compressed,
+                'cache_hits': self.cache_hits,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+            }
+
+    def __call__(self, environ, start_response):
+        encoding = self._choose_encoding(environ)
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = Headers(headers)
+            captured['exc_info'] = exc_info
+            # Body is written through the iterable, not the legacy write()
+            return self._unsupported_write
+
+        app_iter = self.app(environ, capture)
+        status = captured['status']
+        headers = captured['headers']
+
+        if not self._should_compress(status, headers):
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return app_iter
+
+        headers['Content-Encoding'] = encoding
+        self._add_vary(headers)
+        self._weaken_etag(headers)
+
+        if 'Content-Length' not in headers:
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return self._stream(app_iter, encoding)
+
+        try:
+            body = b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+        compressed = self._compress_body(body, encoding, self._shareable(headers))
+        headers['Content-Length'] = str(len(compressed))
+        start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+        return [compressed]
+
+    def _choose_encoding(self, environ):
+        accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def _should_compress(self, status, headers):
+        if status.startswith(_NO_BODY_STATUSES) or 'Content-Encoding' in headers:
+            return False
+        if 'no-transform' in headers.get('Cache-Control', ''):
+            return False
+        mimetype = headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if mimetype not in self.mimetypes:
+            return False
+        length = headers.get('Content-Length')
+        return length is None or int(length) >= self.min_size
+
+    def _shareable(self, headers):
+        cache_control = headers.get('Cache-Control', '')
+        return 'private' not in cache_control and 'no-store' not in cache_control
+
+    def _compress_body(self, body, encoding, shareable):
+        key = None
+        if shareable:
+            key = (encoding, hashlib.sha1(body).digest())
+            compressed = self.cache.get(key)
+            if compressed is not None:
+                self._count(len(body), len(compressed), hit=True)
+                return compressed
+
+        compressor = self._compressor(encoding)
+        compressed = compressor.compress(body) + compressor.finish()
+        if key is not None:
+            self.cache.set(key, compressed)
+        self._count(len(body), len(compressed))
+        return compressed
+
+    def _stream(self, app_iter, encoding):
+        """Compress a streamed body, flushing after each chunk so output stays incremental."""
+        compressor = self._compressor(encoding)
+        size_in = size_out = 0
+        try:
+            for chunk in app_iter:
+                if not chunk:
+                    continue
+                size_in += len(chunk)
+                data = compressor.compress(chunk) + compressor.sync_flush()
+                if data:
+                    size_out += len(data)
+                    yield data
+            data = compressor.finish()
+            size_out += len(data)
+            yield data
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        self._count(size_in, size_out)
+
+    def _compressor(self, encoding):
+        if encoding == 'br':
+            return _BrotliCompressor(self.brotli_quality)
+        return _GzipCompressor(self.level)
+
+    @staticmethod
+    def _add_vary(headers):
+        vary = headers.get('Vary', '')
+        if 'accept-encoding' not in vary.lower():
+            headers['Vary'] = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+
+    @staticmethod
+    def _weaken_etag(headers):
+        # The encoded body is a different representation; weak ETags still
+        # match If-None-Match, so 304s keep working
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            headers['ETag'] = f'W/{etag}'
+
+    @staticmethod
+    def _unsupported_write(data):
+        raise RuntimeError('CompressionMiddleware does not support start_response().write()')
+
+    def _count(self, size_in, size_out, hit=False):
+        with self._lock:
+            self.compressed += 1
+            self.cache_hits += hit
+            self.bytes_in += size_in
+            self.bytes_out += size_out
+
+
+def init_compression(app):
+    """Wrap ``app.wsgi_app`` with compression configured from ``app.config``."""
+    middleware = CompressionMiddleware(
+        app.wsgi_app,
+        min_size=app.config['COMPRESSION_MIN_SIZE'],
+        level=app.config['COMPRESSION_LEVEL'],
+        brotli_quality=app.config['COMPRESSION_BROTLI_QUALITY'],
+        mimetypes=app.config['COMPRESSION_MIMETYPES'] or DEFAULT_MIMETYPES,
+        cache_size=app.config['COMPRESSION_CACHE_SIZE'],
+        cache_ttl=app.config['COMPRESSION_CACHE_TTL']
+    )
+    app.wsgi_app = middleware
+    app.extensions['compression'] = middleware
+    return middleware
@@ -0,0 +1,134 @@
+"""
+ETag / Last-Modified validators and conditional GET (304) handling.
+
+Rendered pages get an ETag computed from the body. Pages carrying a CSRF
+token get a weak ETag that ignores the signed token but is tied to the
+visitor's session and a time bucket shorter than the token lifetime, so a
+304 never hands back a page with an expired token. Endpoints decorated
+with ``@precomputed_etag`` keep their validator in memory and answer
+conditional requests before the view runs.
+"""
+
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import g, request, session, current_app
+
+from cache import TTLCache
+
+
+def precomputed_etag(view):
+    """Mark a view whose output only changes with configuration (sitemap, robots)."""
+    view.precomputed_etag = True
+    return view
+
+
+class ConditionalGet:
+    """
+    Add validators to GET responses and turn matching requests into 304s.
+
+    Args:
+        app: Flask application
+        blueprints: Blueprint names whose responses get validators
+        validator_ttl: Seconds a precomputed validator is trusted before
+            the view is rendered again
+    """
+
+    def __init__(self, app=None, blueprints=('main',), validator_ttl=3600):
+        self.blueprints = set(blueprints)
+        self.validators = TTLCache(max_entries=256, ttl=validator_ttl)
+        self.not_modified = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['conditional_get'] = self
+        app.before_request(self._check_precomputed)
+        app.after_request(self._apply)
+
+    def stats(self):
+        """Return how many 304s were sent and the body bytes they saved."""
+        with self._lock:
+            return {'not_modified': self.not_modified, 'bytes_saved': self.bytes_saved}
+
+    def _applies(self):
+        return request.method in ('GET', 'HEAD') and request.blueprint in self.blueprints
+
+    def _precomputed_key(self):
+        view = current_app.view_functions.get(request.endpoint)
+        if not getattr(view, 'precomputed_etag', False):
+            return None
+        return (request.endpoint, request.host, request.query_string)
+
+    def _check_precomputed(self):
+        if not self._applies():
+            return None
+        key = self._precomputed_key()
+        if key is None:
+            return None
+
+        validator = self.validators.get(key)
+        if validator is None:
+            return None
+
+        etag, last_modified, length = validator
+        response = current_app.response_class(status=200)
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.headers['Cache-Control'] = 'no-cache'
+        response.make_conditional(request)
+        if response.status_code != 304:
+            # Not a match - let the view render the full body
+            return None
+
+        self._count(length)
+        return response
+
+    def _apply(self, response):
+        if not self._applies() or response.status_code != 200 or response.direct_passthrough:
+            return response
+        if response.get_etag()[0]:
+            # The view set its own validators (e.g. streamed sitemaps)
+            length = response.content_length or 0
+            response.make_conditional(request)
+            if response.status_code == 304:
+                self._count(length)
+            return response
+        if response.is_streamed:
+            return response
+
+        body = response.get_data()
+        key = self._precomputed_key()
+        csrf_field = current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token')
+        token = g.get(csrf_field)
+
+        if token:
+            # Per-session page: ignore the signed token, vary on session and age
+            time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+            bucket = int(time.time() // (time_limit / 2)) if time_limit else 0
+            digest = hashlib.sha1(body.replace(token.encode('ascii'), b''))
+            digest.update(f'{session.get(csrf_field, "")}:{bucket}'.encode('ascii'))
+            response.set_etag(digest.hexdigest(), weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+        else:
+            etag = hashlib.sha1(body).hexdigest()
+            response.set_etag(etag)
+            response.headers.setdefault('Cache-Control', 'no-cache')
+            if key is not None:
+                last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+                response.last_modified = last_modified
+                self.validators.set(key, (etag, last_modified, len(body)))
+
+        response.make_conditional(request)
+        if response.status_code == 304:
+            self._count(len(body))
+        return response
+
+    def _count(self, length):
+        with self._lock:
+            self.not_modified += 1
+            self.bytes_saved += length
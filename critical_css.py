@@ -0,0 +1,270 @@
+"""
+Critical (above-the-fold) CSS extraction and inlining.
+
+For each page template the markup that renders first - the layout before
+``{% block content %}`` (header, nav, flash messages) plus the page's
+first ``<section>`` - is scanned for tags, classes and ids, and only the
+stylesheet rules that can match them are kept. The result is inlined in
+``<head>`` and the full stylesheet is linked at the end of ``<body>`` so
+it no longer blocks first paint. Results are cached per template and
+rebuilt when the template, its parents or the stylesheet change; those
+are checked at most once every ``check_interval`` seconds per template.
+"""
+
+import os
+import re
+import threading
+import time
+
+from flask import before_render_template
+
+from assets import minify_css
+
+
+ALWAYS_PRESENT_TAGS = frozenset({'html', 'body'})
+
+_EXTENDS = re.compile(r'{%-?\s*extends\s+["\']([^"\']+)["\']\s*-?%}')
+_JINJA = re.compile(r'{{.*?}}|{%.*?%}|{#.*?#}', re.S)
+_TAG = re.compile(r'<([a-zA-Z][a-zA-Z0-9-]*)')
+_CLASS_ATTR = re.compile(r'\bclass\s*=\s*(["\'])(.*?)\1', re.S)
+_ID_ATTR = re.compile(r'\bid\s*=\s*(["\'])(.*?)\1', re.S)
+_KEYFRAMES = re.compile(r'@(?:-webkit-)?keyframes\s+([\w-]+)')
+
+
+class UsedSelectors:
+    """Tags, classes and ids that appear in a piece of template markup."""
+
+    def __init__(self, markup):
+        self.tags = set(ALWAYS_PRESENT_TAGS)
+        self.classes = set()
+        self.class_prefixes = set()
+        self.ids = set()
+
+        self.tags.update(tag.lower() for tag in _TAG.findall(markup))
+        for _, value in _CLASS_ATTR.findall(markup):
+            for token in _JINJA.sub('\0', value).split():
+                # "flash-{{ category }}" can become any "flash-*" class
+                name, dynamic, _ = token.partition('\0')
+                if dynamic and name:
+                    self.class_prefixes.add(name)
+                elif name:
+                    self.classes.add(name)
+        for _, value in _ID_ATTR.findall(markup):
+            if '{' not in value:
+                self.ids.add(value.strip())
+
+    def has_class(self, name):
+        return name in self.classes or any(name.startswith(p) for p in self.class_prefixes)
+
+    def matches(self, selector):
+        """Return True if every compound part of ``selector`` could match this markup."""
+        # Pseudo-classes, pseudo-elements and attribute tests do not affect matching here
+        selector = re.sub(r'::?[\w-]+(\((?:[^()]|\([^()]*\))*\))?|\[[^\]]*\]', '', selector)
+        for compound in re.split(r'[\s>+~]+', selector.strip()):
+            if not compound or compound == '*':
+                continue
+            tag = re.match(r'[a-zA-Z][\w-]*', compound)
+            if tag and tag.group(0).lower() not in self.tags:
+                return False
+            if not all(self.has_class(name) for name in re.findall(r'\.([\w-]+)', compound)):
+                return False
+            if not all(name in self.ids for name in re.findall(r'#([\w-]+)', compound)):
+                return False
+        return True
+
+
+def split_rules(css):
+    """
+    Split minified CSS into top-level ``(prelude, body)`` pairs.
+
+    Nested at-rule bodies (``@media``) are returned unparsed.
+    """
+    rules = []
+    depth = 0
+    start = 0
+    prelude = None
+    quote = None
+    for i, char in enumerate(css):
+        if quote:
+            if char == quote and css[i - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            if depth == 0:
+                prelude = css[start:i].strip()
+                start = i + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append((prelude, css[start:i]))
+                start = i + 1
+        elif char == ';' and depth == 0:
+            # @import / @charset
+            rules.append((css[start:i].strip(), None))
+            start = i + 1
+    return rules
+
+
+def extract_critical_css(css, markup):
+    """
+    Return the rules from ``css`` that can apply to ``markup``.
+
+    Args:
+        css: Stylesheet source
+        markup: HTML (or Jinja template source) rendered above the fold
+
+    Returns:
+        Minified CSS string
+    """
+    kept = _filter_rules(split_rules(minify_css(css)), UsedSelectors(markup))
+
+    # Keep only the animations that the kept rules reference
+    styles = ''.join(block for block in kept if not _KEYFRAMES.match(block))
+    return ''.join(block for block in kept if _is_needed(block, styles))
+
+
+def _is_needed(block, styles):
+    keyframes = _KEYFRAMES.match(block)
+    if keyframes is None:
+        return True
+    return re.search(r'animation[\w-]*:[^;}]*\b' + re.escape(keyframes.group(1)) + r'\b', styles) is not None
+
+
+def _filter_rules(rules, used):
+    kept = []
+    for prelude, body in rules:
+        if body is None:
+            continue
+        if prelude.startswith('@media') or prelude.startswith('@supports'):
+            inner = _filter_rules(split_rules(body), used)
+            if inner:
+                kept.append(f'{prelude}{{{"".join(inner)}}}')
+        elif _KEYFRAMES.match(prelude) or prelude.startswith('@font-face'):
+            kept.append(f'{prelude}{{{body}}}')
+        elif prelude.startswith('@'):
+            continue
+        else:
+            selectors = [s for s in prelude.split(',') if used.matches(s)]
+            if selectors:
+                kept.append(f'{",".join(selectors)}{{{body}}}')
+    return kept
+
+
+def above_the_fold(source, is_layout, block='content'):
+    """
+    Return the part of a template that renders before the fold.
+
+    For the layout this is everything before ``{% block <block> %}``; for a
+    page it is the block's contents up to the end of the first ``<section>``.
+    """
+    opening = re.search(r'{%-?\s*block\s+' + block + r'\s*-?%}', source)
+    if is_layout:
+        return source[:opening.start()] if opening else source
+    if not opening:
+        return ''
+    content = source[opening.end():]
+    closing = re.search(r'{%-?\s*endblock', content)
+    if closing:
+        content = content[:closing.start()]
+    section_end = content.find('</section>')
+    return content[:section_end + len('</section>')] if section_end != -1 else content
+
+
+class CriticalCSS:
+    """
+    Inline per-template critical CSS through a ``critical_css`` template variable.
+
+    Args:
+        app: Flask application
+        stylesheet: Stylesheet path relative to the static folder
+        block: Name of the layout block that holds page content
+        check_interval: Minimum seconds between change checks per template
+    """
+
+    def __init__(self, app=None, stylesheet='css/main.css', block='content', check_interval=30):
+        self.stylesheet = stylesheet
+        self.block = block
+        self.check_interval = check_interval
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['critical_css'] = self
+        before_render_template.connect(self._inject, app)
+
+    def for_template(self, name):
+        """
+        Return critical CSS for a template, using the cached copy if nothing changed.
+
+        Args:
+            name: Template name as passed to ``render_template``
+
+        Returns:
+            CSS string, or '' if the template does not extend a layout
+        """
+        now = time.monotonic()
+        cached = self._cache.get(name)
+        if cached is not None and now < cached[3]:
+            return cached[0]
+
+        css_path = os.path.join(self.app.static_folder, self.stylesheet)
+        css_mtime = os.path.getmtime(css_path)
+
+        if cached is not None:
+            css, cached_mtime, uptodate, _ = cached
+            if cached_mtime == css_mtime and all(check() for check in uptodate):
+                with self._lock:
+                    self._cache[name] = (css, css_mtime, uptodate, now + self.check_interval)
+                return css
+
+        markup, uptodate = self._collect_markup(name)
+        if markup is None:
+            css = ''
+        else:
+            with open(css_path, encoding='utf-8') as f:
+                css = extract_critical_css(f.read(), markup)
+
+        with self._lock:
+            self._cache[name] = (css, css_mtime, uptodate, now + self.check_interval)
+        self.app.logger.debug(f"Critical CSS for {name}: {len(css)} bytes")
+        return css
+
+    def clear(self):
+        """Drop all cached extractions."""
+        with self._lock:
+            self._cache.clear()
+
+    def _collect_markup(self, name):
+        """Walk the ``extends`` chain and join each template's above-the-fold markup."""
+        env = self.app.jinja_env
+        parts = []
+        uptodate = []
+        is_layout = False
+        while name:
+            source, _, check = env.loader.get_source(env, name)
+            if check is not None:
+                uptodate.append(check)
+            parent = _EXTENDS.search(source)
+            is_layout = parent is None
+            parts.append(above_the_fold(source, is_layout, self.block))
+            name = parent.group(1) if parent else None
+
+        # A template that extends nothing is not a page layout
+        if len(parts) == 1:
+            return None, uptodate
+        return '\n'.join(parts), uptodate
+
+    def _inject(self, sender, template, context, **extra):
+        if 'critical_css' in context or not template.name:
+            return
+        try:
+            context['critical_css'] = self.for_template(template.name)
+        except OSError as e:
+            self.app.logger.warning(f"Critical CSS unavailable for {template.name}: {str(e)}")
+            context['critical_css'] = ''
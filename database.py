@@ -0,0 +1,258 @@
+"""
+Lazy MongoDB connection with a background readiness probe.
+
+Nothing here talks to the server at import or app-creation time. The
+MongoClient is built on first use in each process (so forked workers
+never share a client), and a daemon thread pings the server to report
+readiness on ``/healthz`` without blocking requests.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from pymongo.monitoring import ConnectionPoolListener
+
+
+def mongo_settings_from_env():
+    """
+    Read MongoClient tuning from environment variables.
+
+    Defaults match pymongo's own except for the 5 s server selection
+    timeout. See .env.example for descriptions.
+    """
+    return {
+        'MONGODB_MAX_POOL_SIZE': int(os.getenv('MONGODB_MAX_POOL_SIZE', 100)),
+        'MONGODB_MIN_POOL_SIZE': int(os.getenv('MONGODB_MIN_POOL_SIZE', 0)),
+        'MONGODB_MAX_IDLE_TIME_MS': int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', 0)) or None,
+        'MONGODB_CONNECT_TIMEOUT_MS': int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', 20000)),
+        'MONGODB_SOCKET_TIMEOUT_MS': int(os.getenv('MONGODB_SOCKET_TIMEOUT_MS', 0)) or None,
+        'MONGODB_SERVER_SELECTION_TIMEOUT_MS': int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        'MONGODB_COMPRESSORS': os.getenv('MONGODB_COMPRESSORS', ''),
+        'MONGODB_READ_PREFERENCE': os.getenv('MONGODB_READ_PREFERENCE', 'primary'),
+        'MONGODB_MAX_TIME_MS': int(os.getenv('MONGODB_MAX_TIME_MS', 2000)),
+    }
+
+
+def client_options(config):
+    """Translate MONGODB_* settings into MongoClient keyword arguments."""
+    options = {
+        'maxPoolSize': config.get('MONGODB_MAX_POOL_SIZE', 100),
+        'minPoolSize': config.get('MONGODB_MIN_POOL_SIZE', 0),
+        'maxIdleTimeMS': config.get('MONGODB_MAX_IDLE_TIME_MS'),
+        'connectTimeoutMS': config.get('MONGODB_CONNECT_TIMEOUT_MS', 20000),
+        'socketTimeoutMS': config.get('MONGODB_SOCKET_TIMEOUT_MS'),
+        'serverSelectionTimeoutMS': config.get('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000),
+        'readPreference': config.get('MONGODB_READ_PREFERENCE', 'primary'),
+    }
+    # zstd/snappy need the optional zstandard/python-snappy packages;
+    # pymongo warns and skips compressors that are not installed
+    compressors = config.get('MONGODB_COMPRESSORS')
+    if compressors:
+        options['compressors'] = compressors
+    return options
+
+
+class PoolStatsListener(ConnectionPoolListener):
+    """
+    CMAP event listener that keeps connection pool statistics.
+
+    Use ``snapshot()`` to compare ``peak_in_use`` and ``checkout_wait_ms``
+    against maxPoolSize when sizing the pool for the number of gunicorn
+    workers and threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Zero all counters (called when a new client is created)."""
+        with self._lock:
+            self.created = 0
+            self.closed = 0
+            self.in_use = 0
+            self.peak_in_use = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.checkout_wait_ms = 0.0
+            self.max_checkout_wait_ms = 0.0
+            self.pool_clears = 0
+
+    def snapshot(self):
+        """Return a copy of the current statistics."""
+        with self._lock:
+            open_connections = self.created - self.closed
+            return {
+                'open': open_connections,
+                'in_use': self.in_use,
+                'idle': max(open_connections - self.in_use, 0),
+                'peak_in_use': self.peak_in_use,
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'avg_checkout_wait_ms': round(self.checkout_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                'max_checkout_wait_ms': round(self.max_checkout_wait_ms, 3),
+                'pool_clears': self.pool_clears,
+            }
+
+    def connection_created(self, event):
+        with self._lock:
+            self.created += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = (time.perf_counter() - getattr(self._local, 'started', time.perf_counter())) * 1000
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.checkout_wait_ms += waited
+            self.max_checkout_wait_ms = max(self.max_checkout_wait_ms, waited)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+
+class MongoConnection:
+    """
+    Per-process, lazily created MongoClient.
+
+    Args:
+        uri: MongoDB connection string
+        db_name: Database name
+        probe_interval: Seconds between readiness pings
+        **client_kwargs: Extra MongoClient options
+    """
+
+    def __init__(self, uri, db_name, probe_interval=30, **client_kwargs):
+        self.uri = uri
+        self.db_name = db_name
+        self.probe_interval = probe_interval
+        self.client_kwargs = client_kwargs
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = None
+        self._probe = None
+        self._stop = threading.Event()
+        self.pool_stats = PoolStatsListener()
+        self.ready = False
+        self.last_error = None
+        self.last_check = None
+
+    @property
+    def client(self):
+        """MongoClient for this process, created on first access."""
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    # Fresh process (or forked child): start over
+                    self.pool_stats.reset()
+                    self._client = MongoClient(
+                        self.uri, event_listeners=[self.pool_stats], **self.client_kwargs
+                    )
+                    self._pid = os.getpid()
+                    self._probe = None
+                    self.ready = False
+                    self.last_error = None
+                    self.last_check = None
+        return self._client
+
+    @property
+    def db(self):
+        """Database handle for this process."""
+        return self.client[self.db_name]
+
+    def check(self):
+        """Ping the server once and record the result."""
+        try:
+            self.client.admin.command('ping')
+            self.ready = True
+            self.last_error = None
+        except PyMongoError as e:
+            self.ready = False
+            self.last_error = str(e)
+        self.last_check = datetime.utcnow()
+        return self.ready
+
+    def start_probe(self):
+        """Start the background readiness probe in this process if it is not running."""
+        probe = self._probe
+        if probe is not None and probe.is_alive() and self._pid == os.getpid():
+            return
+        client = self.client
+        with self._lock:
+            if self._probe is not None and self._probe.is_alive():
+                return
+            self._probe = threading.Thread(
+                target=self._probe_loop, args=(client,), name='mongo-probe', daemon=True
+            )
+            self._probe.start()
+
+    def stop_probe(self):
+        """Stop the readiness probe."""
+        self._stop.set()
+
+    def status(self):
+        """Readiness snapshot for health checks."""
+        return {
+            'ready': self.ready,
+            'last_check': self.last_check.isoformat() + 'Z' if self.last_check else None,
+            'error': self.last_error,
+            'pool': self.pool_stats.snapshot()
+        }
+
+    def _probe_loop(self, client):
+        while not self._stop.is_set() and self._client is client:
+            self.check()
+            self._stop.wait(self.probe_interval)
+
+
+class LazyDatabase:
+    """
+    Stand-in for a pymongo Database that connects on first use.
+
+    Supports ``db['collection']``, ``db.collection`` and Database methods.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __getitem__(self, name):
+        return self._connection.db[name]
+
+    def __getattr__(self, name):
+        return getattr(self._connection.db, name)
+
+    def __repr__(self):
+        return f'<LazyDatabase {self._connection.db_name!r}>'
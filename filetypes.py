@@ -0,0 +1,107 @@
+"""
+Magic-byte detection for the attachment types we accept.
+
+Only the first ``SNIFF_BYTES`` of a file are examined. The upload path
+collects them while streaming the file to disk (see uploads.py), so
+checking an upload's real type costs no extra read.
+"""
+
+import codecs
+
+
+# Bytes of each file examined
+SNIFF_BYTES = 4096
+
+# Allowed extension -> detected type
+EXTENSION_TYPES = {
+    'pdf': 'pdf',
+    'doc': 'doc',
+    'docx': 'docx',
+    'txt': 'txt',
+    'jpg': 'jpg',
+    'jpeg': 'jpg',
+    'png': 'png',
+    'gif': 'gif',
+}
+
+# (type, prefix) checked in order
+SIGNATURES = (
+    ('pdf', b'%PDF-'),
+    ('png', b'\x89PNG\r\n\x1a\n'),
+    ('jpg', b'\xff\xd8\xff'),
+    ('gif', b'GIF87a'),
+    ('gif', b'GIF89a'),
+    # OLE2 compound document (Word 97-2003)
+    ('doc', b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'),
+)
+
+ZIP_SIGNATURE = b'PK\x03\x04'
+
+# Member names found near the start of an Office Open XML document
+DOCX_MARKERS = (b'[Content_Types].xml', b'word/')
+
+# Control bytes that plain text may contain (tab, LF, FF, CR, ESC)
+_TEXT_CONTROLS = frozenset(b'\t\n\x0c\r\x1b')
+_BINARY_BYTES = bytes(b for b in range(32) if b not in _TEXT_CONTROLS) + b'\x7f'
+
+
+def is_text(head, complete=False):
+    """
+    Return True if ``head`` looks like plain text.
+
+    Accepts UTF-16 with a BOM, and any 8-bit text (UTF-8 or a legacy
+    encoding) without NUL or other control bytes.
+
+    Args:
+        head: Leading bytes of the file
+        complete: True if ``head`` is the whole file (otherwise a UTF-16
+            character cut off at the end is allowed)
+    """
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        decoder = codecs.getincrementaldecoder('utf-16')()
+        try:
+            text = decoder.decode(head, final=complete)
+        except UnicodeDecodeError:
+            return False
+        return not any(ord(c) < 32 and ord(c) not in _TEXT_CONTROLS for c in text)
+
+    # UTF-8 and legacy 8-bit text alike: no NUL or other control bytes
+    return head.translate(None, _BINARY_BYTES) == head
+
+
+def sniff(head, complete=False):
+    """
+    Detect a file's type from its leading bytes.
+
+    Args:
+        head: Up to SNIFF_BYTES leading bytes
+        complete: True if ``head`` is the whole file
+
+    Returns:
+        'pdf', 'png', 'jpg', 'gif', 'doc', 'docx', 'txt' or None
+    """
+    for kind, signature in SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    if head.startswith(ZIP_SIGNATURE):
+        return 'docx' if any(marker in head for marker in DOCX_MARKERS) else None
+    if head and is_text(head, complete):
+        return 'txt'
+    return None
+
+
+def content_matches(filename, head, complete=False):
+    """
+    Check that a file's content matches its extension.
+
+    Args:
+        filename: Uploaded file name
+        head: Up to SNIFF_BYTES leading bytes
+        complete: True if ``head`` is the whole file
+
+    Returns:
+        True if the detected type is the one the extension promises
+    """
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    expected = EXTENSION_TYPES.get(extension)
+    return expected is not None and sniff(head, complete) == expected
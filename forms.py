@@ -2,15 +2,24 @@
 WTForms form definitions with CSRF protection and server-side validation.
 """
 
+from functools import lru_cache
+
+from flask import current_app
 from flask_wtf import FlaskForm
+from flask_wtf.csrf import generate_csrf
 from flask_wtf.file import FileField, FileAllowed
+from markupsafe import Markup
 from wtforms import StringField, PasswordField, TextAreaField, SelectField, BooleanField
 from wtforms.validators import (
     DataRequired, Email, Length, EqualTo, ValidationError, Optional, Regexp
 )
-import dns.resolver
 import re
 
+from blocklist import disposable_domains
+from filetypes import SNIFF_BYTES, content_matches
+from catalog import service_catalog
+from mx_cache import mx_resolver
+
 
 def validate_real_email(form, field):
     """
@@ -26,27 +35,15 @@ def validate_real_email(form, field):
     # Extract domain
     domain = email.split('@')[1]
     
-    # Block common disposable email domains
-    disposable_domains = [
-        'tempmail.com', 'throwaway.email', 'guerrillamail.com', '10minutemail.com',
-        'mailinator.com', 'trashmail.com', 'fakeinbox.com', 'yopmail.com',
-        'temp-mail.org', 'getnada.com', 'maildrop.cc', 'sharklasers.com'
-    ]
-    
-    if domain.lower() in disposable_domains:
+    # Block disposable email domains (and their subdomains)
+    if disposable_domains.is_blocked(domain):
         raise ValidationError('Please use a valid email address. Temporary/disposable emails are not allowed.')
     
-    # Check if domain has MX records (real email server)
-    try:
-        mx_records = dns.resolver.resolve(domain, 'MX')
-        if not mx_records:
-            raise ValidationError('Email domain does not appear to be valid. Please use a real email address.')
-    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers):
+    # Check if domain has MX records (real email server).
+    # Lookups are cached; None means the DNS check timed out or failed,
+    # in which case we allow it (in production, you might want to be stricter)
+    if mx_resolver.has_mx(domain) is False:
         raise ValidationError('Email domain does not exist or cannot receive emails. Please check and try again.')
-    except Exception:
-        # If DNS check fails (network issues, etc.), allow it but log
-        # In production, you might want to be stricter
-        pass
 
 
 class SignupForm(FlaskForm):
@@ -122,6 +119,30 @@ class ResetPasswordForm(FlaskForm):
     ])
 
 
+def validate_file_content(form, field):
+    """
+    Custom validator checking an upload's magic bytes against its extension.
+    Only the first few KB are examined (already captured for streamed uploads).
+    """
+    file_storage = field.data
+    if not file_storage or not getattr(file_storage, 'filename', None):
+        return
+    
+    stream = file_storage.stream
+    if hasattr(stream, 'content_matches'):
+        matches = stream.content_matches(file_storage.filename)
+    else:
+        stream.seek(0)
+        head = stream.read(SNIFF_BYTES + 1)
+        stream.seek(0)
+        matches = content_matches(
+            file_storage.filename, head[:SNIFF_BYTES], complete=len(head) <= SNIFF_BYTES
+        )
+    
+    if not matches:
+        raise ValidationError('The file contents do not match its type. Please upload a valid file.')
+
+
 class ContactForm(FlaskForm):
     """Contact form with optional file upload and email validation."""
     
@@ -151,15 +172,23 @@ class ContactForm(FlaskForm):
         FileAllowed(
             ['pdf', 'doc', 'docx', 'txt', 'jpg', 'jpeg', 'png', 'gif'],
             'Only PDF, DOC, DOCX, TXT, JPG, PNG, and GIF files are allowed'
-        )
+        ),
+        validate_file_content
     ])
 
 
+def validate_service(form, field):
+    """Check that the requested service exists in the services catalog."""
+    if field.data and service_catalog.resolve(field.data) is None:
+        raise ValidationError('Please choose one of the listed services.')
+
+
 class ServiceRequestForm(FlaskForm):
     """Service request form with email validation."""
     
     service_name = StringField('Service', validators=[
-        DataRequired(message='Service selection is required')
+        DataRequired(message='Service selection is required'),
+        validate_service
     ])
     
     name = StringField('Your Name', validators=[
@@ -200,14 +229,50 @@ class NewsletterForm(FlaskForm):
     ])
 
 
+class FooterNewsletterForm:
+    """
+    Render-only NewsletterForm for the site footer.
+
+    Provides the ``hidden_tag()`` and ``email(...)`` calls base.html
+    makes without binding a form per render. The email input never
+    carries data, so its HTML is rendered once per set of attributes
+    (in a small LRU cache); only the CSRF token (memoized per request by
+    Flask-WTF) varies. Nothing is done unless the template actually uses
+    the form.
+    """
+
+    def hidden_tag(self):
+        """Return the CSRF hidden input (empty if CSRF is disabled)."""
+        if not current_app.config.get('WTF_CSRF_ENABLED', True):
+            return Markup('')
+        name = current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token')
+        return Markup('<input id="{0}" name="{0}" type="hidden" value="{1}">').format(name, generate_csrf())
+
+    def email(self, **kwargs):
+        """Return the empty email input rendered with these attributes."""
+        return _footer_email_html(tuple(sorted(kwargs.items())))
+
+
+@lru_cache(maxsize=16)
+def _footer_email_html(attributes):
+    form = NewsletterForm(formdata=None, meta={'csrf': False})
+    return form.email(**dict(attributes))
+
+
+# Shared footer form injected into every template
+footer_newsletter_form = FooterNewsletterForm()
+
+
 def validate_file_size(form, field):
-    """Custom validator for file size (2MB limit)."""
+    """Custom validator for file size (UPLOAD_MAX_SIZE, 2MB by default)."""
     if field.data:
-        # FileStorage object
-        field.data.seek(0, 2)  # Seek to end
-        file_size = field.data.tell()
-        field.data.seek(0)  # Reset to beginning
+        # Streamed uploads (uploads.UploadStream) already know their size
+        file_size = getattr(field.data.stream, 'size', None)
+        if file_size is None:
+            field.data.seek(0, 2)  # Seek to end
+            file_size = field.data.tell()
+            field.data.seek(0)  # Reset to beginning
         
-        max_size = 2 * 1024 * 1024  # 2MB in bytes
+        max_size = current_app.config.get('UPLOAD_MAX_SIZE') or 2 * 1024 * 1024
         if file_size > max_size:
-            raise ValidationError('File size must not exceed 2MB')
+            raise ValidationError(f'File size must not exceed {max_size / (1024 * 1024):g}MB')
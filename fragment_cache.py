@@ -0,0 +1,48 @@
+"""
+``{% cache %}`` tag for caching rendered template fragments.
+
+Usage::
+
+    {% cache 'header', current_user.is_authenticated, request.endpoint %}
+        ...
+    {% endcache %}
+
+The fragment name and every following value form the cache key, so the
+key must cover everything the fragment depends on. Never wrap anything
+that renders a CSRF token or other per-visitor data.
+"""
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from cache import TTLCache
+
+
+# Shared fragment cache (configured in create_app)
+fragment_cache = TTLCache(max_entries=256, ttl=3600)
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja extension adding ``{% cache key, ... %}...{% endcache %}``."""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+
+        key_parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key_parts.append(parser.parse_expression())
+
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_cached_fragment', [nodes.List(key_parts)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _cached_fragment(self, key_parts, caller):
+        key = tuple(key_parts)
+        fragment = fragment_cache.get(key)
+        if fragment is None:
+            fragment = caller()
+            fragment_cache.set(key, fragment)
+        return fragment
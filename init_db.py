@@ -14,6 +14,7 @@ load_dotenv()
 
 # Import models
 from models import User
+from database import client_options, mongo_settings_from_env
 
 
 def init_database():
@@ -30,7 +31,7 @@ def init_database():
     print(f"Connecting to MongoDB...")
     
     try:
-        client = MongoClient(mongodb_uri, serverSelectionTimeoutMS=5000)
+        client = MongoClient(mongodb_uri, **client_options(mongo_settings_from_env()))
         # Test connection
         client.server_info()
         db = client[db_name]
@@ -59,6 +60,7 @@ def init_database():
     if 'contact_messages' not in db.list_collection_names():
         db.create_collection('contact_messages')
     db.contact_messages.create_index([('created_at', ASCENDING)])
+    db.contact_messages.create_index([('attachment_sha256', ASCENDING)])
     print("✓ Contact messages collection ready")
     
     # Service requests
@@ -77,8 +79,13 @@ def init_database():
     # Login attempts
     if 'login_attempts' not in db.list_collection_names():
         db.create_collection('login_attempts')
-    db.login_attempts.create_index([('email', ASCENDING)])
-    db.login_attempts.create_index([('timestamp', ASCENDING)])
+    # One counter document per email (keyed by _id), expired by TTL.
+    # Remove per-attempt documents and indexes from the old layout.
+    db.login_attempts.delete_many({'expires_at': {'$exists': False}})
+    for index_name in ('email_1', 'timestamp_1'):
+        if index_name in db.login_attempts.index_information():
+            db.login_attempts.drop_index(index_name)
+    db.login_attempts.create_index([('expires_at', ASCENDING)], expireAfterSeconds=0)
     print("✓ Login attempts collection ready")
     
     # Seed admin user
@@ -0,0 +1,106 @@
+"""
+Fast-path cache of locked-out login emails.
+
+Once LoginAttempt reports that an email is locked, its unlock time is kept
+in a bounded in-process LRU so further attempts are rejected without
+touching MongoDB. Optionally the lock is also written to the rate limiter's
+storage backend (e.g. Redis) so every worker process sees it; storage is
+then the source of truth (so an unlock in one worker applies to all) and
+the local map is only a fallback for when storage is unreachable.
+"""
+
+import logging
+from datetime import datetime
+
+from cache import TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+
+class LockoutCache:
+    """
+    Map of locked emails to their unlock time.
+
+    Args:
+        max_entries: Maximum emails tracked in this process
+        storage: Optional ``limits`` storage shared between processes
+    """
+
+    KEY_PREFIX = 'lockout:'
+
+    def __init__(self, max_entries=10000, storage=None):
+        self._local = TTLCache(max_entries=max_entries)
+        self.storage = storage
+
+    def configure(self, max_entries=None, storage=None):
+        """Resize the local map or attach shared storage."""
+        self._local.configure(max_entries=max_entries)
+        self.storage = storage
+
+    def get_unlock_time(self, email):
+        """
+        Return when a locked email unlocks, or None if it is not known to be locked.
+        """
+        email = email.lower()
+        if self.storage is None:
+            return self._local.get(email)
+
+        key = self.KEY_PREFIX + email
+        try:
+            if not self.storage.get(key):
+                # Unlocked (possibly by another worker)
+                self._local.delete(email)
+                return None
+            unlock_at = datetime.utcfromtimestamp(self.storage.get_expiry(key))
+        except Exception as e:
+            logger.warning(f'Lockout storage unavailable: {e}')
+            return self._local.get(email)
+
+        self._remember(email, unlock_at)
+        return unlock_at
+
+    def lock(self, email, unlock_at):
+        """Record that an email is locked until unlock_at (naive UTC datetime)."""
+        email = email.lower()
+        seconds = self._remember(email, unlock_at)
+        if self.storage is None or seconds <= 0:
+            return
+
+        key = self.KEY_PREFIX + email
+        try:
+            self.storage.clear(key)
+            self.storage.incr(key, max(1, int(seconds)))
+        except Exception as e:
+            logger.warning(f'Lockout storage unavailable: {e}')
+
+    def unlock(self, email):
+        """Forget a lock for an email."""
+        email = email.lower()
+        self._local.delete(email)
+        if self.storage is not None:
+            try:
+                self.storage.clear(self.KEY_PREFIX + email)
+            except Exception as e:
+                logger.warning(f'Lockout storage unavailable: {e}')
+
+    def _remember(self, email, unlock_at):
+        seconds = (unlock_at - datetime.utcnow()).total_seconds()
+        self._local.set(email, unlock_at, ttl=seconds)
+        return seconds
+
+
+# Shared cache used by the login view
+lockout_cache = LockoutCache()
+
+
+def init_lockout_cache(app):
+    """Size the lockout cache and attach shared storage if enabled."""
+    storage = None
+    storage_uri = app.config.get('RATELIMIT_STORAGE_URL', 'memory://')
+    if app.config.get('LOCKOUT_SHARED') and not storage_uri.startswith('memory://'):
+        from limits.storage import storage_from_string
+        storage = storage_from_string(storage_uri)
+
+    lockout_cache.configure(max_entries=app.config.get('LOCKOUT_CACHE_SIZE', 10000), storage=storage)
+    return lockout_cache
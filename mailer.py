@@ -0,0 +1,239 @@
+"""
+Background mail dispatch with pooled SMTP connections.
+
+Views call ``utils.send_email`` which only enqueues the message; a small
+set of worker threads drains the queue and delivers through a pool of
+authenticated SMTP connections that are reused between messages.
+"""
+
+import atexit
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+
+def build_message(smtp_from, to_email, subject, body, html_body=None):
+    """Build a multipart/alternative email message."""
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = smtp_from
+    msg['To'] = to_email
+
+    # Attach plain text
+    msg.attach(MIMEText(body, 'plain'))
+
+    # Attach HTML if provided
+    if html_body:
+        msg.attach(MIMEText(html_body, 'html'))
+
+    return msg
+
+
+class SMTPConnectionPool:
+    """Bounded pool of authenticated SMTP connections."""
+
+    def __init__(self, host, port, user=None, password=None, size=2, timeout=10):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        """Open, secure and authenticate a new connection."""
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        server.starttls()
+        if self.user:
+            server.login(self.user, self.password)
+        return server
+
+    def acquire(self):
+        """Return a live connection, reusing an idle one when possible."""
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    server = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+
+                # Drop connections the server has closed on us
+                try:
+                    if server.noop()[0] == 250:
+                        return server
+                except smtplib.SMTPException:
+                    pass
+                except OSError:
+                    pass
+                self._close(server)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, server, discard=False):
+        """Return a connection to the pool, or close it if it is broken."""
+        if discard:
+            self._close(server)
+        else:
+            self._idle.put(server)
+        self._slots.release()
+
+    def close_all(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+
+class MailQueue:
+    """
+    Bounded in-process email queue drained by worker threads.
+
+    Failed deliveries are retried with exponential backoff; once retries
+    are exhausted (or when the queue is full) the message is written to
+    the email log instead so it is never silently lost.
+    """
+
+    _STOP = object()
+
+    def __init__(self, app, pool, maxsize=100, workers=2, max_retries=3, backoff=1.0):
+        self.app = app
+        self.pool = pool
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._closed = False
+
+        for i in range(workers):
+            thread = threading.Thread(
+                target=self._worker, name=f'mail-worker-{i}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def enqueue(self, to_email, subject, body, html_body=None):
+        """
+        Queue an email for background delivery.
+
+        Returns:
+            True if queued, False if the queue is full or shut down
+        """
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait((to_email, subject, body, html_body))
+            return True
+        except queue.Full:
+            self.app.logger.warning(f'Mail queue full, logging email to {to_email} instead')
+            return False
+
+    def flush(self, timeout=None):
+        """
+        Block until every queued email has been handled.
+
+        Returns:
+            True if the queue drained within the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def shutdown(self, timeout=10):
+        """Drain the queue, stop the workers and close pooled connections."""
+        if self._closed:
+            return
+        self._closed = True
+        self.flush(timeout)
+        for _ in self._threads:
+            self._queue.put(self._STOP)
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self.pool.close_all()
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is self._STOP:
+                    return
+                with self.app.app_context():
+                    self._deliver(*item)
+            except Exception as e:
+                self.app.logger.error(f'Mail worker error: {e}')
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, to_email, subject, body, html_body):
+        from utils import log_email_to_file
+
+        msg = build_message(self.app.config.get('SMTP_FROM'), to_email, subject, body, html_body)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                server = self.pool.acquire()
+            except Exception as e:
+                self.app.logger.error(f'Failed to connect to SMTP server: {e}')
+            else:
+                try:
+                    server.send_message(msg)
+                    self.pool.release(server)
+                    self.app.logger.info(f'Email sent to {to_email}: {subject}')
+                    return
+                except Exception as e:
+                    self.pool.release(server, discard=True)
+                    self.app.logger.error(f'Failed to send email: {e}')
+
+            if attempt < self.max_retries:
+                time.sleep(self.backoff * (2 ** attempt))
+
+        # Retries exhausted - fall back to logging
+        log_email_to_file(to_email, subject, body, html_body)
+
+
+def init_mailer(app):
+    """
+    Start the background mail queue for an app if SMTP is configured.
+
+    The queue is stored in ``app.extensions['mailer']`` and drained on
+    interpreter exit.
+    """
+    if not app.config.get('SMTP_HOST') or not app.config.get('MAIL_ASYNC', True):
+        return None
+
+    pool = SMTPConnectionPool(
+        app.config['SMTP_HOST'],
+        app.config.get('SMTP_PORT', 587),
+        app.config.get('SMTP_USER'),
+        app.config.get('SMTP_PASS'),
+        size=app.config.get('SMTP_POOL_SIZE', 2),
+        timeout=app.config.get('SMTP_TIMEOUT', 10)
+    )
+    mailer = MailQueue(
+        app,
+        pool,
+        maxsize=app.config.get('MAIL_QUEUE_SIZE', 100),
+        workers=app.config.get('MAIL_WORKERS', 2),
+        max_retries=app.config.get('MAIL_MAX_RETRIES', 3),
+        backoff=app.config.get('MAIL_RETRY_BACKOFF', 1.0)
+    )
+    app.extensions['mailer'] = mailer
+    atexit.register(mailer.shutdown)
+    return mailer
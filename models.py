@@ -3,15 +3,35 @@ Database models for Ecoreborn application.
 Uses MongoDB with PyMongo for data persistence.
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from bson import ObjectId
-import bcrypt
+from flask import current_app, has_app_context
+from pymongo import ReturnDocument
+
+from cache import TTLCache
+from passwords import password_hasher, get_rounds
+
+
+# Server-side time budget (maxTimeMS) for reads outside an app context
+DEFAULT_MAX_TIME_MS = 2000
+
+# Identity (id, email, name) of recently loaded users, keyed by id string.
+# Used by the Flask-Login user loader so most requests skip MongoDB.
+user_identity_cache = TTLCache(max_entries=1024, ttl=60)
+
+
+def _max_time_ms():
+    """Return the app's MONGODB_MAX_TIME_MS (maxTimeMS budget for reads)."""
+    if has_app_context():
+        return current_app.config.get('MONGODB_MAX_TIME_MS', DEFAULT_MAX_TIME_MS)
+    return DEFAULT_MAX_TIME_MS
 
 
 class User:
     """User model for authentication and profile management."""
     
     COLLECTION = 'users'
+    IDENTITY_FIELDS = {'email': 1, 'name': 1}
     
     @staticmethod
     def create(db, email, password, name):
@@ -28,15 +48,16 @@ class User:
             User document ID if successful, None otherwise
         """
         # Check if user already exists
-        if db[User.COLLECTION].find_one({'email': email.lower()}):
+        if db[User.COLLECTION].find_one({'email': email.lower()}, max_time_ms=_max_time_ms()):
             return None
         
-        # Hash password using bcrypt
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        # Hash password using bcrypt (on the bounded hashing pool)
+        password_hash = password_hasher.hash(password)
         
         user_doc = {
             'email': email.lower(),
             'password_hash': password_hash,
+            'password_rounds': get_rounds(password_hash),
             'name': name,
             'is_active': True,
             'created_at': datetime.utcnow(),
@@ -49,19 +70,49 @@ class User:
     @staticmethod
     def find_by_email(db, email):
         """Find user by email address."""
-        return db[User.COLLECTION].find_one({'email': email.lower()})
+        return db[User.COLLECTION].find_one({'email': email.lower()}, max_time_ms=_max_time_ms())
     
     @staticmethod
     def find_by_id(db, user_id):
         """Find user by ObjectId."""
         if isinstance(user_id, str):
             user_id = ObjectId(user_id)
-        return db[User.COLLECTION].find_one({'_id': user_id})
+        return db[User.COLLECTION].find_one({'_id': user_id}, max_time_ms=_max_time_ms())
+    
+    @staticmethod
+    def find_identity(db, user_id):
+        """
+        Find a user's id, email and name, using the identity cache.
+        
+        Only the identity fields are fetched from MongoDB (never the
+        password hash). Unknown users are not cached.
+        
+        Returns:
+            Dict with '_id', 'email' and 'name', or None
+        """
+        key = str(user_id)
+        identity = user_identity_cache.get(key)
+        if identity is not None:
+            return identity
+        
+        if isinstance(user_id, str):
+            user_id = ObjectId(user_id)
+        identity = db[User.COLLECTION].find_one(
+            {'_id': user_id}, User.IDENTITY_FIELDS, max_time_ms=_max_time_ms()
+        )
+        if identity:
+            user_identity_cache.set(key, identity)
+        return identity
+    
+    @staticmethod
+    def invalidate_identity(user_id):
+        """Drop a user from the identity cache after a profile or password change."""
+        user_identity_cache.delete(str(user_id))
     
     @staticmethod
     def verify_password(stored_hash, password):
         """Verify password against stored hash."""
-        return bcrypt.checkpw(password.encode('utf-8'), stored_hash)
+        return password_hasher.verify(password, stored_hash)
     
     @staticmethod
     def update_password(db, user_id, new_password):
@@ -69,19 +120,53 @@ class User:
         if isinstance(user_id, str):
             user_id = ObjectId(user_id)
         
-        password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
+        password_hash = password_hasher.hash(new_password)
         
         db[User.COLLECTION].update_one(
             {'_id': user_id},
             {
                 '$set': {
                     'password_hash': password_hash,
+                    'password_rounds': get_rounds(password_hash),
                     'updated_at': datetime.utcnow()
                 }
             }
         )
+        User.invalidate_identity(user_id)
         return True
     
+    @staticmethod
+    def rehash_password_if_needed(db, user, password):
+        """
+        Re-hash a just-verified password at the configured bcrypt cost.
+        
+        Lets the work factor be raised or lowered over time without
+        forcing password resets. The update only applies if the stored
+        hash has not changed in the meantime.
+        
+        Args:
+            db: MongoDB database instance
+            user: User document (must include '_id' and 'password_hash')
+            password: Plain text password that was just verified
+            
+        Returns:
+            True if the hash was upgraded/downgraded, False otherwise
+        """
+        if not password_hasher.needs_rehash(user['password_hash']):
+            return False
+        
+        password_hash = password_hasher.hash(password)
+        result = db[User.COLLECTION].update_one(
+            {'_id': user['_id'], 'password_hash': user['password_hash']},
+            {
+                '$set': {
+                    'password_hash': password_hash,
+                    'password_rounds': get_rounds(password_hash)
+                }
+            }
+        )
+        return result.modified_count == 1
+    
     @staticmethod
     def update_last_login(db, email):
         """Update user's last login timestamp."""
@@ -129,7 +214,7 @@ class PasswordResetToken:
             'token': token,
             'used': False,
             'expires_at': {'$gt': datetime.utcnow()}
-        })
+        }, max_time_ms=_max_time_ms())
     
     @staticmethod
     def mark_as_used(db, token):
@@ -146,14 +231,22 @@ class ContactMessage:
     COLLECTION = 'contact_messages'
     
     @staticmethod
-    def create(db, name, email, subject, message, filename=None):
-        """Create a new contact message."""
+    def create(db, name, email, subject, message, filename=None,
+               attachment_sha256=None, attachment_size=None):
+        """
+        Create a new contact message.
+        
+        ``filename`` is the attachment's display name; the file itself is
+        the content-addressed blob ``attachment_sha256`` (see uploads.py).
+        """
         message_doc = {
             'name': name,
             'email': email,
             'subject': subject,
             'message': message,
             'filename': filename,
+            'attachment_sha256': attachment_sha256,
+            'attachment_size': attachment_size,
             'status': 'unread',
             'created_at': datetime.utcnow()
         }
@@ -164,7 +257,62 @@ class ContactMessage:
     @staticmethod
     def get_all(db, limit=100):
         """Get all contact messages."""
-        return list(db[ContactMessage.COLLECTION].find().sort('created_at', -1).limit(limit))
+        return list(
+            db[ContactMessage.COLLECTION].find()
+            .sort('created_at', -1).limit(limit).max_time_ms(_max_time_ms())
+        )
+    
+    @staticmethod
+    def attachment_hashes(db):
+        """Return the set of upload blob hashes referenced by any message."""
+        hashes = db[ContactMessage.COLLECTION].distinct('attachment_sha256')
+        return {sha256 for sha256 in hashes if sha256}
+
+    @staticmethod
+    def set_image_info(db, message_id, info):
+        """
+        Record an image attachment's dimensions and derived files.
+
+        Args:
+            db: Database
+            message_id: ContactMessage id
+            info: Result of thumbnails.build_derivatives
+
+        Setting the same values again is harmless, so retries are safe.
+        """
+        db[ContactMessage.COLLECTION].update_one(
+            {'_id': ObjectId(message_id)},
+            {
+                '$set': {
+                    'attachment_width': info['width'],
+                    'attachment_height': info['height'],
+                    'attachment_size': info['size'],
+                    'attachment_thumbnail': info['thumbnail'],
+                    'attachment_clean': info['clean'],
+                    'attachment_processed_at': datetime.utcnow()
+                },
+                '$unset': {'attachment_error': ''}
+            }
+        )
+
+    @staticmethod
+    def set_image_error(db, message_id, error):
+        """Record why an image attachment could not be processed."""
+        db[ContactMessage.COLLECTION].update_one(
+            {'_id': ObjectId(message_id)},
+            {'$set': {'attachment_error': error, 'attachment_processed_at': datetime.utcnow()}}
+        )
+
+    @staticmethod
+    def get_unprocessed_images(db, limit=500):
+        """Get messages with a jpg/png attachment that has not been processed yet."""
+        return list(
+            db[ContactMessage.COLLECTION].find({
+                'attachment_sha256': {'$ne': None},
+                'attachment_processed_at': {'$exists': False},
+                'filename': {'$regex': r'\.(jpe?g|png)$', '$options': 'i'}
+            }).limit(limit).max_time_ms(_max_time_ms())
+        )
 
 
 class ServiceRequest:
@@ -192,7 +340,10 @@ class ServiceRequest:
     @staticmethod
     def get_by_user_email(db, email, limit=50):
         """Get service requests by user email."""
-        return list(db[ServiceRequest.COLLECTION].find({'email': email}).sort('created_at', -1).limit(limit))
+        return list(
+            db[ServiceRequest.COLLECTION].find({'email': email})
+            .sort('created_at', -1).limit(limit).max_time_ms(_max_time_ms())
+        )
 
 
 class NewsletterSubscriber:
@@ -204,7 +355,7 @@ class NewsletterSubscriber:
     def subscribe(db, email):
         """Subscribe an email to newsletter."""
         # Check if already subscribed
-        existing = db[NewsletterSubscriber.COLLECTION].find_one({'email': email.lower()})
+        existing = db[NewsletterSubscriber.COLLECTION].find_one({'email': email.lower()}, max_time_ms=_max_time_ms())
         if existing:
             if existing.get('unsubscribed', False):
                 # Resubscribe
@@ -245,37 +396,83 @@ class NewsletterSubscriber:
 
 
 class LoginAttempt:
-    """Track login attempts for rate limiting."""
+    """
+    Sliding-window failed login counter, one document per email.
+    
+    Each document keeps the timestamps of failures inside the window and
+    an ``expires_at`` used by a TTL index, so idle counters disappear on
+    their own. Checking the lockout and recording an attempt is a single
+    atomic ``find_one_and_update``.
+    """
     
     COLLECTION = 'login_attempts'
+    MAX_FAILURES = 5
+    WINDOW_MINUTES = 15
     
     @staticmethod
-    def record_attempt(db, email, success, ip_address):
-        """Record a login attempt."""
-        attempt_doc = {
-            'email': email.lower(),
-            'success': success,
-            'ip_address': ip_address,
-            'timestamp': datetime.utcnow()
-        }
+    def register_attempt(db, email, ip_address, max_failures=MAX_FAILURES, minutes=WINDOW_MINUTES):
+        """
+        Check the lockout and record a login attempt in one round trip.
         
-        db[LoginAttempt.COLLECTION].insert_one(attempt_doc)
-    
-    @staticmethod
-    def get_recent_failed_attempts(db, email, minutes=15):
-        """Get count of recent failed login attempts."""
-        from datetime import timedelta
-        cutoff = datetime.utcnow() - timedelta(minutes=minutes)
+        The attempt is counted as a failure up front; call clear_attempts()
+        once the password checks out. Attempts made while locked are not
+        counted, so the lockout ends when the oldest of the last
+        ``max_failures`` failures slides out of the window, i.e.
+        ``minutes`` after that failure (sooner than ``minutes`` after the
+        most recent one if the failures were spread out).
         
-        count = db[LoginAttempt.COLLECTION].count_documents({
-            'email': email.lower(),
-            'success': False,
-            'timestamp': {'$gte': cutoff}
-        })
+        Args:
+            db: MongoDB database instance
+            email: Email being logged into
+            ip_address: Client IP (stored for auditing)
+            max_failures: Failures within the window that trigger a lockout
+            minutes: Window length
+            
+        Returns:
+            Dict with 'locked' (bool, locked before this attempt),
+            'failures' (count within the window, including this attempt
+            unless locked) and 'unlock_at' (when the lockout ends, or None
+            if the failure limit has not been reached)
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(minutes=minutes)
+        
+        pipeline = [
+            # Drop failures that have slid out of the window
+            {'$set': {'failures': {'$filter': {
+                'input': {'$ifNull': ['$failures', []]},
+                'cond': {'$gte': ['$$this', cutoff]}
+            }}}},
+            {'$set': {'locked': {'$gte': [{'$size': '$failures'}, max_failures]}}},
+            # Record this attempt unless the account is already locked
+            {'$set': {
+                'failures': {'$cond': ['$locked', '$failures', {'$concatArrays': ['$failures', [now]]}]},
+                'expires_at': {'$cond': ['$locked', '$expires_at', now + timedelta(minutes=minutes)]},
+                'last_ip': ip_address,
+                'updated_at': now
+            }}
+        ]
         
-        return count
+        doc = db[LoginAttempt.COLLECTION].find_one_and_update(
+            {'_id': email.lower()},
+            pipeline,
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            maxTimeMS=_max_time_ms()
+        )
+        
+        failures = doc.get('failures', [])
+        unlock_at = None
+        if len(failures) >= max_failures:
+            unlock_at = failures[-max_failures] + timedelta(minutes=minutes)
+        
+        return {
+            'locked': bool(doc.get('locked')),
+            'failures': len(failures),
+            'unlock_at': unlock_at
+        }
     
     @staticmethod
     def clear_attempts(db, email):
         """Clear login attempts for an email (after successful login)."""
-        db[LoginAttempt.COLLECTION].delete_many({'email': email.lower()})
+        db[LoginAttempt.COLLECTION].delete_one({'_id': email.lower()})
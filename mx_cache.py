@@ -0,0 +1,162 @@
+"""
+Cached MX record lookups for email domain validation.
+
+Positive answers are cached for the record's TTL (clamped to a sane
+range), negative answers (NXDOMAIN/NoAnswer) for a shorter fixed TTL.
+Resolver failures (timeouts, or every nameserver failing) are not cached.
+Concurrent lookups for the same domain share a single DNS query and
+every query has a hard time budget.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import dns.exception
+import dns.resolver
+
+
+class _PendingLookup:
+    """A DNS query in flight that other threads can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class MXResolver:
+    """
+    TTL-aware LRU cache in front of ``dns.resolver.resolve(domain, 'MX')``.
+
+    ``has_mx`` returns True if the domain accepts mail, False if it does
+    not exist or has no MX records, and None if the answer is unknown
+    (timeout or resolver failure). Unknown answers are never cached.
+    """
+
+    def __init__(self, max_entries=4096, timeout=2.0, min_ttl=60, max_ttl=86400, negative_ttl=300):
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.configure(max_entries, timeout, min_ttl, max_ttl, negative_ttl)
+        self.reset_stats()
+
+    def configure(self, max_entries=4096, timeout=2.0, min_ttl=60, max_ttl=86400, negative_ttl=300):
+        """Update cache limits and the per-lookup time budget."""
+        with self._lock:
+            self.max_entries = max_entries
+            self.timeout = timeout
+            self.min_ttl = min_ttl
+            self.max_ttl = max_ttl
+            self.negative_ttl = negative_ttl
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def has_mx(self, domain):
+        """
+        Check whether a domain has MX records.
+
+        Args:
+            domain: Email domain (e.g. ``gmail.com``)
+
+        Returns:
+            True, False, or None if the lookup timed out or failed
+        """
+        domain = domain.lower().rstrip('.')
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._cache.get(domain)
+            if entry is not None:
+                result, expires_at = entry
+                if expires_at > now:
+                    self._cache.move_to_end(domain)
+                    self.hits += 1
+                    return result
+                del self._cache[domain]
+
+            self.misses += 1
+            pending = self._inflight.get(domain)
+            leader = pending is None
+            if leader:
+                pending = _PendingLookup()
+                self._inflight[domain] = pending
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            # Another thread is already asking; wait for its answer
+            pending.event.wait(self.timeout + 0.5)
+            return pending.result
+
+        result, ttl = None, 0
+        try:
+            result, ttl = self._query(domain)
+        finally:
+            with self._lock:
+                self._inflight.pop(domain, None)
+                if ttl:
+                    self._cache[domain] = (result, time.monotonic() + ttl)
+                    self._cache.move_to_end(domain)
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+            pending.result = result
+            pending.event.set()
+
+        return result
+
+    def _query(self, domain):
+        """Run the DNS query and return (result, ttl_seconds)."""
+        try:
+            answer = dns.resolver.resolve(domain, 'MX', lifetime=self.timeout)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return False, self.negative_ttl
+        except dns.resolver.NoNameservers:
+            # SERVFAIL/REFUSED/unreachable from every nameserver: not an answer
+            with self._lock:
+                self.no_nameservers += 1
+            return None, 0
+        except dns.exception.Timeout:
+            with self._lock:
+                self.timeouts += 1
+            return None, 0
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            return None, 0
+
+        if not answer:
+            return False, self.negative_ttl
+
+        ttl = answer.rrset.ttl if answer.rrset is not None else self.min_ttl
+        return True, min(max(ttl, self.min_ttl), self.max_ttl)
+
+    def stats(self):
+        """Return hit/miss/timeout counters and current cache size."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'collapsed': self.collapsed,
+                'timeouts': self.timeouts,
+                'no_nameservers': self.no_nameservers,
+                'errors': self.errors,
+                'size': len(self._cache),
+            }
+
+    def reset_stats(self):
+        """Zero all counters."""
+        self.hits = 0
+        self.misses = 0
+        self.collapsed = 0
+        self.timeouts = 0
+        self.no_nameservers = 0
+        self.errors = 0
+
+    def clear(self):
+        """Drop every cached answer."""
+        with self._lock:
+            self._cache.clear()
+
+
+# Shared resolver used by form validators
+mx_resolver = MXResolver()
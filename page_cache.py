@@ -0,0 +1,105 @@
+"""
+Full-page response cache for anonymous visitors.
+
+Views decorated with ``@cached_page`` are rendered once per
+(endpoint, host, query string, vary headers) and served from memory to
+anonymous GET requests until the entry expires. The per-session CSRF
+token is swapped for a placeholder before the body is stored and filled
+back in on every hit, so cached pages never leak another visitor's token.
+"""
+
+from flask import g, request, session, current_app
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+
+from cache import TTLCache
+
+
+CSRF_PLACEHOLDER = b'__PAGE_CACHE_CSRF_TOKEN__'
+
+
+def cached_page(view):
+    """Mark a view as cacheable for anonymous GET requests."""
+    view.cache_page = True
+    return view
+
+
+class PageCache:
+    """
+    Serve cached pages from ``before_request`` and fill the cache in ``after_request``.
+
+    Args:
+        app: Flask application
+        max_entries: Maximum cached pages
+        ttl: Seconds a cached page is served
+        vary_headers: Request headers that are part of the cache key
+    """
+
+    def __init__(self, app=None, max_entries=256, ttl=300, vary_headers=()):
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.vary_headers = tuple(vary_headers)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['page_cache'] = self
+        app.before_request(self._serve_cached)
+        app.after_request(self._store)
+
+    def clear(self):
+        """Drop every cached page (e.g. after a content change)."""
+        self.cache.clear()
+
+    def _cache_key(self):
+        """Return the cache key for this request, or None if it must bypass the cache."""
+        if request.method not in ('GET', 'HEAD'):
+            return None
+
+        view = current_app.view_functions.get(request.endpoint)
+        if not getattr(view, 'cache_page', False):
+            return None
+
+        # Pages with flash messages or a logged-in nav are per-user
+        if '_flashes' in session or current_user.is_authenticated:
+            return None
+
+        return (
+            request.endpoint,
+            request.host,
+            request.query_string,
+            tuple(request.headers.get(name, '') for name in self.vary_headers)
+        )
+
+    def _serve_cached(self):
+        key = self._cache_key()
+        if key is None:
+            return None
+
+        cached = self.cache.get(key)
+        if cached is None:
+            g.page_cache_key = key
+            return None
+
+        body, mimetype = cached
+        if CSRF_PLACEHOLDER in body:
+            body = body.replace(CSRF_PLACEHOLDER, generate_csrf().encode('ascii'))
+
+        response = current_app.response_class(body, mimetype=mimetype)
+        response.headers['X-Page-Cache'] = 'HIT'
+        return response
+
+    def _store(self, response):
+        key = g.pop('page_cache_key', None)
+        if key is None:
+            return response
+        if response.status_code != 200 or response.direct_passthrough or response.is_streamed or '_flashes' in session:
+            return response
+
+        body = response.get_data()
+        token = g.get(current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'))
+        if token:
+            body = body.replace(token.encode('ascii'), CSRF_PLACEHOLDER)
+
+        self.cache.set(key, (body, response.mimetype))
+        response.headers['X-Page-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,115 @@
+"""
+Bounded worker pool for bcrypt password hashing and verification.
+
+bcrypt releases the GIL while hashing, so a small thread pool caps how
+many CPU cores password work can occupy at once. Requests beyond the
+pool's queue depth are rejected immediately with PasswordHasherBusy
+(rendered as a 503) instead of piling up behind a login storm.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import bcrypt
+
+
+def get_rounds(stored_hash):
+    """
+    Read the cost factor from a bcrypt hash (``$2b$<rounds>$...``).
+
+    Returns:
+        Cost factor as int, or None if the hash is not in bcrypt format
+    """
+    if isinstance(stored_hash, bytes):
+        stored_hash = stored_hash.decode('ascii', 'replace')
+    parts = stored_hash.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing pool is saturated."""
+
+
+class PasswordHasher:
+    """
+    Run bcrypt on a fixed-size thread pool with a queue-depth limit.
+
+    Args:
+        max_workers: Hashes computed concurrently
+        max_pending: Extra requests allowed to wait for a worker
+        timeout: Seconds a caller waits for its result before giving up
+        rounds: Target bcrypt cost factor for new hashes
+    """
+
+    def __init__(self, max_workers=2, max_pending=16, timeout=5.0, rounds=12):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self.rejected = 0
+        self.configure(max_workers, max_pending, timeout, rounds)
+
+    def configure(self, max_workers=2, max_pending=16, timeout=5.0, rounds=12):
+        """Resize the pool. Work already submitted finishes on the old pool."""
+        with self._lock:
+            old = self._executor
+            self.max_workers = max_workers
+            self.max_pending = max_pending
+            self.timeout = timeout
+            self.rounds = rounds
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix='bcrypt'
+            )
+        if old is not None:
+            old.shutdown(wait=False)
+
+    def hash(self, password, rounds=None):
+        """
+        Hash a password.
+
+        Args:
+            password: Plain text password
+            rounds: bcrypt cost factor (default: the configured target)
+
+        Returns:
+            bcrypt hash as bytes
+        """
+        salt = bcrypt.gensalt(self.rounds if rounds is None else rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt)
+
+    def verify(self, password, stored_hash):
+        """Check a password against a stored bcrypt hash."""
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), stored_hash)
+
+    def needs_rehash(self, stored_hash):
+        """Check whether a stored hash uses a cost other than the target."""
+        return get_rounds(stored_hash) != self.rounds
+
+    def stats(self):
+        """Return current in-flight count and rejections so far."""
+        with self._lock:
+            return {'inflight': self._inflight, 'rejected': self.rejected}
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._inflight >= self.max_workers + self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy('Password hashing queue is full')
+            future = self._executor.submit(fn, *args)
+            self._inflight += 1
+        future.add_done_callback(self._done)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy('Timed out waiting for password hashing')
+
+    def _done(self, future):
+        with self._lock:
+            self._inflight -= 1
+
+
+# Shared pool used by models.User
+password_hasher = PasswordHasher()
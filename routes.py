@@ -2,13 +2,19 @@
 Main application routes: home, services, contact, dashboard.
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
 from flask_login import login_required, current_user
+from markupsafe import Markup
 
 from models import ContactMessage, ServiceRequest, NewsletterSubscriber
+from catalog import service_catalog
+from passwords import PasswordHasherBusy
+from page_cache import cached_page
+from conditional import precomputed_etag
+from sitemap import sitemap_entry
 from forms import ContactForm, ServiceRequestForm, NewsletterForm
 from utils import (
-    save_uploaded_file, send_email,
+    UploadRejected, save_uploaded_file, send_email,
     create_contact_confirmation_email,
     create_service_request_confirmation_email
 )
@@ -18,13 +24,16 @@ main_bp = Blueprint('main', __name__)
 
 
 @main_bp.route('/')
+@cached_page
+@sitemap_entry(priority='1.0', changefreq='daily')
 def home():
     """Home page - public."""
-    newsletter_form = NewsletterForm()
-    return render_template('home.html', newsletter_form=newsletter_form, title='Home')
+    return render_template('home.html', title='Home')
 
 
 @main_bp.route('/services', methods=['GET', 'POST'])
+@cached_page
+@sitemap_entry(priority='0.9', changefreq='weekly', lastmod=lambda: service_catalog.last_modified)
 def services():
     """Services page - public with request form."""
     form = ServiceRequestForm()
@@ -75,44 +84,19 @@ Request ID: {request_id}
         else:
             flash('An error occurred. Please try again.', 'error')
     
-    # Define services
-    services_list = [
-        {
-            'id': 'fabric-recycling',
-            'name': 'Fabric Recycling',
-            'description': 'We collect and recycle discarded textiles, converting them into high-quality fibers for re-spinning. Perfect for fashion brands looking to reduce waste.',
-            'pricing': 'Volume-based pricing. Contact us for a custom quote.'
-        },
-        {
-            'id': 'custom-fabric',
-            'name': 'Custom Re-spun Fabric Orders',
-            'description': 'Order custom re-spun fabrics made from recycled materials. Choose your specifications, colors, and quantities.',
-            'pricing': 'Starting from ₹800/meter. Minimum order: 100 meters.'
-        },
-        {
-            'id': 'b2b-partnerships',
-            'name': 'B2B Partnerships',
-            'description': 'Partner with us to integrate sustainable practices into your supply chain. We work with fashion brands, manufacturers, and retailers.',
-            'pricing': 'Custom partnership packages available.'
-        },
-        {
-            'id': 'consulting',
-            'name': 'Consulting for Textile Brands',
-            'description': 'Expert consulting on sustainable textile practices, circular economy implementation, and waste reduction strategies.',
-            'pricing': '₹15,000/day or custom project rates.'
-        },
-        {
-            'id': 'collection-drives',
-            'name': 'Student/Community Collection Drives',
-            'description': 'We organize and support textile collection drives for schools, colleges, and community organizations. Educational workshops included.',
-            'pricing': 'Free for educational institutions and nonprofits.'
-        }
-    ]
+    # Card summaries are rendered once per catalog version
+    summary = current_app.jinja_env.get_template('partials/service_summary.html')
+    fragments = service_catalog.fragments(lambda service: Markup(summary.render(service=service)))
     
-    return render_template('services.html', form=form, services=services_list, title='Services')
+    return render_template(
+        'services.html', form=form, services=service_catalog.all(),
+        service_fragments=fragments, title='Services'
+    )
 
 
 @main_bp.route('/contact', methods=['GET', 'POST'])
+@cached_page
+@sitemap_entry(priority='0.8', changefreq='monthly')
 def contact():
     """Contact page - public."""
     form = ContactForm()
@@ -121,10 +105,17 @@ def contact():
         db = current_app.db
         
         # Handle file upload
-        filename = None
+        stored = None
         if form.attachment.data:
             upload_folder = current_app.config.get('UPLOAD_FOLDER', './uploads')
-            filename = save_uploaded_file(form.attachment.data, upload_folder)
+            try:
+                stored = save_uploaded_file(
+                    form.attachment.data, upload_folder, current_app.config.get('UPLOAD_MAX_SIZE')
+                )
+            except UploadRejected as e:
+                # Never store the message without the file the user meant to send
+                form.attachment.errors.append(str(e))
+                return render_template('contact.html', form=form, title='Contact Us')
         
         # Save contact message
         message_id = ContactMessage.create(
@@ -133,10 +124,17 @@ def contact():
             email=form.email.data,
             subject=form.subject.data,
             message=form.message.data,
-            filename=filename
+            filename=stored.filename if stored else None,
+            attachment_sha256=stored.sha256 if stored else None,
+            attachment_size=stored.size if stored else None
         )
         
         if message_id:
+            # Thumbnail and strip metadata from image attachments off the request thread
+            images = current_app.extensions.get('images')
+            if stored and images is not None:
+                images.submit(message_id, stored.filename, stored.sha256)
+            
             # Send confirmation to user
             subject, body = create_contact_confirmation_email(form.name.data)
             send_email(form.email.data, subject, body)
@@ -152,7 +150,7 @@ Subject: {form.subject.data}
 Message:
 {form.message.data}
 
-{f"Attachment: {filename}" if filename else "No attachment"}
+{f"Attachment: {stored.filename} ({stored.size} bytes, sha256 {stored.sha256})" if stored else "No attachment"}
 
 ---
 Message ID: {message_id}
@@ -206,26 +204,40 @@ def newsletter_subscribe():
 
 @main_bp.route('/sitemap.xml')
 def sitemap():
-    """Generate sitemap.xml."""
-    from flask import Response
-    from utils import generate_sitemap_xml
-    
-    base_url = current_app.config.get('APP_URL', 'http://localhost:5000')
-    
-    routes = [
-        ('/', '1.0', 'daily'),
-        ('/services', '0.9', 'weekly'),
-        ('/contact', '0.8', 'monthly'),
-        ('/login', '0.5', 'monthly'),
-        ('/signup', '0.5', 'monthly'),
-    ]
+    """Sitemap (or sitemap index once there are more URLs than fit in one file)."""
+    return _sitemap_response(None)
+
+
+@main_bp.route('/sitemap-<int:number>.xml')
+def sitemap_shard(number):
+    """One shard of a sharded sitemap."""
+    return _sitemap_response(number)
+
+
+def _sitemap_response(shard):
+    """Stream a sitemap document, or serve it from memory if unchanged."""
+    from flask import Response, abort
     
-    xml_content = generate_sitemap_xml(base_url, routes)
+    document = current_app.extensions['sitemap'].document(shard)
+    if document is None:
+        abort(404)
+    body, etag, last_modified = document
     
-    return Response(xml_content, mimetype='application/xml')
+    response = Response(body, mimetype='application/xml')
+    if isinstance(body, bytes):
+        response.content_length = len(body)
+    else:
+        # Keep make_conditional() from buffering the stream to count its length
+        response.implicit_sequence_conversion = False
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @main_bp.route('/robots.txt')
+@cached_page
+@precomputed_etag
 def robots():
     """Generate robots.txt."""
     from flask import Response
@@ -242,6 +254,34 @@ Sitemap: {}/sitemap.xml
     return Response(content, mimetype='text/plain')
 
 
+@main_bp.route('/healthz')
+def healthz():
+    """
+    Readiness check: 200 once MongoDB answers the background probe, 503 otherwise.
+    
+    Only the status is returned unless HEALTHZ_DETAILS is enabled, since
+    the endpoint is public and the details include MongoDB errors.
+    """
+    mongo = current_app.extensions['mongo']
+    mongo_status = mongo.status()
+    ready = mongo_status['ready']
+    
+    body = {'status': 'ok' if ready else 'unavailable'}
+    
+    if current_app.config.get('HEALTHZ_DETAILS'):
+        body['mongodb'] = mongo_status
+        
+        conditional_get = current_app.extensions.get('conditional_get')
+        if conditional_get is not None:
+            body['conditional_get'] = conditional_get.stats()
+        
+        compression = current_app.extensions.get('compression')
+        if compression is not None:
+            body['compression'] = compression.stats()
+    
+    return jsonify(body), 200 if ready else 503
+
+
 # Error handlers
 @main_bp.app_errorhandler(404)
 def not_found_error(error):
@@ -256,8 +296,16 @@ def internal_error(error):
     return render_template('errors/500.html', title='Server Error'), 500
 
 
+@main_bp.app_errorhandler(PasswordHasherBusy)
+def password_hasher_busy(error):
+    """Handle a saturated password hashing pool with a fast 503."""
+    current_app.logger.warning(f'Password hashing pool busy: {error}')
+    return render_template('errors/503.html', title='Service Busy'), 503, {'Retry-After': '5'}
+
+
 @main_bp.app_errorhandler(413)
 def request_entity_too_large(error):
     """Handle file too large errors."""
-    flash('The uploaded file is too large. Maximum size is 2MB.', 'error')
+    max_size = current_app.config.get('UPLOAD_MAX_SIZE') or 2 * 1024 * 1024
+    flash(f'The uploaded file is too large. Maximum size is {max_size / (1024 * 1024):g}MB.', 'error')
     return redirect(url_for('main.contact'))
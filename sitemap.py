@@ -0,0 +1,233 @@
+"""
+Streaming sitemap generation.
+
+URLs come from the registered routes - any GET rule without arguments
+whose view is decorated with ``@sitemap_entry`` - plus content sources
+registered with ``Sitemap.source``. Once there are more than
+``max_urls`` URLs (50,000 is the protocol limit) ``/sitemap.xml``
+becomes a sitemap index pointing at ``/sitemap-<n>.xml`` shards. Shards
+are streamed in chunks on first render and then served from memory until
+their URLs or ``lastmod`` dates change.
+"""
+
+import hashlib
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+from flask import current_app, url_for
+
+from cache import TTLCache
+
+
+MAX_URLS_PER_SITEMAP = 50000
+
+# URLs rendered per streamed chunk
+CHUNK_URLS = 1000
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+SitemapEntry = namedtuple(
+    'SitemapEntry', ['path', 'lastmod', 'priority', 'changefreq'], defaults=(None, None, None)
+)
+
+
+def sitemap_entry(priority=None, changefreq=None, lastmod=None):
+    """
+    List a view's URL in the sitemap.
+
+    Args:
+        priority: Sitemap priority ('0.0' to '1.0')
+        changefreq: Sitemap change frequency ('daily', 'weekly', ...)
+        lastmod: Optional callable returning the page's last-modified datetime
+    """
+    def decorator(view):
+        view.sitemap = {'priority': priority, 'changefreq': changefreq, 'lastmod': lastmod}
+        return view
+    return decorator
+
+
+def _format_lastmod(value):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+
+def iter_urlset(base_url, entries):
+    """
+    Yield a ``<urlset>`` document in chunks.
+
+    Args:
+        base_url: Site URL prepended to each entry path
+        entries: Sequence of SitemapEntry
+
+    Yields:
+        UTF-8 encoded XML chunks
+    """
+    yield f'{XML_HEADER}<urlset xmlns="{SITEMAP_NS}">\n'.encode('utf-8')
+    for start in range(0, len(entries), CHUNK_URLS):
+        parts = []
+        for entry in entries[start:start + CHUNK_URLS]:
+            parts.append(f'  <url>\n    <loc>{escape(base_url + entry.path)}</loc>\n')
+            if entry.lastmod:
+                parts.append(f'    <lastmod>{_format_lastmod(entry.lastmod)}</lastmod>\n')
+            if entry.changefreq:
+                parts.append(f'    <changefreq>{entry.changefreq}</changefreq>\n')
+            if entry.priority:
+                parts.append(f'    <priority>{entry.priority}</priority>\n')
+            parts.append('  </url>\n')
+        yield ''.join(parts).encode('utf-8')
+    yield b'</urlset>\n'
+
+
+def iter_sitemap_index(base_url, shard_paths, lastmods):
+    """Yield a ``<sitemapindex>`` document pointing at each shard."""
+    yield f'{XML_HEADER}<sitemapindex xmlns="{SITEMAP_NS}">\n'.encode('utf-8')
+    parts = []
+    for path, lastmod in zip(shard_paths, lastmods):
+        parts.append(f'  <sitemap>\n    <loc>{escape(base_url + path)}</loc>\n')
+        if lastmod:
+            parts.append(f'    <lastmod>{_format_lastmod(lastmod)}</lastmod>\n')
+        parts.append('  </sitemap>\n')
+    yield ''.join(parts).encode('utf-8')
+    yield b'</sitemapindex>\n'
+
+
+class Sitemap:
+    """
+    Collect sitemap URLs and serve rendered, cached sitemap documents.
+
+    Args:
+        app: Flask application
+        max_urls: URLs per sitemap file before sharding into an index
+        ttl: Seconds the collected URL list is reused before sources are queried again
+    """
+
+    def __init__(self, app=None, max_urls=MAX_URLS_PER_SITEMAP, ttl=300):
+        self.max_urls = max_urls
+        self.sources = []
+        self._snapshots = TTLCache(max_entries=1, ttl=ttl)
+        self._rendered = {}
+        self._first_seen = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['sitemap'] = self
+
+    def source(self, func):
+        """
+        Register a callable that yields SitemapEntry objects (e.g. from MongoDB).
+
+        Called inside a request, so it may use ``url_for``.
+        """
+        self.sources.append(func)
+        return func
+
+    def clear(self):
+        """Forget collected URLs and rendered documents."""
+        self._snapshots.clear()
+        with self._lock:
+            self._rendered.clear()
+
+    def shard_count(self):
+        """Return the number of ``<urlset>`` files the current URLs need."""
+        return len(self._snapshot()['shards'])
+
+    def document(self, shard=None):
+        """
+        Return a sitemap document and its validators.
+
+        Args:
+            shard: 1-based shard number, or None for ``/sitemap.xml``
+                (the single urlset, or the index once sharded)
+
+        Returns:
+            (body, etag, last_modified) where body is bytes if cached or a
+            chunk generator on first render; None if the shard does not exist
+        """
+        snapshot = self._snapshot()
+        shards = snapshot['shards']
+        base_url = current_app.config.get('APP_URL', 'http://localhost:5000').rstrip('/')
+
+        if shard is None and len(shards) > 1:
+            key = 'index'
+            etag = snapshot['index_etag']
+            chunks = iter_sitemap_index(base_url, snapshot['shard_paths'], snapshot['lastmods'])
+        else:
+            index = (shard or 1) - 1
+            if not 0 <= index < len(shards):
+                return None
+            key = index
+            etag = snapshot['etags'][index]
+            chunks = iter_urlset(base_url, shards[index])
+
+        last_modified = self._last_modified(etag)
+        with self._lock:
+            cached = self._rendered.get(key)
+        if cached is not None and cached[0] == etag:
+            return cached[1], etag, last_modified
+        return self._render_and_store(key, etag, chunks), etag, last_modified
+
+    def _render_and_store(self, key, etag, chunks):
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        with self._lock:
+            self._rendered[key] = (etag, b''.join(parts))
+
+    def _last_modified(self, etag):
+        # When this exact content was first served: a correct Last-Modified
+        # even for URLs without lastmod dates
+        with self._lock:
+            if etag not in self._first_seen:
+                if len(self._first_seen) >= 1024:
+                    self._first_seen.clear()
+                self._first_seen[etag] = datetime.now(timezone.utc).replace(microsecond=0)
+            return self._first_seen[etag]
+
+    def _snapshot(self):
+        snapshot = self._snapshots.get('urls')
+        if snapshot is not None:
+            return snapshot
+
+        entries = list(self._route_entries())
+        for source in self.sources:
+            entries.extend(source())
+
+        shards = [entries[i:i + self.max_urls] for i in range(0, len(entries), self.max_urls)] or [[]]
+        etags = [self._fingerprint(shard) for shard in shards]
+        lastmods = [max((e.lastmod for e in shard if e.lastmod), default=None) for shard in shards]
+        shard_paths = [url_for('main.sitemap_shard', number=i + 1) for i in range(len(shards))]
+
+        snapshot = {
+            'shards': shards,
+            'etags': etags,
+            'lastmods': lastmods,
+            'shard_paths': shard_paths,
+            'index_etag': hashlib.sha1(''.join(etags).encode('ascii')).hexdigest(),
+        }
+        self._snapshots.set('urls', snapshot)
+        return snapshot
+
+    def _route_entries(self):
+        """Yield an entry for each argument-free GET route marked with ``@sitemap_entry``."""
+        for rule in current_app.url_map.iter_rules():
+            view = current_app.view_functions.get(rule.endpoint)
+            meta = getattr(view, 'sitemap', None)
+            if meta is None or rule.arguments or 'GET' not in rule.methods:
+                continue
+            lastmod = meta['lastmod']() if meta['lastmod'] else None
+            yield SitemapEntry(url_for(rule.endpoint), lastmod, meta['priority'], meta['changefreq'])
+
+    @staticmethod
+    def _fingerprint(entries):
+        digest = hashlib.sha1()
+        for entry in entries:
+            lastmod = entry.lastmod.isoformat() if entry.lastmod else ''
+            digest.update(f'{entry.path}|{lastmod}|{entry.priority}|{entry.changefreq}\n'.encode('utf-8'))
+        return digest.hexdigest()
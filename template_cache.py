@@ -0,0 +1,106 @@
+"""
+Persistent Jinja bytecode cache and template warm-up.
+
+Compiled templates are written to ``TEMPLATE_CACHE_DIR`` so new workers
+load bytecode instead of compiling from source. ``warm_templates``
+loads every template up front (including ``errors/``) and records how
+long each one took and whether it came from the bytecode cache.
+"""
+
+import os
+import threading
+import time
+
+import click
+from flask.cli import with_appcontext
+from jinja2 import FileSystemBytecodeCache
+
+
+class CountingBytecodeCache(FileSystemBytecodeCache):
+    """FileSystemBytecodeCache that counts hits and misses."""
+
+    def __init__(self, directory, pattern='__jinja2_%s.cache'):
+        super().__init__(directory, pattern)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load_bytecode(self, bucket):
+        super().load_bytecode(bucket)
+        with self._lock:
+            if bucket.code is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    def stats(self):
+        """Return bytecode cache hits and misses."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+def init_template_cache(app):
+    """
+    Attach the bytecode cache and the ``flask warm-templates`` command.
+
+    Does nothing (beyond the command) if ``TEMPLATE_CACHE_DIR`` is empty.
+    """
+    app.cli.add_command(warm_templates_command)
+
+    directory = app.config.get('TEMPLATE_CACHE_DIR')
+    if not directory:
+        return None
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as e:
+        app.logger.warning(f"Template bytecode cache disabled: {str(e)}")
+        return None
+
+    cache = CountingBytecodeCache(directory)
+    app.jinja_env.bytecode_cache = cache
+    app.extensions['template_cache'] = cache
+    return cache
+
+
+def warm_templates(app):
+    """
+    Load (and compile if needed) every template.
+
+    Args:
+        app: Flask application
+
+    Returns:
+        List of (template name, milliseconds, 'bytecode' or 'compiled')
+    """
+    env = app.jinja_env
+    cache = app.extensions.get('template_cache')
+    timings = []
+
+    for name in env.list_templates(filter_func=lambda n: n.endswith('.html')):
+        hits_before = cache.hits if cache else 0
+        start = time.perf_counter()
+        env.get_template(name)
+        elapsed = (time.perf_counter() - start) * 1000
+        source = 'bytecode' if cache and cache.hits > hits_before else 'compiled'
+        timings.append((name, elapsed, source))
+
+    app.extensions['template_warmup'] = timings
+    total = sum(ms for _, ms, _ in timings)
+    app.logger.info(f"Warmed {len(timings)} templates in {total:.1f} ms")
+    for name, ms, source in timings:
+        app.logger.debug(f"Template {name}: {ms:.2f} ms ({source})")
+    return timings
+
+
+@click.command('warm-templates')
+@with_appcontext
+def warm_templates_command():
+    """Precompile all templates and print per-template load times."""
+    from flask import current_app
+
+    timings = warm_templates(current_app)
+    click.echo(f'{"template":<32} {"ms":>8}  source')
+    for name, ms, source in sorted(timings, key=lambda t: t[1], reverse=True):
+        click.echo(f'{name:<32} {ms:>8.2f}  {source}')
+    click.echo(f'{"total":<32} {sum(ms for _, ms, _ in timings):>8.2f}')
@@ -0,0 +1,118 @@
+"""
+Test suite for the static asset build and precompressed serving.
+"""
+
+import gzip
+import os
+
+import pytest
+from flask import Flask, render_template_string
+
+from assets import minify_css, build_assets, init_assets
+
+
+@pytest.fixture
+def asset_app(tmp_path):
+    """Flask app with a small built static folder."""
+    css_dir = tmp_path / 'css'
+    css_dir.mkdir()
+    (css_dir / 'main.css').write_text('/* theme */\nbody {\n    color: red;\n}\n')
+    build_assets(str(tmp_path), ['css/main.css'])
+
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path='/static')
+    init_assets(app)
+    return app
+
+
+class TestMinifyCss:
+    """Test the CSS minifier."""
+
+    def test_strips_comments_and_whitespace(self):
+        """Test comments, newlines and trailing semicolons are removed."""
+        css = '/* header */\n.nav a:hover,\n.nav a:focus {\n    color: #fff;\n    margin: 0 auto;\n}\n'
+        assert minify_css(css) == '.nav a:hover,.nav a:focus{color:#fff;margin:0 auto}'
+
+    def test_preserves_strings(self):
+        """Test quoted strings keep their spaces and comment-like text."""
+        css = ".a::after { content: ' /* not a comment */ ▼'; }"
+        assert minify_css(css) == ".a::after{content:' /* not a comment */ ▼'}"
+
+    def test_keeps_descendant_pseudo_selectors(self):
+        """Test the space before a pseudo-class selector is not removed."""
+        assert minify_css('.card :focus { outline: 0; }') == '.card :focus{outline:0}'
+
+
+class TestBuildAssets:
+    """Test the hashed build output."""
+
+    def test_writes_hashed_files_and_manifest(self, tmp_path):
+        """Test hashed CSS, gzip sibling and manifest are written."""
+        (tmp_path / 'css').mkdir()
+        (tmp_path / 'css' / 'main.css').write_text('body { color: red; }')
+        manifest = build_assets(str(tmp_path), ['css/main.css'])
+
+        hashed = manifest['css/main.css']
+        assert hashed.startswith('dist/css/main.') and hashed.endswith('.css')
+        assert (tmp_path / hashed).read_text() == 'body{color:red}'
+        with gzip.open(tmp_path / (hashed + '.gz')) as f:
+            assert f.read() == b'body{color:red}'
+        assert (tmp_path / 'dist' / 'manifest.json').exists()
+
+    def test_hash_changes_with_content(self, tmp_path):
+        """Test editing the source gives a new filename."""
+        (tmp_path / 'css').mkdir()
+        source = tmp_path / 'css' / 'main.css'
+        source.write_text('body { color: red; }')
+        first = build_assets(str(tmp_path), ['css/main.css'])['css/main.css']
+        source.write_text('body { color: blue; }')
+        second = build_assets(str(tmp_path), ['css/main.css'])['css/main.css']
+        assert first != second
+
+
+class TestAssetServing:
+    """Test url_for resolution and precompressed responses."""
+
+    def test_url_for_resolves_hashed_name(self, asset_app):
+        """Test templates get the fingerprinted URL."""
+        with asset_app.test_request_context():
+            url = render_template_string("{{ url_for('static', filename='css/main.css') }}")
+        assert url == '/static/' + asset_app.extensions['asset_manifest']['css/main.css']
+
+    def test_serves_gzip_when_accepted(self, asset_app):
+        """Test the .gz sibling is sent with immutable caching."""
+        hashed = asset_app.extensions['asset_manifest']['css/main.css']
+        response = asset_app.test_client().get(f'/static/{hashed}', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype == 'text/css'
+        assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert gzip.decompress(response.data) == b'body{color:red}'
+        response.close()
+
+    def test_serves_identity_without_accept_encoding(self, asset_app):
+        """Test clients that do not accept gzip get the plain file."""
+        hashed = asset_app.extensions['asset_manifest']['css/main.css']
+        response = asset_app.test_client().get(f'/static/{hashed}', headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in response.headers
+        assert response.data == b'body{color:red}'
+        response.close()
+
+    def test_unbuilt_files_use_default_view(self, asset_app):
+        """Test source files are still served normally."""
+        response = asset_app.test_client().get('/static/css/main.css')
+        assert response.status_code == 200
+        assert 'immutable' not in response.headers.get('Cache-Control', '')
+        response.close()
+
+    def test_no_manifest_is_noop(self, tmp_path):
+        """Test nothing changes when assets were not built."""
+        app = Flask(__name__, static_folder=str(tmp_path), static_url_path='/static')
+        init_assets(app)
+        assert app.extensions['asset_manifest'] == {}
+        assert 'url_for' in app.jinja_env.globals
+        assert app.jinja_env.globals['url_for'].__name__ == 'url_for'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -108,6 +108,75 @@ class TestAuthentication:
         # Clean up
         db.users.delete_one({'email': 'login@example.com'})
     
+    def test_login_succeeds_when_rehash_pool_busy(self, client, db, monkeypatch):
+        """Test a saturated hashing pool skips the optional rehash instead of failing login."""
+        from passwords import PasswordHasherBusy, password_hasher
+
+        User.create(db, 'rehash@example.com', 'Test123!@#', 'Rehash User')
+        monkeypatch.setattr(password_hasher, 'needs_rehash', lambda stored_hash: True)
+
+        def saturated(*args, **kwargs):
+            raise PasswordHasherBusy('pool saturated')
+        monkeypatch.setattr(password_hasher, 'hash', saturated)
+
+        response = client.post('/login', data={
+            'email': 'rehash@example.com',
+            'password': 'Test123!@#'
+        })
+
+        assert response.status_code == 302
+        assert '/dashboard' in response.headers['Location']
+
+        # Clean up
+        db.users.delete_one({'email': 'rehash@example.com'})
+
+    def test_login_rehashes_at_configured_cost(self, client, db, monkeypatch):
+        """Test a hash at another cost is rewritten with the target password_rounds."""
+        from passwords import get_rounds, password_hasher
+        
+        monkeypatch.setattr(password_hasher, 'rounds', 5)
+        db.users.insert_one({
+            'email': 'oldcost@example.com',
+            'name': 'Old Cost User',
+            'password_hash': password_hasher.hash('Test123!@#', rounds=4),
+            'password_rounds': 4
+        })
+        
+        response = client.post('/login', data={
+            'email': 'oldcost@example.com',
+            'password': 'Test123!@#'
+        })
+        
+        assert response.status_code == 302
+        user = User.find_by_email(db, 'oldcost@example.com')
+        assert get_rounds(user['password_hash']) == 5
+        assert user['password_rounds'] == 5
+        assert User.verify_password(user['password_hash'], 'Test123!@#')
+        
+        # Clean up
+        db.users.delete_one({'email': 'oldcost@example.com'})
+    
+    def test_rehash_skipped_if_hash_changed(self, db, monkeypatch):
+        """Test the rehash never overwrites a password changed since it was read."""
+        from passwords import password_hasher
+        
+        monkeypatch.setattr(password_hasher, 'rounds', 5)
+        db.users.insert_one({
+            'email': 'raced@example.com',
+            'name': 'Raced User',
+            'password_hash': password_hasher.hash('Test123!@#', rounds=4),
+            'password_rounds': 4
+        })
+        stale = User.find_by_email(db, 'raced@example.com')
+        User.update_password(db, stale['_id'], 'NewPass123!@#')
+        
+        assert User.rehash_password_if_needed(db, stale, 'Test123!@#') is False
+        user = User.find_by_email(db, 'raced@example.com')
+        assert User.verify_password(user['password_hash'], 'NewPass123!@#')
+        
+        # Clean up
+        db.users.delete_one({'email': 'raced@example.com'})
+    
     def test_login_wrong_password(self, client, db):
         """Test login fails with wrong password."""
         # Create test user
@@ -155,6 +224,57 @@ class TestAuthentication:
         response = client.get('/dashboard', follow_redirects=True)
         assert b'login' in response.data.lower() or response.status_code == 200
     
+    def test_password_reset_clears_lockout(self, client, db):
+        """Test resetting the password ends a lockout from failed attempts."""
+        from datetime import datetime, timedelta
+        from lockout import lockout_cache
+        from models import LoginAttempt, PasswordResetToken
+
+        user_id = User.create(db, 'locked@example.com', 'Test123!@#', 'Locked User')
+        for _ in range(LoginAttempt.MAX_FAILURES):
+            LoginAttempt.register_attempt(db, 'locked@example.com', '127.0.0.1')
+        lockout_cache.lock('locked@example.com', datetime.utcnow() + timedelta(minutes=15))
+        PasswordResetToken.create(db, user_id, 'reset-token', datetime.utcnow() + timedelta(hours=1))
+
+        response = client.post('/reset-password/reset-token', data={
+            'password': 'NewPass123!@#',
+            'confirm_password': 'NewPass123!@#'
+        })
+
+        assert response.status_code == 302
+        assert lockout_cache.get_unlock_time('locked@example.com') is None
+        assert db.login_attempts.find_one({'_id': 'locked@example.com'}) is None
+
+        # Clean up
+        db.users.delete_one({'email': 'locked@example.com'})
+        db.password_reset_tokens.delete_many({'token': 'reset-token'})
+
+    def test_lockout_message_uses_real_unlock_time(self, client, db):
+        """Test spread-out failures report the remaining wait, not a fixed 15 minutes."""
+        from datetime import datetime, timedelta
+        from lockout import lockout_cache
+        from models import LoginAttempt
+
+        User.create(db, 'spread@example.com', 'Test123!@#', 'Spread User')
+        now = datetime.utcnow()
+        db.login_attempts.insert_one({
+            '_id': 'spread@example.com',
+            'failures': [now - timedelta(minutes=m) for m in (14, 13, 12, 11)],
+            'expires_at': now + timedelta(minutes=LoginAttempt.WINDOW_MINUTES)
+        })
+
+        response = client.post('/login', data={
+            'email': 'spread@example.com',
+            'password': 'WrongPassword123!@#'
+        })
+
+        assert b'Account locked for 1 minute.' in response.data
+
+        # Clean up
+        lockout_cache.unlock('spread@example.com')
+        LoginAttempt.clear_attempts(db, 'spread@example.com')
+        db.users.delete_one({'email': 'spread@example.com'})
+
     def test_forgot_password_page(self, client):
         """Test forgot password page loads."""
         response = client.get('/forgot-password')
@@ -178,5 +298,137 @@ class TestAuthentication:
         db.users.delete_one({'email': 'hash@example.com'})
 
 
+class TestIdentityCache:
+    """Test the user identity cache behind the Flask-Login user loader."""
+    
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        """Start and end each test with an empty identity cache."""
+        from models import user_identity_cache
+        user_identity_cache.clear()
+        yield
+        user_identity_cache.clear()
+    
+    def test_identity_has_no_password_hash(self, db):
+        """Test the projection only returns id, email and name."""
+        user_id = User.create(db, 'identity@example.com', 'Test123!@#', 'Identity User')
+        
+        identity = User.find_identity(db, str(user_id))
+        
+        assert set(identity) == {'_id', 'email', 'name'}
+        assert 'password_hash' not in identity
+        
+        db.users.delete_one({'_id': user_id})
+    
+    def test_second_load_served_from_cache(self, db):
+        """Test a cached identity is returned without touching the database."""
+        user_id = User.create(db, 'cached@example.com', 'Test123!@#', 'Cached User')
+        first = User.find_identity(db, str(user_id))
+        
+        # No database at all: any query would fail
+        assert User.find_identity(None, str(user_id)) == first
+        
+        db.users.delete_one({'_id': user_id})
+    
+    def test_update_password_evicts_identity(self, db):
+        """Test changing the password drops the cached identity."""
+        from models import user_identity_cache
+        
+        user_id = User.create(db, 'evict@example.com', 'Test123!@#', 'Evict User')
+        User.find_identity(db, str(user_id))
+        assert user_identity_cache.get(str(user_id)) is not None
+        
+        User.update_password(db, user_id, 'NewPass123!@#')
+        
+        assert user_identity_cache.get(str(user_id)) is None
+        
+        db.users.delete_one({'_id': user_id})
+    
+    def test_unknown_user_not_cached(self, db):
+        """Test a missing user is looked up again rather than cached as absent."""
+        from bson import ObjectId
+        from models import user_identity_cache
+        
+        user_id = ObjectId()
+        assert User.find_identity(db, str(user_id)) is None
+        assert len(user_identity_cache) == 0
+        
+        db.users.insert_one({'_id': user_id, 'email': 'late@example.com', 'name': 'Late User'})
+        assert User.find_identity(db, str(user_id))['email'] == 'late@example.com'
+        
+        db.users.delete_one({'_id': user_id})
+
+
+class TestLoginAttempt:
+    """Test the sliding-window failed login counter."""
+    
+    def test_fifth_failure_returns_unlock_time(self, db):
+        """Test failures are counted and the limit-reaching one sets unlock_at."""
+        from datetime import timedelta
+        from models import LoginAttempt
+        
+        results = [LoginAttempt.register_attempt(db, 'count@example.com', '127.0.0.1')
+                   for _ in range(LoginAttempt.MAX_FAILURES)]
+        
+        assert [r['failures'] for r in results] == list(range(1, LoginAttempt.MAX_FAILURES + 1))
+        assert not any(r['locked'] for r in results)
+        assert all(r['unlock_at'] is None for r in results[:-1])
+        first = db.login_attempts.find_one({'_id': 'count@example.com'})['failures'][0]
+        assert results[-1]['unlock_at'] == first + timedelta(minutes=LoginAttempt.WINDOW_MINUTES)
+        
+        LoginAttempt.clear_attempts(db, 'count@example.com')
+    
+    def test_attempt_while_locked_not_counted(self, db):
+        """Test attempts during a lockout report locked and are not appended."""
+        from models import LoginAttempt
+        
+        for _ in range(LoginAttempt.MAX_FAILURES):
+            LoginAttempt.register_attempt(db, 'locked@example.com', '127.0.0.1')
+        before = db.login_attempts.find_one({'_id': 'locked@example.com'})
+        
+        result = LoginAttempt.register_attempt(db, 'locked@example.com', '127.0.0.1')
+        after = db.login_attempts.find_one({'_id': 'locked@example.com'})
+        
+        assert result['locked'] is True
+        assert result['failures'] == LoginAttempt.MAX_FAILURES
+        assert after['failures'] == before['failures']
+        # The TTL stays tied to the failures that caused the lockout
+        assert after['expires_at'] == before['expires_at']
+        
+        LoginAttempt.clear_attempts(db, 'locked@example.com')
+    
+    def test_old_failures_slide_out(self, db):
+        """Test failures older than the window no longer count."""
+        from datetime import datetime, timedelta
+        from models import LoginAttempt
+        
+        now = datetime.utcnow()
+        old = now - timedelta(minutes=LoginAttempt.WINDOW_MINUTES + 1)
+        db.login_attempts.insert_one({
+            '_id': 'slide@example.com',
+            'failures': [old] * LoginAttempt.MAX_FAILURES,
+            'expires_at': now
+        })
+        
+        result = LoginAttempt.register_attempt(db, 'slide@example.com', '127.0.0.1')
+        
+        assert result == {'locked': False, 'failures': 1, 'unlock_at': None}
+        
+        LoginAttempt.clear_attempts(db, 'slide@example.com')
+    
+    def test_clear_attempts_resets_counter(self, db):
+        """Test clear_attempts starts the count over."""
+        from models import LoginAttempt
+        
+        for _ in range(3):
+            LoginAttempt.register_attempt(db, 'clear@example.com', '127.0.0.1')
+        LoginAttempt.clear_attempts(db, 'clear@example.com')
+        
+        assert db.login_attempts.find_one({'_id': 'clear@example.com'}) is None
+        assert LoginAttempt.register_attempt(db, 'clear@example.com', '127.0.0.1')['failures'] == 1
+        
+        LoginAttempt.clear_attempts(db, 'clear@example.com')
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -0,0 +1,69 @@
+"""
+Test suite for the disposable domain blocklist.
+"""
+
+import os
+
+import pytest
+
+from blocklist import DomainBlocklist, disposable_domains
+
+
+@pytest.fixture
+def blocklist_file(tmp_path):
+    """Write a small blocklist file."""
+    path = tmp_path / 'domains.txt'
+    path.write_text('# comment\nmailinator.com\nYopmail.com  # inline comment\n\n', encoding='utf-8')
+    return path
+
+
+class TestDomainBlocklist:
+    """Test blocklist matching and reloading."""
+
+    def test_exact_match(self, blocklist_file):
+        """Test listed domains are blocked regardless of case."""
+        blocklist = DomainBlocklist(str(blocklist_file))
+        assert blocklist.is_blocked('mailinator.com')
+        assert blocklist.is_blocked('YOPMAIL.COM')
+        assert len(blocklist) == 2
+
+    def test_subdomain_match(self, blocklist_file):
+        """Test subdomains of listed domains are blocked."""
+        blocklist = DomainBlocklist(str(blocklist_file))
+        assert blocklist.is_blocked('x.mailinator.com')
+        assert blocklist.is_blocked('a.b.mailinator.com')
+
+    def test_unrelated_domains_allowed(self, blocklist_file):
+        """Test similar-looking domains are not blocked."""
+        blocklist = DomainBlocklist(str(blocklist_file))
+        assert not blocklist.is_blocked('gmail.com')
+        assert not blocklist.is_blocked('notmailinator.com')
+        assert not blocklist.is_blocked('com')
+
+    def test_hot_reload(self, blocklist_file):
+        """Test changes to the file are picked up without a restart."""
+        blocklist = DomainBlocklist(str(blocklist_file), check_interval=0)
+        assert not blocklist.is_blocked('newspam.example')
+
+        blocklist_file.write_text('newspam.example\n', encoding='utf-8')
+        stat = os.stat(blocklist_file)
+        os.utime(blocklist_file, (stat.st_atime, stat.st_mtime + 10))
+
+        assert blocklist.is_blocked('newspam.example')
+        assert not blocklist.is_blocked('mailinator.com')
+
+    def test_missing_file_keeps_old_list(self, blocklist_file):
+        """Test a missing file does not clear the loaded list."""
+        blocklist = DomainBlocklist(str(blocklist_file))
+        blocklist_file.unlink()
+        assert not blocklist.reload()
+        assert blocklist.is_blocked('mailinator.com')
+
+    def test_bundled_list_loads(self):
+        """Test the bundled blocklist contains the common providers."""
+        assert disposable_domains.is_blocked('mailinator.com')
+        assert disposable_domains.is_blocked('tempmail.com')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
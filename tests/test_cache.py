@@ -0,0 +1,58 @@
+"""
+Test suite for the in-process caches.
+"""
+
+import time
+
+import pytest
+
+from cache import TTLCache
+
+
+class TestTTLCache:
+    """Test TTL and LRU behaviour."""
+
+    def test_get_and_set(self):
+        """Test stored values are returned and counted as hits."""
+        cache = TTLCache()
+        assert cache.get('a') is None
+        cache.set('a', 1)
+        assert cache.get('a') == 1
+        assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1}
+
+    def test_entries_expire(self):
+        """Test entries are dropped after their TTL."""
+        cache = TTLCache(ttl=0.05)
+        cache.set('a', 1)
+        time.sleep(0.1)
+        assert cache.get('a', 'gone') == 'gone'
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted."""
+        cache = TTLCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+
+    def test_zero_ttl_disables(self):
+        """Test a TTL of zero stores nothing."""
+        cache = TTLCache(ttl=0)
+        cache.set('a', 1)
+        assert cache.get('a') is None
+
+    def test_delete(self):
+        """Test explicit invalidation."""
+        cache = TTLCache()
+        cache.set('a', 1)
+        cache.delete('a')
+        cache.delete('missing')
+        assert cache.get('a') is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,101 @@
+"""
+Test suite for the services catalog.
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+from catalog import ServiceCatalog, service_catalog
+
+
+SERVICES = [
+    {'id': 'fabric-recycling', 'name': 'Fabric Recycling', 'description': 'Recycle.', 'pricing': 'Quote.'},
+    {'id': 'consulting', 'name': 'Consulting', 'description': 'Advice.', 'pricing': 'Daily rate.'},
+]
+
+
+@pytest.fixture
+def catalog_file(tmp_path):
+    """Catalog JSON file on disk."""
+    path = tmp_path / 'services.json'
+    path.write_text(json.dumps(SERVICES))
+    return path
+
+
+def touch_later(path):
+    """Move a file's mtime forward so the change is always detected."""
+    future = time.time() + 10
+    os.utime(path, (future, future))
+
+
+class TestServiceCatalog:
+    """Test loading and lookups."""
+
+    def test_bundled_catalog(self):
+        """Test the shipped catalog loads with unique ids."""
+        services = service_catalog.all()
+        assert len(services) == 5
+        assert len({service.id for service in services}) == 5
+        assert service_catalog.get('fabric-recycling').name == 'Fabric Recycling'
+
+    def test_lookup_by_id_and_name(self, catalog_file):
+        """Test services resolve by id or display name."""
+        catalog = ServiceCatalog(str(catalog_file))
+        assert catalog.resolve('consulting').name == 'Consulting'
+        assert catalog.resolve('Fabric Recycling').id == 'fabric-recycling'
+        assert catalog.resolve('Free Money') is None
+        assert 'Consulting' in catalog
+
+    def test_index_is_read_only(self, catalog_file):
+        """Test the loaded catalog cannot be modified in place."""
+        catalog = ServiceCatalog(str(catalog_file))
+        with pytest.raises(TypeError):
+            catalog._by_id['new'] = None
+        with pytest.raises(AttributeError):
+            catalog.get('consulting').name = 'Changed'
+
+    def test_reloads_on_change(self, catalog_file):
+        """Test edits to the file are picked up."""
+        catalog = ServiceCatalog(str(catalog_file), check_interval=0)
+        catalog_file.write_text(json.dumps(SERVICES + [
+            {'id': 'repairs', 'name': 'Repairs', 'description': 'Fix.', 'pricing': 'Free.'}
+        ]))
+        touch_later(catalog_file)
+        assert catalog.get('repairs') is not None
+
+    def test_invalid_file_keeps_old_catalog(self, catalog_file):
+        """Test a broken file does not empty the catalog."""
+        catalog = ServiceCatalog(str(catalog_file), check_interval=0)
+        catalog_file.write_text('not json')
+        touch_later(catalog_file)
+        assert len(catalog.all()) == 2
+
+
+class TestFragments:
+    """Test pre-rendered service fragments."""
+
+    def test_rendered_once_per_version(self, catalog_file):
+        """Test fragments are reused until the catalog changes."""
+        catalog = ServiceCatalog(str(catalog_file), check_interval=0)
+        calls = []
+
+        def render(service):
+            calls.append(service.id)
+            return f'<h2>{service.name}</h2>'
+
+        first = catalog.fragments(render)
+        assert first['consulting'] == '<h2>Consulting</h2>'
+        assert catalog.fragments(render) is first
+        assert len(calls) == 2
+
+        catalog_file.write_text(json.dumps(SERVICES[:1]))
+        touch_later(catalog_file)
+        assert list(catalog.fragments(render)) == ['fabric-recycling']
+        assert len(calls) == 3
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,132 @@
+"""
+Test suite for the response compression middleware.
+"""
+
+import gzip
+
+import pytest
+from flask import Flask, Response
+
+import compression
+from compression import CompressionMiddleware
+
+
+PAGE = '<html><body>' + 'Reborn fabrics. Reborn future. ' * 100 + '</body></html>'
+
+
+@pytest.fixture
+def compressed_app():
+    """Small Flask app wrapped in the middleware."""
+    app = Flask(__name__)
+
+    @app.route('/page')
+    def page():
+        return PAGE
+
+    @app.route('/tiny')
+    def tiny():
+        return 'ok'
+
+    @app.route('/image')
+    def image():
+        return Response(b'\x89PNG' * 500, mimetype='image/png')
+
+    @app.route('/private')
+    def private():
+        return Response(PAGE, headers={'Cache-Control': 'private, no-cache'})
+
+    @app.route('/etag')
+    def etag():
+        response = Response(PAGE)
+        response.set_etag('abc')
+        return response
+
+    @app.route('/stream')
+    def stream():
+        return Response((f'<p>{i}</p>' for i in range(200)), mimetype='text/html')
+
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app, min_size=500, cache_size=8)
+    return app
+
+
+@pytest.fixture
+def no_brotli(monkeypatch):
+    """Force the gzip path even if brotli is installed."""
+    monkeypatch.setattr(compression, 'brotli', None)
+
+
+class TestCompression:
+    """Test which responses are compressed and how."""
+
+    def test_gzip_html(self, compressed_app, no_brotli):
+        """Test large HTML is gzipped with the right headers."""
+        response = compressed_app.test_client().get('/page', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert int(response.headers['Content-Length']) == len(response.data)
+        assert gzip.decompress(response.data).decode() == PAGE
+
+    def test_brotli_preferred(self, compressed_app):
+        """Test brotli is used when installed and accepted."""
+        brotli = pytest.importorskip('brotli')
+        response = compressed_app.test_client().get('/page', headers={'Accept-Encoding': 'gzip, br'})
+        assert response.headers['Content-Encoding'] == 'br'
+        assert brotli.decompress(response.data).decode() == PAGE
+
+    def test_not_accepted(self, compressed_app):
+        """Test clients without Accept-Encoding get the plain body."""
+        response = compressed_app.test_client().get('/page')
+        assert 'Content-Encoding' not in response.headers
+        assert response.data.decode() == PAGE
+
+    def test_below_threshold(self, compressed_app, no_brotli):
+        """Test small bodies are sent as-is."""
+        response = compressed_app.test_client().get('/tiny', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+        assert response.data == b'ok'
+
+    def test_content_type_not_allowed(self, compressed_app, no_brotli):
+        """Test content types off the allowlist are skipped."""
+        response = compressed_app.test_client().get('/image', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+
+    def test_etag_weakened(self, compressed_app, no_brotli):
+        """Test strong ETags on compressed bodies become weak."""
+        client = compressed_app.test_client()
+        response = client.get('/etag', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['ETag'] == 'W/"abc"'
+
+    def test_streaming(self, compressed_app, no_brotli):
+        """Test bodies without Content-Length are compressed as they stream."""
+        response = compressed_app.test_client().get('/stream', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+        expected = ''.join(f'<p>{i}</p>' for i in range(200))
+        assert gzip.decompress(response.data).decode() == expected
+
+
+class TestCompressedCache:
+    """Test repeat hits skip recompression."""
+
+    def test_repeat_hit_served_from_cache(self, compressed_app, no_brotli):
+        """Test the second identical response is a cache hit."""
+        client = compressed_app.test_client()
+        first = client.get('/page', headers={'Accept-Encoding': 'gzip'}).data
+        second = client.get('/page', headers={'Accept-Encoding': 'gzip'}).data
+        assert first == second
+
+        stats = compressed_app.wsgi_app.stats()
+        assert stats['compressed'] == 2
+        assert stats['cache_hits'] == 1
+        assert stats['bytes_out'] < stats['bytes_in']
+
+    def test_private_responses_not_cached(self, compressed_app, no_brotli):
+        """Test per-user responses are always compressed fresh."""
+        client = compressed_app.test_client()
+        client.get('/private', headers={'Accept-Encoding': 'gzip'})
+        client.get('/private', headers={'Accept-Encoding': 'gzip'})
+        assert compressed_app.wsgi_app.stats()['cache_hits'] == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
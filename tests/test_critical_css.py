@@ -0,0 +1,155 @@
+"""
+Test suite for critical CSS extraction and inlining.
+"""
+
+import os
+import time
+
+import pytest
+from flask import Flask, render_template
+
+from critical_css import UsedSelectors, CriticalCSS, extract_critical_css, above_the_fold
+
+
+CSS = """
+body { margin: 0; animation: fade 1s; }
+@keyframes fade { from { opacity: 0; } to { opacity: 1; } }
+@keyframes unused { from { opacity: 0; } }
+.hero { color: green; }
+.hero .title, .footer { font-weight: bold; }
+.footer { color: grey; }
+.flash-error { color: red; }
+#main-content:focus { outline: 0; }
+@media (min-width: 768px) { .hero { padding: 2rem; } .footer { padding: 1rem; } }
+"""
+
+LAYOUT = """<html><body>
+<header class="hero"><h1 class="title">Hi</h1></header>
+<div class="flash-{{ category }}">{{ message }}</div>
+<main id="main-content">{% block content %}{% endblock %}</main>
+<footer class="footer">Bye</footer>
+</body></html>"""
+
+PAGE = """{% extends "layout.html" %}
+{% block content %}<section class="intro">Intro</section><section class="below">More</section>{% endblock %}"""
+
+
+class TestExtraction:
+    """Test which rules are kept."""
+
+    def test_keeps_used_rules_only(self):
+        """Test rules for markup outside the fold are dropped."""
+        css = extract_critical_css(CSS, above_the_fold(LAYOUT, is_layout=True))
+        assert '.hero{color:green}' in css
+        assert '.hero .title{font-weight:bold}' in css
+        assert '.footer' not in css
+
+    def test_media_queries_filtered(self):
+        """Test rules inside @media are filtered individually."""
+        css = extract_critical_css(CSS, '<div class="hero"></div>')
+        assert '@media (min-width:768px){.hero{padding:2rem}}' in css
+
+    def test_only_referenced_keyframes_kept(self):
+        """Test animations used by kept rules survive and others are dropped."""
+        css = extract_critical_css(CSS, '<div></div>')
+        assert '@keyframes fade' in css
+        assert '@keyframes unused' not in css
+
+    def test_dynamic_class_prefix(self):
+        """Test Jinja-built class names match by prefix."""
+        used = UsedSelectors('<div class="flash-{{ category }}"></div>')
+        assert used.matches('.flash-error')
+        assert not used.matches('.alert')
+
+    def test_ids_and_pseudo_classes(self):
+        """Test ids match and pseudo-classes are ignored."""
+        used = UsedSelectors('<main id="main-content"></main>')
+        assert used.matches('#main-content:focus')
+        assert used.matches('main:not(.x)')
+        assert not used.matches('#other')
+
+    def test_above_the_fold_stops_after_first_section(self):
+        """Test only the first section of page content is considered."""
+        markup = above_the_fold(PAGE, is_layout=False)
+        assert 'intro' in markup
+        assert 'below' not in markup
+
+
+@pytest.fixture
+def critical_app(tmp_path):
+    """Flask app with a layout, a page and a stylesheet on disk."""
+    (tmp_path / 'templates').mkdir()
+    (tmp_path / 'templates' / 'layout.html').write_text(
+        '<html><head><style>{{ critical_css }}</style></head>'
+        '<body><div class="hero"></div>{% block content %}{% endblock %}</body></html>'
+    )
+    (tmp_path / 'templates' / 'page.html').write_text(PAGE)
+    (tmp_path / 'static' / 'css').mkdir(parents=True)
+    (tmp_path / 'static' / 'css' / 'main.css').write_text(CSS)
+
+    app = Flask(__name__, root_path=str(tmp_path))
+    CriticalCSS(app, stylesheet='css/main.css', check_interval=0)
+    return app
+
+
+class TestCriticalCSS:
+    """Test per-template caching and template injection."""
+
+    def test_injected_into_template_context(self, critical_app):
+        """Test rendered pages get the critical CSS."""
+        with critical_app.test_request_context():
+            html = render_template('page.html')
+        assert '.hero{color:green}' in html
+        assert '.footer' not in html
+
+    def test_layout_alone_gets_nothing(self, critical_app):
+        """Test a template that extends nothing is not treated as a page."""
+        assert critical_app.extensions['critical_css'].for_template('layout.html') == ''
+
+    def test_cached_until_stylesheet_changes(self, critical_app, tmp_path):
+        """Test the extraction is reused and rebuilt when main.css changes."""
+        critical = critical_app.extensions['critical_css']
+        first = critical.for_template('page.html')
+        assert critical.for_template('page.html') is first
+
+        css_path = tmp_path / 'static' / 'css' / 'main.css'
+        css_path.write_text(CSS + '.intro { color: blue; }')
+        future = time.time() + 10
+        os.utime(css_path, (future, future))
+        assert '.intro{color:blue}' in critical.for_template('page.html')
+
+    def test_rebuilt_when_template_changes(self, critical_app, tmp_path):
+        """Test editing the page template invalidates its entry."""
+        critical = critical_app.extensions['critical_css']
+        assert '.footer' not in critical.for_template('page.html')
+
+        page_path = tmp_path / 'templates' / 'page.html'
+        page_path.write_text(PAGE.replace('class="intro"', 'class="footer"'))
+        future = time.time() + 10
+        os.utime(page_path, (future, future))
+        assert '.footer{color:grey}' in critical.for_template('page.html')
+
+    def test_changes_checked_once_per_interval(self, critical_app, tmp_path, monkeypatch):
+        """Test files are not stat'ed again until check_interval has passed."""
+        import critical_css
+
+        critical = critical_app.extensions['critical_css']
+        critical.check_interval = 30
+        now = [1000.0]
+        monkeypatch.setattr(critical_css.time, 'monotonic', lambda: now[0])
+        first = critical.for_template('page.html')
+
+        css_path = tmp_path / 'static' / 'css' / 'main.css'
+        css_path.write_text(CSS + '.intro { color: blue; }')
+        future = time.time() + 10
+        os.utime(css_path, (future, future))
+        monkeypatch.setattr(critical_css.os.path, 'getmtime', lambda path: pytest.fail('stat within interval'))
+        assert critical.for_template('page.html') is first
+
+        monkeypatch.undo()
+        monkeypatch.setattr(critical_css.time, 'monotonic', lambda: now[0] + 31)
+        assert '.intro{color:blue}' in critical.for_template('page.html')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
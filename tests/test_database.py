@@ -0,0 +1,80 @@
+"""
+Test suite for the lazy MongoDB connection helpers.
+"""
+
+import pytest
+
+from database import (
+    MongoConnection, LazyDatabase, PoolStatsListener, client_options
+)
+
+
+class TestMongoConnection:
+    """Test lazy client creation and options."""
+
+    def test_no_client_until_first_use(self):
+        """Test creating the connection does not build a client."""
+        connection = MongoConnection('mongodb://localhost:27017', 'ecoreborn_test')
+        db = LazyDatabase(connection)
+        assert connection._client is None
+
+        assert db['users'].name == 'users'
+        assert connection._client is not None
+
+    def test_client_options(self):
+        """Test config keys map to MongoClient options."""
+        options = client_options({
+            'MONGODB_MAX_POOL_SIZE': 20,
+            'MONGODB_READ_PREFERENCE': 'secondaryPreferred',
+            'MONGODB_COMPRESSORS': 'zlib'
+        })
+        assert options['maxPoolSize'] == 20
+        assert options['readPreference'] == 'secondaryPreferred'
+        assert options['compressors'] == 'zlib'
+        assert 'compressors' not in client_options({})
+
+    def test_max_time_ms_per_app(self):
+        """Test models read maxTimeMS from the current app, not a module global."""
+        from flask import Flask
+        from models import DEFAULT_MAX_TIME_MS, _max_time_ms
+
+        fast, slow = Flask('fast'), Flask('slow')
+        fast.config['MONGODB_MAX_TIME_MS'] = 100
+        slow.config['MONGODB_MAX_TIME_MS'] = 5000
+        with fast.app_context():
+            assert _max_time_ms() == 100
+        with slow.app_context():
+            assert _max_time_ms() == 5000
+        assert _max_time_ms() == DEFAULT_MAX_TIME_MS
+
+
+class TestPoolStatsListener:
+    """Test connection pool statistics."""
+
+    def test_checkout_tracking(self):
+        """Test in-use and peak counts follow checkouts and check-ins."""
+        stats = PoolStatsListener()
+        for _ in range(3):
+            stats.connection_created(None)
+        for _ in range(2):
+            stats.connection_check_out_started(None)
+            stats.connection_checked_out(None)
+        stats.connection_checked_in(None)
+
+        snapshot = stats.snapshot()
+        assert snapshot['open'] == 3
+        assert snapshot['in_use'] == 1
+        assert snapshot['idle'] == 2
+        assert snapshot['peak_in_use'] == 2
+        assert snapshot['checkouts'] == 2
+
+    def test_reset(self):
+        """Test counters can be reset."""
+        stats = PoolStatsListener()
+        stats.connection_created(None)
+        stats.reset()
+        assert stats.snapshot()['open'] == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
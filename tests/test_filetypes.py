@@ -0,0 +1,89 @@
+"""
+Test suite for magic-byte file type detection.
+"""
+
+import io
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from filetypes import SNIFF_BYTES, content_matches, is_text, sniff
+
+
+PNG = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR'
+DOCX = b'PK\x03\x04\x14\x00\x06\x00' + b'\x00' * 22 + b'[Content_Types].xml'
+
+
+class TestSniff:
+    """Test type detection from leading bytes."""
+
+    @pytest.mark.parametrize('head, kind', [
+        (b'%PDF-1.4\n%\xe2\xe3\xcf\xd3', 'pdf'),
+        (PNG, 'png'),
+        (b'\xff\xd8\xff\xe1\x00\x18Exif', 'jpg'),
+        (b'GIF87a\x01\x00', 'gif'),
+        (b'GIF89a\x01\x00', 'gif'),
+        (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1\x00\x00', 'doc'),
+        (DOCX, 'docx'),
+        (b'Hello,\r\nplain text\twith tabs\n', 'txt'),
+        ('Café — naïve'.encode('utf-8'), 'txt'),
+        ('UTF-16 note'.encode('utf-16'), 'txt'),
+    ])
+    def test_known_types(self, head, kind):
+        """Test each allowed type is recognised."""
+        assert sniff(head, complete=True) == kind
+
+    @pytest.mark.parametrize('head', [
+        b'',
+        b'MZ\x90\x00\x03\x00\x00\x00',  # Windows executable
+        b'PK\x03\x04' + b'\x00' * 26 + b'xl/workbook.xml',  # Spreadsheet, not docx
+        b'\x7fELF\x02\x01\x01',
+    ])
+    def test_unknown_types(self, head):
+        """Test other payloads are not recognised."""
+        assert sniff(head, complete=True) is None
+
+    def test_truncated_utf8_at_window_edge(self):
+        """Test a multi-byte character cut off by the window is still text."""
+        head = ('a' * (SNIFF_BYTES - 1) + 'é').encode('utf-8')[:SNIFF_BYTES]
+        assert is_text(head)
+
+
+class TestContentMatches:
+    """Test extension versus content checks."""
+
+    def test_matching(self):
+        """Test content matching the extension passes (jpeg aliases jpg)."""
+        assert content_matches('photo.JPEG', b'\xff\xd8\xff\xe0', complete=True)
+        assert content_matches('diagram.png', PNG, complete=True)
+        assert content_matches('letter.docx', DOCX)
+
+    def test_mismatched(self):
+        """Test a renamed executable or image is rejected."""
+        assert not content_matches('invoice.pdf', b'MZ\x90\x00', complete=True)
+        assert not content_matches('notes.txt', PNG, complete=True)
+        assert not content_matches('script.exe', b'plain text', complete=True)
+        assert not content_matches('noextension', b'plain text', complete=True)
+
+
+class TestContactFormValidator:
+    """Test the ContactForm attachment content check."""
+
+    def test_rejects_mismatched_attachment(self):
+        """Test the validator reads a bounded head from non-streamed uploads."""
+        from wtforms.validators import ValidationError
+        from forms import validate_file_content
+
+        class Field:
+            data = FileStorage(io.BytesIO(b'MZ\x90\x00' + b'\x00' * 10000), filename='cv.pdf')
+
+        with pytest.raises(ValidationError):
+            validate_file_content(None, Field)
+        assert Field.data.stream.tell() == 0
+
+        Field.data = FileStorage(io.BytesIO(b'%PDF-1.7\n'), filename='cv.pdf')
+        validate_file_content(None, Field)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
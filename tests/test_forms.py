@@ -116,7 +116,7 @@ class TestServiceRequestForm:
         """Test that phone and company are optional."""
         with app.test_request_context():
             form = ServiceRequestForm(data={
-                'service_name': 'Consulting',
+                'service_name': 'Consulting for Textile Brands',
                 'name': 'Test User',
                 'email': 'test@example.com',
                 'phone': '',
@@ -0,0 +1,80 @@
+"""
+Test suite for the {% cache %} template fragment tag.
+"""
+
+import pytest
+from jinja2 import Environment
+
+from app import create_app
+from fragment_cache import FragmentCacheExtension, fragment_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_fragments():
+    """Start every test with an empty fragment cache."""
+    fragment_cache.configure(max_entries=256, ttl=3600)
+    fragment_cache.clear()
+    yield
+    fragment_cache.clear()
+
+
+@pytest.fixture
+def env():
+    """Jinja environment with the cache tag and a render counter."""
+    calls = []
+    environment = Environment(extensions=[FragmentCacheExtension], autoescape=True)
+    environment.globals['count'] = lambda: calls.append(1) or len(calls)
+    environment.globals['calls'] = calls
+    return environment
+
+
+class TestCacheTag:
+    """Test the tag itself."""
+
+    def test_body_rendered_once_per_key(self, env):
+        """Test repeat renders with the same key reuse the output."""
+        template = env.from_string("{% cache 'nav', auth %}<b>{{ count() }}</b>{% endcache %}")
+        assert template.render(auth=False) == '<b>1</b>'
+        assert template.render(auth=False) == '<b>1</b>'
+        assert template.render(auth=True) == '<b>2</b>'
+        assert len(env.globals['calls']) == 2
+
+    def test_output_not_double_escaped(self, env):
+        """Test cached markup is emitted as markup."""
+        template = env.from_string("{% cache 'x' %}<i>{{ text }}</i>{% endcache %}")
+        assert template.render(text='<a>') == '<i>&lt;a&gt;</i>'
+        assert template.render(text='<a>') == '<i>&lt;a&gt;</i>'
+
+    def test_ttl_zero_disables(self, env):
+        """Test a zero TTL renders the body every time."""
+        fragment_cache.configure(ttl=0)
+        template = env.from_string("{% cache 'x' %}{{ count() }}{% endcache %}")
+        assert template.render() == '1'
+        assert template.render() == '2'
+
+
+class TestLayoutFragments:
+    """Test the cached header and footer in base.html."""
+
+    def test_aria_current_follows_endpoint(self):
+        """Test the cached header still marks the current page."""
+        client = create_app().test_client()
+        client.get('/services')
+        contact = client.get('/contact').data.decode()
+        services = client.get('/services').data.decode()
+
+        assert 'aria-current="page">Contact' in contact
+        assert 'aria-current="page">Services' in services
+        assert fragment_cache.stats()['hits'] > 0
+
+    def test_newsletter_form_not_cached(self):
+        """Test the footer form (and its CSRF token) is outside the cached fragments."""
+        app = create_app()
+        app.test_client().get('/')
+        assert fragment_cache.stats()['size'] == 2
+        for key in list(fragment_cache._data):
+            assert 'csrf_token' not in str(fragment_cache.get(key))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,82 @@
+"""
+Test suite for the login lockout fast path.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from limits.storage import MemoryStorage
+
+from lockout import LockoutCache
+
+
+class TestLockoutCache:
+    """Test local and shared lockout tracking."""
+
+    def test_unknown_email_is_not_locked(self):
+        """Test emails never locked return None."""
+        cache = LockoutCache()
+        assert cache.get_unlock_time('user@example.com') is None
+
+    def test_lock_is_remembered(self):
+        """Test a locked email is reported until its unlock time."""
+        cache = LockoutCache()
+        unlock_at = datetime.utcnow() + timedelta(minutes=15)
+        cache.lock('User@Example.com', unlock_at)
+        assert cache.get_unlock_time('user@example.com') == unlock_at
+
+    def test_expired_lock_is_dropped(self):
+        """Test locks in the past are not stored."""
+        cache = LockoutCache()
+        cache.lock('user@example.com', datetime.utcnow() - timedelta(seconds=1))
+        assert cache.get_unlock_time('user@example.com') is None
+
+    def test_unlock(self):
+        """Test a lock can be removed."""
+        cache = LockoutCache()
+        cache.lock('user@example.com', datetime.utcnow() + timedelta(minutes=15))
+        cache.unlock('user@example.com')
+        assert cache.get_unlock_time('user@example.com') is None
+
+    def test_shared_storage_visible_to_other_processes(self):
+        """Test a lock written by one cache is seen by another sharing storage."""
+        storage = MemoryStorage()
+        first = LockoutCache(storage=storage)
+        second = LockoutCache(storage=storage)
+
+        first.lock('user@example.com', datetime.utcnow() + timedelta(minutes=15))
+        unlock_at = second.get_unlock_time('user@example.com')
+        assert unlock_at is not None
+        assert unlock_at > datetime.utcnow()
+
+        first.unlock('user@example.com')
+        third = LockoutCache(storage=storage)
+        assert third.get_unlock_time('user@example.com') is None
+
+
+    def test_unlock_seen_by_other_workers(self):
+        """Test a worker that already cached the lock sees an unlock made elsewhere."""
+        storage = MemoryStorage()
+        first = LockoutCache(storage=storage)
+        second = LockoutCache(storage=storage)
+
+        first.lock('user@example.com', datetime.utcnow() + timedelta(minutes=15))
+        assert second.get_unlock_time('user@example.com') is not None
+
+        first.unlock('user@example.com')
+        assert second.get_unlock_time('user@example.com') is None
+
+    def test_local_fallback_when_storage_fails(self):
+        """Test the local map still rejects a locked email while storage is down."""
+        storage = MemoryStorage()
+        cache = LockoutCache(storage=storage)
+        cache.lock('user@example.com', datetime.utcnow() + timedelta(minutes=15))
+
+        def unavailable(*args):
+            raise ConnectionError('storage down')
+        storage.get = unavailable
+        assert cache.get_unlock_time('user@example.com') is not None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,107 @@
+"""
+Test suite for the background mail queue.
+"""
+
+import pytest
+from flask import Flask
+
+import mailer
+from mailer import SMTPConnectionPool, MailQueue
+
+
+class FakeSMTP:
+    """Minimal stand-in for smtplib.SMTP that records activity."""
+
+    instances = []
+    fail_sends = 0
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.logins = 0
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        self.logins += 1
+
+    def noop(self):
+        return (250, b'OK')
+
+    def send_message(self, msg):
+        if FakeSMTP.fail_sends:
+            FakeSMTP.fail_sends -= 1
+            raise OSError('connection reset')
+        self.sent.append(msg)
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Create a bare app with SMTP configured."""
+    FakeSMTP.instances = []
+    FakeSMTP.fail_sends = 0
+    monkeypatch.setattr(mailer.smtplib, 'SMTP', FakeSMTP)
+
+    app = Flask(__name__, root_path=str(tmp_path))
+    app.config['SMTP_HOST'] = 'smtp.example.com'
+    app.config['SMTP_FROM'] = 'noreply@ecoreborn.example'
+    return app
+
+
+def make_queue(app, **kwargs):
+    pool = SMTPConnectionPool('smtp.example.com', 587, 'user', 'pass', size=1)
+    kwargs.setdefault('backoff', 0)
+    return MailQueue(app, pool, **kwargs)
+
+
+class TestMailQueue:
+    """Test queued delivery."""
+
+    def test_connection_is_reused(self, app):
+        """Test several emails share one authenticated connection."""
+        q = make_queue(app, workers=1)
+        for i in range(3):
+            assert q.enqueue('a@example.com', f'Subject {i}', 'Body')
+        assert q.flush(timeout=5)
+        q.shutdown()
+
+        assert len(FakeSMTP.instances) == 1
+        assert FakeSMTP.instances[0].logins == 1
+        assert len(FakeSMTP.instances[0].sent) == 3
+
+    def test_retry_after_failure(self, app):
+        """Test a failed send is retried on a fresh connection."""
+        FakeSMTP.fail_sends = 1
+        q = make_queue(app, workers=1, max_retries=2)
+        q.enqueue('a@example.com', 'Subject', 'Body')
+        assert q.flush(timeout=5)
+        q.shutdown()
+
+        sent = [m for s in FakeSMTP.instances for m in s.sent]
+        assert len(sent) == 1
+        assert len(FakeSMTP.instances) == 2
+
+    def test_exhausted_retries_fall_back_to_log(self, app, tmp_path):
+        """Test emails are logged to file once retries run out."""
+        FakeSMTP.fail_sends = 10
+        q = make_queue(app, workers=1, max_retries=1)
+        q.enqueue('a@example.com', 'Lost Subject', 'Body')
+        assert q.flush(timeout=5)
+        q.shutdown()
+
+        log = (tmp_path / 'logs' / 'email.log').read_text(encoding='utf-8')
+        assert 'Lost Subject' in log
+
+    def test_enqueue_after_shutdown(self, app):
+        """Test a closed queue rejects new emails."""
+        q = make_queue(app)
+        q.shutdown()
+        assert not q.enqueue('a@example.com', 'Subject', 'Body')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
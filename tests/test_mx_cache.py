@@ -0,0 +1,133 @@
+"""
+Test suite for the cached MX resolver.
+"""
+
+import threading
+import time
+
+import dns.exception
+import dns.resolver
+import pytest
+
+import mx_cache
+from mx_cache import MXResolver
+
+
+class FakeAnswer:
+    """Stand-in for a dns.resolver.Answer with a TTL."""
+
+    def __init__(self, ttl):
+        self.rrset = type('RRset', (), {'ttl': ttl})()
+
+    def __len__(self):
+        return 1
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Patch DNS resolution and record every query made."""
+    calls = []
+    behaviour = {}
+
+    def fake_resolve(domain, rdtype, lifetime=None):
+        calls.append(domain)
+        action = behaviour.get(domain, 'ok')
+        if action == 'nxdomain':
+            raise dns.resolver.NXDOMAIN()
+        if action == 'servfail':
+            raise dns.resolver.NoNameservers()
+        if action == 'timeout':
+            raise dns.exception.Timeout()
+        if action == 'slow':
+            time.sleep(0.2)
+        return FakeAnswer(3600)
+
+    monkeypatch.setattr(mx_cache.dns.resolver, 'resolve', fake_resolve)
+    return calls, behaviour
+
+
+class TestMXResolver:
+    """Test MX lookup caching."""
+
+    def test_positive_answer_is_cached(self, lookups):
+        """Test repeated lookups hit the cache."""
+        calls, _ = lookups
+        resolver = MXResolver()
+
+        assert resolver.has_mx('Gmail.com') is True
+        assert resolver.has_mx('gmail.com') is True
+        assert calls == ['gmail.com']
+        assert resolver.stats()['hits'] == 1
+        assert resolver.stats()['misses'] == 1
+
+    def test_negative_answer_is_cached(self, lookups):
+        """Test NXDOMAIN answers are cached too."""
+        calls, behaviour = lookups
+        behaviour['nope.invalid'] = 'nxdomain'
+        resolver = MXResolver()
+
+        assert resolver.has_mx('nope.invalid') is False
+        assert resolver.has_mx('nope.invalid') is False
+        assert len(calls) == 1
+
+    def test_nameserver_failure_is_not_cached(self, lookups):
+        """Test NoNameservers (SERVFAIL/REFUSED everywhere) is unknown, not negative."""
+        calls, behaviour = lookups
+        behaviour['gmail.com'] = 'servfail'
+        resolver = MXResolver()
+
+        assert resolver.has_mx('gmail.com') is None
+        assert resolver.stats()['no_nameservers'] == 1
+        assert resolver.stats()['size'] == 0
+
+        del behaviour['gmail.com']
+        assert resolver.has_mx('gmail.com') is True
+        assert len(calls) == 2
+
+    def test_timeout_is_not_cached(self, lookups):
+        """Test timeouts return None and are retried next time."""
+        calls, behaviour = lookups
+        behaviour['slow.example'] = 'timeout'
+        resolver = MXResolver()
+
+        assert resolver.has_mx('slow.example') is None
+        assert resolver.has_mx('slow.example') is None
+        assert len(calls) == 2
+        assert resolver.stats()['timeouts'] == 2
+
+    def test_lru_eviction(self, lookups):
+        """Test least recently used domains are evicted first."""
+        calls, _ = lookups
+        resolver = MXResolver(max_entries=2)
+
+        resolver.has_mx('a.example')
+        resolver.has_mx('b.example')
+        resolver.has_mx('a.example')
+        resolver.has_mx('c.example')
+        resolver.has_mx('a.example')
+        resolver.has_mx('b.example')
+
+        assert calls == ['a.example', 'b.example', 'c.example', 'b.example']
+
+    def test_concurrent_lookups_collapse(self, lookups):
+        """Test concurrent lookups for one domain make a single query."""
+        calls, behaviour = lookups
+        behaviour['busy.example'] = 'slow'
+        resolver = MXResolver()
+        results = []
+
+        threads = [
+            threading.Thread(target=lambda: results.append(resolver.has_mx('busy.example')))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [True] * 5
+        assert calls == ['busy.example']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,59 @@
+"""
+Test suite for the password hashing pool.
+"""
+
+import threading
+import time
+
+import pytest
+
+from passwords import PasswordHasher, PasswordHasherBusy, get_rounds
+
+
+class TestPasswordHasher:
+    """Test hashing on the bounded pool."""
+
+    def test_hash_and_verify(self):
+        """Test hashes made on the pool verify correctly."""
+        hasher = PasswordHasher()
+        password_hash = hasher.hash('Test123!@#', rounds=4)
+        assert password_hash.startswith(b'$2b$04$')
+        assert hasher.verify('Test123!@#', password_hash)
+        assert not hasher.verify('WrongPassword', password_hash)
+        assert hasher.stats()['inflight'] == 0
+
+    def test_rejects_when_saturated(self):
+        """Test a full pool fails fast instead of queueing."""
+        hasher = PasswordHasher(max_workers=1, max_pending=0)
+        worker = threading.Thread(target=hasher._run, args=(time.sleep, 0.3))
+        worker.start()
+        time.sleep(0.05)
+
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash('Test123!@#', rounds=4)
+        assert hasher.stats()['rejected'] == 1
+
+        worker.join()
+        assert hasher.verify('Test123!@#', hasher.hash('Test123!@#', rounds=4))
+
+    def test_timeout_raises_busy(self):
+        """Test callers give up after the configured timeout."""
+        hasher = PasswordHasher(max_workers=1, max_pending=1, timeout=0.05)
+        with pytest.raises(PasswordHasherBusy):
+            hasher._run(time.sleep, 0.3)
+
+    def test_default_rounds_are_configurable(self):
+        """Test new hashes use the configured cost factor."""
+        hasher = PasswordHasher(rounds=5)
+        assert get_rounds(hasher.hash('Test123!@#')) == 5
+
+    def test_needs_rehash(self):
+        """Test hashes at a different cost are flagged for rehash."""
+        hasher = PasswordHasher(rounds=5)
+        assert not hasher.needs_rehash(hasher.hash('Test123!@#'))
+        assert hasher.needs_rehash(hasher.hash('Test123!@#', rounds=4))
+        assert hasher.needs_rehash(b'not-a-bcrypt-hash')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
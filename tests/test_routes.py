@@ -58,6 +58,88 @@ class TestPublicRoutes:
         assert response.status_code == 200
         assert b'User-agent' in response.data
         assert b'Sitemap' in response.data
+    
+    def test_healthz_ready(self, app, client, monkeypatch):
+        """Test readiness endpoint returns 200 and only the status once MongoDB is up."""
+        mongo = app.extensions['mongo']
+        monkeypatch.setattr(mongo, 'status', lambda: {'ready': True, 'error': None})
+        response = client.get('/healthz')
+        assert response.status_code == 200
+        assert response.get_json() == {'status': 'ok'}
+    
+    def test_healthz_not_ready(self, app, client, monkeypatch):
+        """Test readiness endpoint returns 503 without leaking the MongoDB error."""
+        mongo = app.extensions['mongo']
+        monkeypatch.setattr(mongo, 'status', lambda: {'ready': False, 'error': 'auth failed for db_user'})
+        response = client.get('/healthz')
+        assert response.status_code == 503
+        assert response.get_json() == {'status': 'unavailable'}
+    
+    def test_healthz_details_opt_in(self, app, client, monkeypatch):
+        """Test HEALTHZ_DETAILS adds MongoDB and cache details."""
+        app.config['HEALTHZ_DETAILS'] = True
+        mongo = app.extensions['mongo']
+        monkeypatch.setattr(mongo, 'status', lambda: {'ready': True, 'error': None})
+        body = client.get('/healthz').get_json()
+        assert body['mongodb'] == {'ready': True, 'error': None}
+
+
+class TestPageCache:
+    """Test the anonymous full-page cache."""
+    
+    def test_repeat_request_is_cached(self, client):
+        """Test the second anonymous request is served from the cache."""
+        first = client.get('/services')
+        second = client.get('/services')
+        assert first.headers.get('X-Page-Cache') == 'MISS'
+        assert second.headers.get('X-Page-Cache') == 'HIT'
+        assert first.data == second.data
+    
+    def test_csrf_token_is_filled_in(self, app):
+        """Test cached pages get a real CSRF token instead of the placeholder."""
+        app.config['WTF_CSRF_ENABLED'] = True
+        app.test_client().get('/contact')
+        response = app.test_client().get('/contact')
+        
+        assert response.headers.get('X-Page-Cache') == 'HIT'
+        assert b'__PAGE_CACHE_CSRF_TOKEN__' not in response.data
+        assert b'name="csrf_token" type="hidden" value="' in response.data
+    
+    def test_post_is_not_cached(self, client):
+        """Test form submissions bypass the cache."""
+        client.get('/services')
+        response = client.post('/services', data={})
+        assert 'X-Page-Cache' not in response.headers
+
+
+class TestConditionalGet:
+    """Test ETag and 304 handling."""
+    
+    def test_sitemap_not_modified(self, client, app):
+        """Test a matching If-None-Match on sitemap returns 304."""
+        response = client.get('/sitemap.xml')
+        etag = response.headers['ETag']
+        assert response.headers.get('Last-Modified')
+        assert b'urlset' in response.data
+        
+        response = client.get('/sitemap.xml', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        assert app.extensions['conditional_get'].stats()['bytes_saved'] > 0
+    
+    def test_page_not_modified(self, client):
+        """Test rendered pages carry an ETag and honour If-None-Match."""
+        response = client.get('/services')
+        etag = response.headers['ETag']
+        
+        response = client.get('/services', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+    
+    def test_stale_etag_gets_full_page(self, client):
+        """Test a non-matching ETag gets the full body."""
+        response = client.get('/robots.txt', headers={'If-None-Match': '"stale"'})
+        assert response.status_code == 200
+        assert b'User-agent' in response.data
 
 
 class TestContactForm:
@@ -75,6 +157,46 @@ class TestContactForm:
         assert response.status_code == 200
         # Should redirect back to contact page with success message
         assert b'Thank you' in response.data or b'contact' in response.data.lower()
+    
+    def test_rejected_attachment_is_form_error(self, client, app, monkeypatch):
+        """Test a rejected attachment re-renders the form instead of saving the message."""
+        import io
+        import forms
+        import routes
+        from utils import UploadRejected
+
+        def reject(*args, **kwargs):
+            raise UploadRejected('File content does not match its extension.')
+        monkeypatch.setattr(routes, 'save_uploaded_file', reject)
+        monkeypatch.setattr(forms.mx_resolver, 'has_mx', lambda domain: True)
+        
+        response = client.post('/contact', data={
+            'name': 'Test User',
+            'email': 'rejected@example.com',
+            'subject': 'Test Subject',
+            'message': 'This is a test message with an attachment.',
+            'attachment': (io.BytesIO(b'%PDF-1.4 test'), 'invoice.pdf'),
+        })
+        
+        assert response.status_code == 200
+        assert b'File content does not match its extension.' in response.data
+        assert b'Thank you' not in response.data
+        assert app.db.contact_messages.find_one({'email': 'rejected@example.com'}) is None
+    
+    def test_oversized_attachment_reports_configured_limit(self, client, app):
+        """Test the 413 flash states UPLOAD_MAX_SIZE rather than a fixed 2MB."""
+        import io
+        
+        app.config['UPLOAD_MAX_SIZE'] = 1024 * 1024
+        response = client.post('/contact', data={
+            'name': 'Test User',
+            'email': 'test@example.com',
+            'subject': 'Test Subject',
+            'message': 'This is a test message with a large attachment.',
+            'attachment': (io.BytesIO(b'x' * (1536 * 1024)), 'notes.txt'),
+        }, follow_redirects=True)
+        
+        assert b'Maximum size is 1MB.' in response.data
 
 
 class TestServiceRequest:
@@ -93,6 +215,18 @@ class TestServiceRequest:
         
         assert response.status_code == 200
         assert b'submitted' in response.data.lower() or b'Thank you' in response.data
+    
+    def test_unknown_service_rejected(self, client):
+        """Test a service name outside the catalog is not accepted."""
+        response = client.post('/services', data={
+            'service_name': 'Free Money',
+            'name': 'Test User',
+            'email': 'test@example.com',
+            'message': 'This is a test service request message.',
+        })
+        
+        assert response.status_code == 200
+        assert b'Please choose one of the listed services.' in response.data
 
 
 class TestNewsletterSubscription:
@@ -107,6 +241,31 @@ class TestNewsletterSubscription:
         assert response.status_code == 200
         # Should show success or already subscribed message
 
+    def test_footer_form_matches_newsletter_form(self):
+        """Test the footer renders the same markup a bound NewsletterForm would."""
+        from flask import render_template_string
+        from forms import NewsletterForm
+
+        app = create_app()
+        template = "{{ form.hidden_tag() }}{{ form.email(placeholder='Your email') }}"
+        with app.test_request_context('/'):
+            footer = render_template_string(template.replace('form.', 'footer_newsletter_form.'))
+            expected = render_template_string(template, form=NewsletterForm())
+        assert footer == expected
+        assert 'name="csrf_token"' in footer
+
+    def test_footer_form_not_built_unless_used(self, app, monkeypatch):
+        """Test renders that skip the footer never build a form or CSRF token."""
+        import forms
+        from flask import render_template_string
+
+        calls = []
+        monkeypatch.setattr(forms, 'generate_csrf', lambda *a, **k: calls.append(1))
+        app.config['WTF_CSRF_ENABLED'] = True
+        with app.test_request_context('/'):
+            assert render_template_string('{{ current_year }}')
+        assert calls == []
+
 
 class TestErrorPages:
     """Test error handling."""
@@ -0,0 +1,97 @@
+"""
+Test suite for the streamed, sharded sitemap.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app import create_app
+from sitemap import Sitemap, SitemapEntry, iter_urlset
+
+
+@pytest.fixture
+def app():
+    """Create application for testing."""
+    app = create_app()
+    app.config['TESTING'] = True
+    yield app
+
+
+@pytest.fixture
+def client(app):
+    """Create test client."""
+    return app.test_client()
+
+
+def use_sitemap(app, **kwargs):
+    """Replace the app's sitemap with one configured for the test."""
+    return Sitemap(app, **kwargs)
+
+
+class TestSitemapRendering:
+    """Test the generated documents."""
+
+    def test_urls_from_url_map(self, client):
+        """Test decorated routes are listed and others are not."""
+        body = client.get('/sitemap.xml').data.decode()
+        assert '<loc>http://localhost:5000/services</loc>' in body
+        assert '<loc>http://localhost:5000/login</loc>' in body
+        assert '/dashboard' not in body
+        assert '/healthz' not in body
+
+    def test_urlset_chunks_and_escaping(self):
+        """Test the generator yields chunks and escapes URLs."""
+        entries = [SitemapEntry(f'/item?a={i}&b=1') for i in range(2500)]
+        chunks = list(iter_urlset('https://example.org', entries))
+        assert len(chunks) == 5
+        body = b''.join(chunks).decode()
+        assert body.count('<url>') == 2500
+        assert '<loc>https://example.org/item?a=0&amp;b=1</loc>' in body
+
+    def test_sharded_index(self, app, client):
+        """Test more URLs than fit in one file produce an index and shards."""
+        sitemap = use_sitemap(app, max_urls=3, ttl=0)
+        sitemap.source(lambda: [SitemapEntry(f'/article/{i}') for i in range(5)])
+
+        index = client.get('/sitemap.xml').data.decode()
+        assert '<sitemapindex' in index
+        assert '<loc>http://localhost:5000/sitemap-4.xml</loc>' in index
+
+        shard = client.get('/sitemap-4.xml').data.decode()
+        assert '<urlset' in shard
+        assert '/article/4' in shard
+        assert client.get('/sitemap-5.xml').status_code == 404
+
+
+class TestSitemapCaching:
+    """Test rendered shards are cached until their URLs change."""
+
+    def test_second_request_served_from_memory(self, app, client):
+        """Test the first response streams and the second is cached bytes."""
+        first = client.get('/sitemap.xml')
+        assert 'Content-Length' not in first.headers
+        assert b'urlset' in first.data
+        second = client.get('/sitemap.xml')
+        assert int(second.headers['Content-Length']) == len(second.data)
+        assert first.data == second.data
+        assert first.headers['ETag'] == second.headers['ETag']
+
+    def test_lastmod_change_invalidates(self, app, client):
+        """Test a changed lastmod re-renders the shard with a new ETag."""
+        sitemap = use_sitemap(app, ttl=0)
+        lastmod = {'value': datetime(2024, 1, 1, tzinfo=timezone.utc)}
+        sitemap.source(lambda: [SitemapEntry('/article/1', lastmod['value'])])
+
+        first = client.get('/sitemap.xml')
+        assert b'<lastmod>2024-01-01T00:00:00+00:00</lastmod>' in first.data
+
+        lastmod['value'] = datetime(2024, 6, 1, tzinfo=timezone.utc)
+        second = client.get('/sitemap.xml')
+        assert 'Content-Length' not in second.headers
+        assert b'<lastmod>2024-06-01T00:00:00+00:00</lastmod>' in second.data
+        assert first.headers['ETag'] != second.headers['ETag']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,64 @@
+"""
+Test suite for the Jinja bytecode cache and template warm-up.
+"""
+
+import pytest
+
+from app import create_app
+from template_cache import warm_templates
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Point the bytecode cache at a temporary directory."""
+    directory = tmp_path / 'jinja_cache'
+    monkeypatch.setenv('TEMPLATE_CACHE_DIR', str(directory))
+    return directory
+
+
+class TestTemplateCache:
+    """Test bytecode caching across app instances."""
+
+    def test_warm_up_covers_all_templates(self, cache_dir):
+        """Test every template, including error pages, is compiled and timed."""
+        app = create_app()
+        timings = warm_templates(app)
+        names = {name for name, _, _ in timings}
+
+        assert {'base.html', 'home.html', 'errors/404.html', 'errors/500.html'} <= names
+        assert all(ms >= 0 for _, ms, _ in timings)
+        assert all(source == 'compiled' for _, _, source in timings)
+        assert any(cache_dir.iterdir())
+
+    def test_second_worker_loads_bytecode(self, cache_dir):
+        """Test a fresh app reuses bytecode written by an earlier one."""
+        warm_templates(create_app())
+
+        app = create_app()
+        timings = warm_templates(app)
+        assert all(source == 'bytecode' for _, _, source in timings)
+        assert app.extensions['template_cache'].stats()['misses'] == 0
+
+    def test_warmup_on_startup(self, cache_dir, monkeypatch):
+        """Test TEMPLATE_WARMUP precompiles during create_app."""
+        monkeypatch.setenv('TEMPLATE_WARMUP', 'True')
+        app = create_app()
+        assert len(app.extensions['template_warmup']) > 0
+
+    def test_disabled(self, monkeypatch):
+        """Test an empty TEMPLATE_CACHE_DIR turns the cache off."""
+        monkeypatch.setenv('TEMPLATE_CACHE_DIR', '')
+        app = create_app()
+        assert app.jinja_env.bytecode_cache is None
+        assert all(source == 'compiled' for _, _, source in warm_templates(app))
+
+    def test_cli_command(self, cache_dir):
+        """Test ``flask warm-templates`` runs and prints a total."""
+        result = create_app().test_cli_runner().invoke(args=['warm-templates'])
+        assert result.exit_code == 0, result.output
+        assert 'base.html' in result.output
+        assert 'total' in result.output
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
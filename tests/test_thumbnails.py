@@ -0,0 +1,214 @@
+"""
+Test suite for background image thumbnails and metadata stripping.
+"""
+
+import io
+import os
+
+import pytest
+from flask import Flask
+
+Image = pytest.importorskip('PIL.Image')
+
+from models import ContactMessage
+from thumbnails import ImageProcessor, build_derivatives, derived_path, image_kind
+from uploads import UploadStream, collect_garbage, store_blob
+
+
+def store_image(folder, image, image_format, **options):
+    """Save a Pillow image into the blob store; return its hash."""
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    upload = UploadStream(str(folder))
+    upload.write(buffer.getvalue())
+    return store_blob(upload, str(folder))[0]
+
+
+def exif_jpeg(folder, size=(1200, 800)):
+    """Store a JPEG with GPS data and a 90-degree orientation tag."""
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 CW
+    exif[0x010F] = 'TestCam'  # Make
+    exif[0x8825] = {1: 'N', 2: (51.0, 30.0, 0.0)}  # GPS info
+    return store_image(folder, Image.new('RGB', size, 'green'), 'JPEG', exif=exif)
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """Capture ContactMessage image updates instead of writing to MongoDB."""
+    calls = {'info': [], 'error': []}
+    monkeypatch.setattr(ContactMessage, 'set_image_info',
+                        staticmethod(lambda db, message_id, info: calls['info'].append((message_id, info))))
+    monkeypatch.setattr(ContactMessage, 'set_image_error',
+                        staticmethod(lambda db, message_id, error: calls['error'].append((message_id, error))))
+    return calls
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Minimal app whose image jobs use tmp_path as UPLOAD_FOLDER."""
+    app = Flask(__name__)
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    app.db = None
+    return app
+
+
+class TestBuildDerivatives:
+    """Test thumbnail and clean-copy generation."""
+
+    def test_jpeg_thumbnail_and_exif_stripped(self, tmp_path):
+        """Test both outputs are oriented, the thumbnail is bounded and neither keeps EXIF."""
+        sha256 = exif_jpeg(tmp_path)
+        info = build_derivatives(str(tmp_path), sha256, 'jpg', max_size=320)
+
+        assert (info['width'], info['height']) == (1200, 800)
+        assert info['size'] == os.path.getsize(tmp_path / sha256[:2] / sha256[2:4] / sha256)
+        # Orientation applied to both: portrait outputs
+        assert (info['thumbnail']['width'], info['thumbnail']['height']) == (213, 320)
+        assert (info['clean']['width'], info['clean']['height']) == (800, 1200)
+
+        for variant in ('thumb', 'clean'):
+            with Image.open(derived_path(str(tmp_path), sha256, variant, 'jpg')) as image:
+                assert image.format == 'JPEG'
+                assert len(image.getexif()) == 0
+        assert info['thumbnail']['path'] == os.path.join(
+            'derived', sha256[:2], sha256[2:4], f'{sha256}.thumb.jpg'
+        )
+
+    def test_png_keeps_transparency_drops_text(self, tmp_path):
+        """Test PNG derivatives stay PNG with alpha and lose text metadata."""
+        from PIL.PngImagePlugin import PngInfo
+
+        meta = PngInfo()
+        meta.add_text('Author', 'someone')
+        sha256 = store_image(tmp_path, Image.new('RGBA', (100, 50), (0, 0, 0, 0)), 'PNG', pnginfo=meta)
+        info = build_derivatives(str(tmp_path), sha256, 'png')
+
+        assert (info['thumbnail']['width'], info['thumbnail']['height']) == (100, 50)
+        with Image.open(derived_path(str(tmp_path), sha256, 'clean', 'png')) as image:
+            assert image.mode == 'RGBA'
+            assert 'Author' not in image.info
+
+    def test_idempotent(self, tmp_path):
+        """Test a repeat run reuses existing output."""
+        sha256 = exif_jpeg(tmp_path)
+        first = build_derivatives(str(tmp_path), sha256, 'jpg')
+        thumb = derived_path(str(tmp_path), sha256, 'thumb', 'jpg')
+        mtime = os.stat(thumb).st_mtime_ns
+
+        assert build_derivatives(str(tmp_path), sha256, 'jpg') == first
+        assert os.stat(thumb).st_mtime_ns == mtime
+        assert not [n for n in os.listdir(os.path.dirname(thumb)) if n.endswith('.part')]
+
+    def test_gc_removes_derived_files(self, tmp_path):
+        """Test garbage collection also removes thumbnails of unreferenced blobs."""
+        sha256 = exif_jpeg(tmp_path)
+        build_derivatives(str(tmp_path), sha256, 'jpg')
+        removed, _ = collect_garbage(str(tmp_path), set(), grace=0)
+        assert removed == 3
+        assert not os.path.exists(tmp_path / 'derived' / sha256[:2])
+
+
+class TestImageProcessor:
+    """Test the background worker pool."""
+
+    def test_image_kind(self):
+        """Test only jpg/jpeg/png attachments are processed."""
+        assert image_kind('photo.JPEG') == 'jpg'
+        assert image_kind('scan.png') == 'png'
+        assert image_kind('animation.gif') is None
+        assert image_kind('cv.pdf') is None
+        assert image_kind(None) is None
+
+    def test_processes_in_background(self, app, tmp_path, recorded):
+        """Test a queued image is processed once and recorded on the message."""
+        sha256 = exif_jpeg(tmp_path)
+        processor = ImageProcessor(app, workers=1)
+        assert processor.submit('m1', 'photo.jpg', sha256)
+        assert processor.submit('m1', 'photo.jpg', sha256)
+        assert not processor.submit('m2', 'cv.pdf', sha256)
+        assert processor.flush(timeout=10)
+        processor.shutdown()
+
+        assert len(recorded['info']) == 1
+        message_id, info = recorded['info'][0]
+        assert message_id == 'm1'
+        assert (info['width'], info['height']) == (1200, 800)
+
+    def test_broken_image_recorded_without_retry(self, app, tmp_path, recorded):
+        """Test an undecodable image records an error instead of retrying."""
+        upload = UploadStream(str(tmp_path))
+        upload.write(b'not an image at all')
+        sha256, _ = store_blob(upload, str(tmp_path))
+
+        processor = ImageProcessor(app, workers=1, backoff=0)
+        processor.submit('m1', 'photo.jpg', sha256)
+        assert processor.flush(timeout=10)
+        processor.shutdown()
+
+        assert recorded['info'] == []
+        assert [message_id for message_id, _ in recorded['error']] == ['m1']
+
+    def test_transient_error_retried(self, app, tmp_path, recorded, monkeypatch):
+        """Test an I/O error is retried rather than recorded as a broken image."""
+        import thumbnails
+
+        sha256 = exif_jpeg(tmp_path)
+        real_build = thumbnails.build_derivatives
+        attempts = []
+
+        def flaky_build(*args, **kwargs):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError(28, 'No space left on device')
+            return real_build(*args, **kwargs)
+        monkeypatch.setattr(thumbnails, 'build_derivatives', flaky_build)
+
+        processor = ImageProcessor(app, workers=1, backoff=0)
+        processor.submit('m1', 'photo.jpg', sha256)
+        assert processor.flush(timeout=10)
+        processor.shutdown()
+
+        assert len(attempts) == 2
+        assert recorded['error'] == []
+        assert [message_id for message_id, _ in recorded['info']] == ['m1']
+
+    def test_queue_limit(self, app, tmp_path, recorded):
+        """Test submissions beyond max_pending are dropped."""
+        sha256 = exif_jpeg(tmp_path)
+        processor = ImageProcessor(app, workers=1, max_pending=0)
+        assert not processor.submit('m1', 'photo.jpg', sha256)
+        processor.shutdown()
+
+
+class TestProcessAttachmentsCommand:
+    """Test the ``flask process-attachments`` backfill."""
+
+    def test_records_results_and_errors(self, app, tmp_path, recorded, monkeypatch):
+        """Test good images are recorded inline and undecodable ones get an error."""
+        import thumbnails
+        from thumbnails import process_attachments_command
+
+        # Runs in the command's own thread: no worker pool is started
+        monkeypatch.setattr(thumbnails, 'ThreadPoolExecutor', None)
+
+        good = exif_jpeg(tmp_path)
+        upload = UploadStream(str(tmp_path))
+        upload.write(b'not an image at all')
+        broken, _ = store_blob(upload, str(tmp_path))
+        messages = [
+            {'_id': 'm1', 'filename': 'photo.jpg', 'attachment_sha256': good},
+            {'_id': 'm2', 'filename': 'scan.png', 'attachment_sha256': broken},
+        ]
+        monkeypatch.setattr(ContactMessage, 'get_unprocessed_images',
+                            staticmethod(lambda db, limit: messages))
+
+        result = app.test_cli_runner().invoke(process_attachments_command)
+
+        assert 'Processed 1 attachments, 1 failed' in result.output
+        assert [message_id for message_id, _ in recorded['info']] == ['m1']
+        assert [message_id for message_id, _ in recorded['error']] == ['m2']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,211 @@
+"""
+Test suite for streaming file uploads.
+"""
+
+import hashlib
+import io
+import os
+
+import pytest
+from flask import Flask, request
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from filetypes import SNIFF_BYTES
+from uploads import (
+    UploadStream, blob_path, collect_garbage, init_uploads, store_blob, upload_stream
+)
+from utils import UploadRejected, save_uploaded_file
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Minimal app parsing uploads with StreamingRequest."""
+    app = Flask(__name__)
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    app.config['UPLOAD_MAX_SIZE'] = 1000
+    init_uploads(app)
+
+    @app.route('/upload', methods=['POST'])
+    def upload():
+        file_storage = request.files['file']
+        stream = file_storage.stream
+        try:
+            stored = save_uploaded_file(file_storage, str(tmp_path)) if request.form.get('save') else None
+        except UploadRejected as e:
+            return {'error': str(e)}, 400
+        return {'type': type(stream).__name__, 'sha256': stream.sha256, 'stored': stored}
+
+    return app
+
+
+def leftover_parts(directory):
+    return [name for name in os.listdir(directory) if name.endswith('.part')]
+
+
+class TestUploadStream:
+    """Test the hashing, size-limited temp file."""
+
+    def test_hash_size_and_save(self, tmp_path):
+        """Test chunks are hashed and the file is renamed into place."""
+        upload = UploadStream(str(tmp_path))
+        upload.write(b'hello ')
+        upload.write(b'world')
+        assert upload.size == 11
+        assert upload.sha256 == hashlib.sha256(b'hello world').hexdigest()
+
+        upload.seek(0)
+        assert upload.read() == b'hello world'
+        upload.save(str(tmp_path / 'out.txt'))
+        upload.close()
+        assert (tmp_path / 'out.txt').read_bytes() == b'hello world'
+        assert leftover_parts(tmp_path) == []
+
+    def test_abort_over_limit(self, tmp_path):
+        """Test writing past the limit raises 413 and deletes the temp file."""
+        upload = UploadStream(str(tmp_path), max_bytes=10)
+        upload.write(b'x' * 10)
+        with pytest.raises(RequestEntityTooLarge):
+            upload.write(b'x')
+        assert leftover_parts(tmp_path) == []
+
+    def test_copy_non_streamed_upload(self, tmp_path):
+        """Test ordinary FileStorage objects are copied in chunks."""
+        file_storage = FileStorage(io.BytesIO(b'a' * 100), filename='a.txt')
+        upload = upload_stream(file_storage, str(tmp_path), chunk_size=7)
+        assert upload.size == 100
+        assert upload.sha256 == hashlib.sha256(b'a' * 100).hexdigest()
+        upload.close()
+        assert leftover_parts(tmp_path) == []
+
+
+class TestStreamingRequest:
+    """Test uploads parsed straight into UPLOAD_FOLDER."""
+
+    def test_streamed_during_parse(self, app, tmp_path):
+        """Test request files are UploadStreams and unsaved ones are cleaned up."""
+        response = app.test_client().post('/upload', data={
+            'file': (io.BytesIO(b'report'), 'report.txt')
+        })
+        assert response.json['type'] == 'UploadStream'
+        assert response.json['sha256'] == hashlib.sha256(b'report').hexdigest()
+        assert os.listdir(tmp_path) == []
+
+    def test_saved_by_rename(self, app, tmp_path):
+        """Test save_uploaded_file moves the streamed file into the blob store."""
+        response = app.test_client().post('/upload', data={
+            'file': (io.BytesIO(b'report'), 'my report.txt'), 'save': '1'
+        })
+        filename, sha256, size, deduplicated = response.json['stored']
+        assert (filename, size, deduplicated) == ('my_report.txt', 6, False)
+        with open(blob_path(str(tmp_path), sha256), 'rb') as f:
+            assert f.read() == b'report'
+        assert leftover_parts(tmp_path) == []
+
+    def test_mismatched_content_not_saved(self, app, tmp_path):
+        """Test save_uploaded_file rejects a payload that does not match its extension."""
+        response = app.test_client().post('/upload', data={
+            'file': (io.BytesIO(b'MZ\x90\x00' + b'\x00' * 100), 'invoice.pdf'), 'save': '1'
+        })
+        assert response.status_code == 400
+        assert 'does not match' in response.json['error']
+        assert os.listdir(tmp_path) == []
+
+    def test_sniff_window_captured_while_streaming(self, tmp_path):
+        """Test only the first SNIFF_BYTES are kept for type checks."""
+        upload = UploadStream(str(tmp_path), filename='notes.txt')
+        for _ in range(10):
+            upload.write(b'text line\n' * 1000)
+        assert len(upload.head) == SNIFF_BYTES
+        assert upload.content_matches()
+        assert not upload.content_matches('notes.png')
+        upload.close()
+
+    def test_oversized_upload_rejected(self, app, tmp_path):
+        """Test uploads over UPLOAD_MAX_SIZE get a 413 and leave nothing behind."""
+        response = app.test_client().post('/upload', data={
+            'file': (io.BytesIO(b'x' * 5000), 'big.txt')
+        })
+        assert response.status_code == 413
+        assert leftover_parts(tmp_path) == []
+
+    def test_size_validator_uses_upload_max_size(self, app):
+        """Test validate_file_size enforces UPLOAD_MAX_SIZE rather than a fixed 2MB."""
+        from types import SimpleNamespace
+        from wtforms.validators import ValidationError
+        from forms import validate_file_size
+
+        def field(size):
+            return SimpleNamespace(data=FileStorage(io.BytesIO(b'x' * size), 'notes.txt'))
+
+        with app.app_context():
+            validate_file_size(None, field(1000))
+            with pytest.raises(ValidationError):
+                validate_file_size(None, field(1001))
+
+
+def store(directory, data):
+    """Store bytes as a blob; return (sha256, deduplicated)."""
+    upload = UploadStream(directory)
+    upload.write(data)
+    return store_blob(upload, directory)
+
+
+class TestBlobStore:
+    """Test content-addressed storage and garbage collection."""
+
+    def test_sharded_layout(self, tmp_path):
+        """Test blobs are stored under ab/cd/<sha256>."""
+        sha256, _ = store(str(tmp_path), b'data')
+        assert sha256 == hashlib.sha256(b'data').hexdigest()
+        assert os.path.isfile(tmp_path / sha256[:2] / sha256[2:4] / sha256)
+
+    def test_duplicate_costs_nothing(self, tmp_path):
+        """Test a second identical upload reuses the blob and leaves no temp file."""
+        first, dedup_first = store(str(tmp_path), b'same')
+        second, dedup_second = store(str(tmp_path), b'same')
+        assert first == second
+        assert (dedup_first, dedup_second) == (False, True)
+        assert leftover_parts(tmp_path) == []
+        assert len(os.listdir(tmp_path / first[:2] / first[2:4])) == 1
+
+    def test_gc_removes_only_unreferenced(self, tmp_path):
+        """Test GC keeps referenced blobs and removes the rest (and empty shards)."""
+        keep, _ = store(str(tmp_path), b'keep')
+        drop, _ = store(str(tmp_path), b'drop')
+
+        assert collect_garbage(str(tmp_path), {keep}, grace=0, dry_run=True) == (1, 4)
+        assert os.path.exists(blob_path(str(tmp_path), drop))
+
+        assert collect_garbage(str(tmp_path), {keep}, grace=0) == (1, 4)
+        assert os.path.exists(blob_path(str(tmp_path), keep))
+        assert not os.path.exists(blob_path(str(tmp_path), drop))
+        if drop[:2] != keep[:2]:
+            assert not os.path.exists(tmp_path / drop[:2])
+
+    def test_gc_grace_period(self, tmp_path):
+        """Test recent blobs and temp files survive GC."""
+        sha256, _ = store(str(tmp_path), b'new')
+        pending = UploadStream(str(tmp_path))
+        assert collect_garbage(str(tmp_path), set(), grace=3600) == (0, 0)
+        assert os.path.exists(blob_path(str(tmp_path), sha256))
+        assert os.path.exists(pending.path)
+        pending.close()
+
+    def test_gc_removes_abandoned_temp_files(self, tmp_path):
+        """Test temp files left by a crashed worker are collected."""
+        (tmp_path / '.upload-abc.part').write_bytes(b'partial')
+        assert collect_garbage(str(tmp_path), set(), grace=0) == (1, 7)
+        assert leftover_parts(tmp_path) == []
+
+    def test_gc_ignores_other_files(self, tmp_path):
+        """Test files outside the hash layout are never touched."""
+        (tmp_path / 'legacy_20240101_120000.pdf').write_bytes(b'old')
+        (tmp_path / 'ab').mkdir()
+        (tmp_path / 'ab' / 'notes.txt').write_bytes(b'x')
+        assert collect_garbage(str(tmp_path), set(), grace=0) == (0, 0)
+        assert (tmp_path / 'ab' / 'notes.txt').exists()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
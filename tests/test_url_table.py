@@ -0,0 +1,100 @@
+"""
+Test suite for the precomputed template url_for table.
+"""
+
+import pytest
+from flask import Blueprint, Flask, render_template_string, url_for
+
+from app import create_app
+from url_table import build_url_table, init_url_table
+
+
+@pytest.fixture
+def small_app():
+    """Minimal app with static, parameterized and url-default routes."""
+    app = Flask(__name__)
+
+    @app.route('/')
+    def home():
+        return 'home'
+
+    @app.route('/items/<int:item_id>')
+    def item(item_id):
+        return 'item'
+
+    localized = Blueprint('localized', __name__, url_prefix='/l')
+
+    @localized.url_defaults
+    def add_lang(endpoint, values):
+        values.setdefault('lang', 'en')
+
+    @localized.route('/about')
+    def about():
+        return 'about'
+
+    app.register_blueprint(localized)
+    init_url_table(app)
+    return app
+
+
+class TestBuildUrlTable:
+    """Test which endpoints are precomputed."""
+
+    def test_argument_free_routes(self, small_app):
+        """Test static routes are in the table and parameterized ones are not."""
+        table = small_app.extensions['url_table']
+        assert table['home'] == '/'
+        assert 'item' not in table
+
+    def test_url_default_blueprints_skipped(self, small_app):
+        """Test blueprints with URL default functions always use url_for."""
+        assert 'localized.about' not in build_url_table(small_app)
+
+    def test_app_routes(self):
+        """Test the real app precomputes its public pages."""
+        table = create_app().extensions['url_table']
+        assert table['main.home'] == '/'
+        assert table['main.services'] == '/services'
+        assert 'auth.reset_password' not in table
+
+
+class TestTemplateUrlFor:
+    """Test the template url_for matches Flask's."""
+
+    def test_same_urls_as_url_for(self, small_app):
+        """Test table hits, arguments, query values and _external all match url_for."""
+        template = (
+            "{{ url_for('home') }}|{{ url_for('item', item_id=3) }}|"
+            "{{ url_for('home', page=2) }}|{{ url_for('home', _external=True) }}|"
+            "{{ url_for('localized.about') }}"
+        )
+        with small_app.test_request_context('/'):
+            expected = '|'.join([
+                url_for('home'), url_for('item', item_id=3), url_for('home', page=2),
+                url_for('home', _external=True), url_for('localized.about')
+            ])
+            assert render_template_string(template) == expected
+
+    def test_script_root_prefixed(self, small_app):
+        """Test apps mounted under a prefix get prefixed paths."""
+        with small_app.test_request_context('/', environ_overrides={'SCRIPT_NAME': '/site'}):
+            assert render_template_string("{{ url_for('home') }}") == '/site/'
+
+    def test_unknown_endpoint_still_raises(self, small_app):
+        """Test misses fall through to url_for's BuildError."""
+        from werkzeug.routing import BuildError
+
+        with small_app.test_request_context('/'):
+            with pytest.raises(BuildError):
+                render_template_string("{{ url_for('missing') }}")
+
+    def test_static_urls_keep_asset_override(self):
+        """Test static URLs still go through the hashed asset url_for."""
+        app = create_app()
+        with app.test_request_context('/'):
+            rendered = render_template_string("{{ url_for('static', filename='css/main.css') }}")
+            assert rendered.startswith('/static/')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
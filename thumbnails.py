@@ -0,0 +1,316 @@
+"""
+Background thumbnails and metadata stripping for image attachments.
+
+After a contact message with a jpg/png attachment is saved, the blob is
+queued to a small worker pool which writes two derived files next to
+the upload store:
+
+    <UPLOAD_FOLDER>/derived/ab/cd/<sha256>.thumb.<ext>   bounded thumbnail
+    <UPLOAD_FOLDER>/derived/ab/cd/<sha256>.clean.<ext>   full size, no EXIF
+
+and records the image dimensions and file sizes on the ContactMessage.
+Derived files are named after the blob hash and written atomically, so
+a retried or repeated job (or a duplicate upload) reuses existing
+output. Requires Pillow; without it image processing is skipped.
+"""
+
+import atexit
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+try:
+    from PIL import Image, ImageOps, JpegImagePlugin, UnidentifiedImageError
+except ImportError:  # pragma: no cover - Pillow is optional
+    Image = ImageOps = JpegImagePlugin = UnidentifiedImageError = None
+
+from filetypes import EXTENSION_TYPES
+from uploads import DERIVED_DIR, blob_path
+
+
+# Attachment type -> (Pillow format, file extension)
+IMAGE_FORMATS = {
+    'jpg': ('JPEG', 'jpg'),
+    'png': ('PNG', 'png'),
+}
+
+# Refuse images larger than this many pixels (decompression bombs)
+MAX_IMAGE_PIXELS = 50_000_000
+
+
+class ImageTooLarge(ValueError):
+    """Raised for images with more than MAX_IMAGE_PIXELS pixels."""
+
+
+# Errors that retrying cannot fix: recorded on the message instead.
+# Anything else (I/O, database) is treated as transient and retried.
+if Image is None:
+    PERMANENT_ERRORS = (ImageTooLarge,)
+else:
+    PERMANENT_ERRORS = (ImageTooLarge, UnidentifiedImageError, Image.DecompressionBombError)
+
+
+def image_kind(filename):
+    """Return 'jpg' or 'png' for image attachments, otherwise None."""
+    if not filename or '.' not in filename:
+        return None
+    kind = EXTENSION_TYPES.get(filename.rsplit('.', 1)[1].lower())
+    return kind if kind in IMAGE_FORMATS else None
+
+
+def derived_path(upload_folder, sha256, variant, kind):
+    """Return the path of a derived file (``derived/ab/cd/<sha256>.<variant>.<ext>``)."""
+    extension = IMAGE_FORMATS[kind][1]
+    return os.path.join(
+        upload_folder, DERIVED_DIR, sha256[:2], sha256[2:4], f'{sha256}.{variant}.{extension}'
+    )
+
+
+def _save_atomic(image, path, image_format, **options):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.derived-', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, image_format, **options)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _image_info(path):
+    with Image.open(path) as image:
+        width, height = image.size
+    return {'width': width, 'height': height, 'size': os.path.getsize(path)}
+
+
+def build_derivatives(upload_folder, sha256, kind, max_size=320, quality=85):
+    """
+    Write the thumbnail and metadata-free copy of an image blob.
+
+    Files that already exist are kept, so calling this again for the
+    same blob only reads their dimensions.
+
+    Args:
+        upload_folder: Upload folder (root of the blob store)
+        sha256: Blob hash
+        kind: 'jpg' or 'png'
+        max_size: Longest thumbnail side in pixels
+        quality: JPEG thumbnail quality
+
+    Returns:
+        Dict with the original's width, height and size plus 'thumbnail'
+        and 'clean' dicts (path relative to upload_folder, width, height, size)
+    """
+    if Image is None:
+        raise RuntimeError('Pillow is not installed')
+
+    image_format = IMAGE_FORMATS[kind][0]
+    source = blob_path(upload_folder, sha256)
+    thumb_path = derived_path(upload_folder, sha256, 'thumb', kind)
+    clean_path = derived_path(upload_folder, sha256, 'clean', kind)
+
+    with Image.open(source) as image:
+        if image.width * image.height > MAX_IMAGE_PIXELS:
+            raise ImageTooLarge(f'Image too large ({image.width}x{image.height})')
+        info = {'width': image.width, 'height': image.height, 'size': os.path.getsize(source)}
+
+        if os.path.exists(clean_path) and os.path.exists(thumb_path):
+            oriented = None
+        else:
+            # Apply the EXIF orientation before it is discarded, so both
+            # derivatives display the same way the original did
+            oriented = ImageOps.exif_transpose(image)
+
+        if not os.path.exists(clean_path):
+            # Re-encode pixels only: drops EXIF (GPS, camera), comments and text
+            # chunks but keeps the colour profile. JPEG sources keep their
+            # quantization tables and subsampling to avoid extra loss.
+            options = {'icc_profile': image.info.get('icc_profile')}
+            if image_format == 'JPEG' and image.format == 'JPEG':
+                options['qtables'] = image.quantization
+                options['subsampling'] = JpegImagePlugin.get_sampling(image)
+            elif image_format == 'JPEG':
+                options['quality'] = 95
+            else:
+                options['optimize'] = True
+            _save_atomic(oriented, clean_path, image_format, **options)
+
+        if not os.path.exists(thumb_path):
+            thumbnail = oriented.copy()
+            thumbnail.thumbnail((max_size, max_size))
+            if image_format == 'JPEG' and thumbnail.mode not in ('RGB', 'L'):
+                thumbnail = thumbnail.convert('RGB')
+            options = {'quality': quality, 'optimize': True} if image_format == 'JPEG' else {'optimize': True}
+            _save_atomic(thumbnail, thumb_path, image_format, **options)
+
+    for variant, path in (('thumbnail', thumb_path), ('clean', clean_path)):
+        info[variant] = dict(_image_info(path), path=os.path.relpath(path, upload_folder))
+    return info
+
+
+class ImageProcessor:
+    """
+    Thread pool that builds derived images and records them on messages.
+
+    Args:
+        app: Flask application (jobs run in its app context)
+        workers: Images processed concurrently
+        max_pending: Jobs allowed to wait; more are dropped (and can be
+            picked up later with ``flask process-attachments``)
+        max_size: Longest thumbnail side in pixels
+        max_retries: Extra attempts for a failing job
+        backoff: Seconds before the first retry (doubled each time)
+    """
+
+    def __init__(self, app, workers=2, max_pending=32, max_size=320, max_retries=2, backoff=1.0):
+        self.app = app
+        self.max_pending = max_pending
+        self.max_size = max_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-worker')
+        self._lock = threading.Lock()
+        self._inflight = set()
+        self._closed = False
+
+    def submit(self, message_id, filename, sha256):
+        """
+        Queue an attachment for processing if it is an image.
+
+        Returns:
+            True if queued (or already queued), False otherwise
+        """
+        kind = image_kind(filename)
+        if kind is None or Image is None or self._closed:
+            return False
+        key = (str(message_id), sha256)
+        with self._lock:
+            if key in self._inflight:
+                return True
+            if len(self._inflight) >= self.max_pending:
+                self.app.logger.warning(f'Image queue full, skipping attachment of message {message_id}')
+                return False
+            self._inflight.add(key)
+        self._executor.submit(self._run, key, message_id, sha256, kind)
+        return True
+
+    def flush(self, timeout=None):
+        """
+        Block until every queued job has finished.
+
+        Returns:
+            True if the queue drained within the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._inflight:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs and wait for running ones."""
+        self._closed = True
+        self._executor.shutdown(wait=wait)
+
+    def process(self, message_id, sha256, kind):
+        """Build derived images for one message and record them (idempotent)."""
+        from models import ContactMessage
+
+        upload_folder = self.app.config.get('UPLOAD_FOLDER', './uploads')
+        info = build_derivatives(upload_folder, sha256, kind, self.max_size)
+        ContactMessage.set_image_info(self.app.db, message_id, info)
+        return info
+
+    def _run(self, key, message_id, sha256, kind):
+        from models import ContactMessage
+
+        try:
+            with self.app.app_context():
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        self.process(message_id, sha256, kind)
+                        return
+                    except PERMANENT_ERRORS as e:
+                        # Unreadable or oversized image: retrying will not help
+                        self.app.logger.warning(f'Cannot process attachment of message {message_id}: {e}')
+                        ContactMessage.set_image_error(self.app.db, message_id, str(e))
+                        return
+                    except Exception as e:
+                        # Left unprocessed after the last attempt, for flask process-attachments
+                        self.app.logger.error(f'Image worker error (attempt {attempt + 1}): {e}')
+                        if attempt < self.max_retries:
+                            time.sleep(self.backoff * (2 ** attempt))
+        finally:
+            with self._lock:
+                self._inflight.discard(key)
+
+
+def init_images(app):
+    """
+    Start the image worker pool and add ``flask process-attachments``.
+
+    The pool is stored in ``app.extensions['images']``. Does nothing
+    (beyond the command) if ``IMAGE_WORKERS`` is 0 or Pillow is missing.
+    """
+    app.cli.add_command(process_attachments_command)
+
+    if not app.config.get('IMAGE_WORKERS'):
+        return None
+    if Image is None:
+        app.logger.warning('Pillow is not installed; attachment thumbnails disabled')
+        return None
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    processor = ImageProcessor(
+        app,
+        workers=app.config['IMAGE_WORKERS'],
+        max_pending=app.config.get('IMAGE_QUEUE_SIZE', 32),
+        max_size=app.config.get('THUMBNAIL_MAX_SIZE', 320)
+    )
+    app.extensions['images'] = processor
+    atexit.register(processor.shutdown)
+    return processor
+
+
+@click.command('process-attachments')
+@click.option('--limit', default=500, show_default=True, help='Messages to process.')
+@with_appcontext
+def process_attachments_command(limit):
+    """Build thumbnails for image attachments that have not been processed."""
+    from models import ContactMessage
+
+    if Image is None:
+        raise click.ClickException('Pillow is not installed')
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    upload_folder = current_app.config.get('UPLOAD_FOLDER', './uploads')
+    max_size = current_app.config.get('THUMBNAIL_MAX_SIZE', 320)
+    done = failed = 0
+    for message in ContactMessage.get_unprocessed_images(current_app.db, limit):
+        kind = image_kind(message.get('filename'))
+        if kind is None:
+            continue
+        try:
+            info = build_derivatives(upload_folder, message['attachment_sha256'], kind, max_size)
+            ContactMessage.set_image_info(current_app.db, message['_id'], info)
+            done += 1
+        except PERMANENT_ERRORS as e:
+            ContactMessage.set_image_error(current_app.db, message['_id'], str(e))
+            failed += 1
+            click.echo(f'{message["_id"]}: {e}', err=True)
+        except Exception as e:
+            # Transient: left unprocessed for the next run
+            click.echo(f'{message["_id"]}: {e}', err=True)
+    click.echo(f'Processed {done} attachments, {failed} failed')
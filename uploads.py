@@ -0,0 +1,347 @@
+"""
+Streaming file uploads.
+
+Werkzeug normally spools each uploaded file into memory (or a temporary
+file) before the view runs, and ``FileStorage.save`` then copies it
+again. ``StreamingRequest`` instead hands the multipart parser an
+``UploadStream``: a temporary file inside ``UPLOAD_FOLDER`` that is
+written chunk by chunk as the body arrives, hashed with SHA-256 on the
+way, and rejected with a 413 the moment it grows past the limit. The
+first ``filetypes.SNIFF_BYTES`` are kept so the real file type can be
+checked against the extension without reading the file again.
+Saving is then an atomic rename, and uploads that are never saved are
+deleted when the request ends.
+
+Saved files are content-addressed: each is stored once as
+``<UPLOAD_FOLDER>/ab/cd/<sha256>`` and contact messages reference it by
+hash, so a duplicate upload costs no disk space. Files derived from a
+blob (thumbnails) live under ``<UPLOAD_FOLDER>/derived/ab/cd/`` and are
+named ``<sha256>.<variant>``. ``flask gc-uploads`` deletes blobs no
+message references, along with their derived files.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import time
+from collections import namedtuple
+
+import click
+from flask import Request, current_app
+from flask.cli import with_appcontext
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from filetypes import SNIFF_BYTES, content_matches
+
+
+# Bytes read from a non-streamed upload per write
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Unreferenced blobs and abandoned temp files younger than this are kept,
+# so uploads whose message has not been inserted yet are never collected
+DEFAULT_GC_GRACE = 3600
+
+# Subdirectory (same ab/cd layout) for files derived from blobs
+DERIVED_DIR = 'derived'
+
+StoredUpload = namedtuple('StoredUpload', ['filename', 'sha256', 'size', 'deduplicated'])
+
+_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadStream:
+    """
+    Writable, readable temporary file that hashes and size-checks uploads.
+
+    Args:
+        directory: Directory for the temporary file (the final upload
+            folder, so saving is a rename on the same filesystem)
+        max_bytes: Maximum upload size; None for no limit
+        filename: Client file name, used by ``content_matches``
+    """
+
+    def __init__(self, directory, max_bytes=None, filename=None):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix='.upload-', suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self._sha256 = hashlib.sha256()
+        self.max_bytes = max_bytes
+        self.filename = filename
+        self.size = 0
+        self.saved_path = None
+        self._head = bytearray()
+
+    def write(self, data):
+        """Append a chunk, aborting with 413 once ``max_bytes`` is exceeded."""
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            self.discard()
+            raise RequestEntityTooLarge(f'Upload exceeds {self.max_bytes} bytes')
+        self._sha256.update(data)
+        if len(self._head) < SNIFF_BYTES:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+        return self._file.write(data)
+
+    @property
+    def head(self):
+        """The first SNIFF_BYTES bytes written (fewer for small files)."""
+        return bytes(self._head)
+
+    def content_matches(self, filename=None):
+        """Check the sniffed file type against the extension of ``filename``."""
+        return content_matches(
+            filename or self.filename or '', self.head, complete=self.size <= SNIFF_BYTES
+        )
+
+    @property
+    def sha256(self):
+        """Hex SHA-256 of everything written so far."""
+        return self._sha256.hexdigest()
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    def save(self, destination):
+        """
+        Atomically move the upload to ``destination``.
+
+        Args:
+            destination: Final path (in the same directory tree)
+
+        Returns:
+            The destination path
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.path, destination)
+        self.saved_path = destination
+        return destination
+
+    def discard(self):
+        """Close and delete the temporary file (unless it was saved)."""
+        if not self._file.closed:
+            self._file.close()
+        if self.saved_path is None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    # Werkzeug closes request files when the request ends
+    close = discard
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def __del__(self):
+        # Uploads abandoned by a failed parse are never closed by the request
+        try:
+            self.discard()
+        except Exception:
+            pass
+
+
+def upload_stream(file_storage, directory, max_bytes=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Return an UploadStream holding this upload's contents.
+
+    Streamed uploads (parsed by StreamingRequest into ``directory``) are
+    returned as-is. Anything else is copied in ``chunk_size`` chunks, so
+    memory use stays constant either way.
+
+    Args:
+        file_storage: FileStorage from request.files
+        directory: Upload folder
+        max_bytes: Maximum upload size; None for no limit
+        chunk_size: Bytes copied per chunk for non-streamed uploads
+
+    Returns:
+        UploadStream (raises RequestEntityTooLarge if over ``max_bytes``)
+    """
+    stream = file_storage.stream
+    if isinstance(stream, UploadStream) and \
+            os.path.dirname(stream.path) == os.path.abspath(directory):
+        return stream
+
+    upload = UploadStream(directory, max_bytes, file_storage.filename)
+    stream.seek(0)
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        upload.write(chunk)
+    upload.flush()
+    return upload
+
+
+def blob_path(upload_folder, sha256):
+    """Return the path of the blob with this hash (``ab/cd/<sha256>``)."""
+    return os.path.join(upload_folder, sha256[:2], sha256[2:4], sha256)
+
+
+def store_blob(upload, upload_folder):
+    """
+    Move an upload into the content-addressed store.
+
+    If a blob with the same hash already exists the upload is discarded
+    and the existing blob's mtime refreshed (protecting it from a
+    concurrent garbage collection).
+
+    Args:
+        upload: UploadStream holding the complete file
+        upload_folder: Upload folder (root of the blob store)
+
+    Returns:
+        (sha256, deduplicated)
+    """
+    sha256 = upload.sha256
+    path = blob_path(upload_folder, sha256)
+    if os.path.exists(path):
+        try:
+            os.utime(path)
+            upload.discard()
+            return sha256, True
+        except FileNotFoundError:
+            # Collected in the meantime - store this copy instead
+            pass
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    upload.save(path)
+    return sha256, False
+
+
+def iter_blobs(upload_folder, derived=False):
+    """
+    Yield (sha256, path) for every blob in the store.
+
+    With ``derived=True``, yield the files derived from blobs instead.
+    """
+    root = os.path.join(upload_folder, DERIVED_DIR) if derived else upload_folder
+    for first in _hex_dirs(root, 2):
+        for second in _hex_dirs(os.path.join(root, first), 2):
+            directory = os.path.join(root, first, second)
+            for name in os.listdir(directory):
+                sha256 = name.split('.', 1)[0] if derived else name
+                if _SHA256_RE.match(sha256) and sha256.startswith(first + second):
+                    yield sha256, os.path.join(directory, name)
+
+
+def _hex_dirs(directory, length):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(
+        name for name in names
+        if len(name) == length and all(c in '0123456789abcdef' for c in name)
+        and os.path.isdir(os.path.join(directory, name))
+    )
+
+
+def collect_garbage(upload_folder, referenced, grace=DEFAULT_GC_GRACE, dry_run=False):
+    """
+    Delete unreferenced blobs (and their derived files) and abandoned
+    temporary upload files.
+
+    Args:
+        upload_folder: Upload folder (root of the blob store)
+        referenced: Set of blob hashes still in use
+        grace: Keep anything modified within this many seconds
+        dry_run: Only report what would be deleted
+
+    Returns:
+        (files removed, bytes freed)
+    """
+    cutoff = time.time() - grace
+    removed = 0
+    freed = 0
+
+    candidates = [path for sha256, path in iter_blobs(upload_folder) if sha256 not in referenced]
+    candidates.extend(
+        path for sha256, path in iter_blobs(upload_folder, derived=True) if sha256 not in referenced
+    )
+    if os.path.isdir(upload_folder):
+        candidates.extend(
+            os.path.join(upload_folder, name) for name in os.listdir(upload_folder)
+            if name.startswith('.upload-') and name.endswith('.part')
+        )
+
+    for path in candidates:
+        try:
+            stat = os.stat(path)
+            if stat.st_mtime > cutoff:
+                continue
+            if not dry_run:
+                os.unlink(path)
+        except FileNotFoundError:
+            continue
+        removed += 1
+        freed += stat.st_size
+
+    if not dry_run:
+        _remove_empty_shards(upload_folder)
+        _remove_empty_shards(os.path.join(upload_folder, DERIVED_DIR))
+    return removed, freed
+
+
+def _remove_empty_shards(root):
+    for first in _hex_dirs(root, 2):
+        for second in _hex_dirs(os.path.join(root, first), 2):
+            try:
+                os.rmdir(os.path.join(root, first, second))
+            except OSError:
+                pass
+        try:
+            os.rmdir(os.path.join(root, first))
+        except OSError:
+            pass
+
+
+@click.command('gc-uploads')
+@click.option('--grace', default=DEFAULT_GC_GRACE, show_default=True,
+              help='Keep files modified within this many seconds.')
+@click.option('--dry-run', is_flag=True, help='Report without deleting.')
+@with_appcontext
+def gc_uploads_command(grace, dry_run):
+    """Delete upload blobs that no contact message references."""
+    from models import ContactMessage
+
+    referenced = ContactMessage.attachment_hashes(current_app.db)
+    upload_folder = current_app.config.get('UPLOAD_FOLDER', './uploads')
+    removed, freed = collect_garbage(upload_folder, referenced, grace, dry_run)
+    action = 'Would remove' if dry_run else 'Removed'
+    click.echo(f'{action} {removed} files ({freed} bytes); {len(referenced)} blobs referenced')
+
+
+class StreamingRequest(Request):
+    """Request class that streams uploaded files straight into ``UPLOAD_FOLDER``."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        config = current_app.config
+        directory = os.path.abspath(config.get('UPLOAD_FOLDER', './uploads'))
+        try:
+            return UploadStream(directory, config.get('UPLOAD_MAX_SIZE'), filename)
+        except OSError as e:
+            current_app.logger.warning(f"Upload streaming unavailable: {str(e)}")
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
+def init_uploads(app):
+    """Parse uploaded files with StreamingRequest and add ``flask gc-uploads``."""
+    app.request_class = StreamingRequest
+    app.cli.add_command(gc_uploads_command)
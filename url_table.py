@@ -0,0 +1,55 @@
+"""
+Precomputed URLs for argument-free endpoints.
+
+``url_for('main.home')`` in a template normally goes through Werkzeug's
+URL adapter on every call. Routes without arguments always build the
+same path, so they are built once after blueprints are registered and the
+template ``url_for`` becomes a dictionary lookup for them. Anything else
+(route arguments, query values, ``_external``, ``_anchor``, URL default
+functions) falls back to the real ``url_for``.
+"""
+
+from flask import has_request_context, request
+
+
+def build_url_table(app):
+    """
+    Build ``{endpoint: path}`` for every route that takes no arguments.
+
+    Endpoints of blueprints with URL default functions are skipped because
+    those functions may add values at call time.
+    """
+    adapter = app.url_map.bind('localhost')
+    has_defaults = set(app.url_default_functions)
+    table = {}
+
+    for rule in app.url_map.iter_rules():
+        if rule.arguments or rule.endpoint in table:
+            continue
+        blueprint = rule.endpoint.rpartition('.')[0] or None
+        if None in has_defaults or blueprint in has_defaults:
+            continue
+        table[rule.endpoint] = adapter.build(rule.endpoint, {})
+    return table
+
+
+def init_url_table(app):
+    """
+    Replace the template ``url_for`` with a table-backed version.
+
+    Must run after all blueprints are registered (and after any other
+    override of the template ``url_for``, which becomes the fallback).
+    """
+    table = build_url_table(app)
+    fallback = app.jinja_env.globals['url_for']
+
+    def url_for(endpoint, **values):
+        if not values and has_request_context():
+            path = table.get(endpoint)
+            if path is not None:
+                return request.script_root + path
+        return fallback(endpoint, **values)
+
+    app.jinja_env.globals['url_for'] = url_for
+    app.extensions['url_table'] = table
+    return table
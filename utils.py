@@ -8,10 +8,17 @@ from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
 
 
+class UploadRejected(ValueError):
+    """Raised when an uploaded file's type or content is not accepted."""
+
+
 def send_email(to_email, subject, body, html_body=None):
     """
     Send email via SMTP or log to file if SMTP not configured.
     
+    When the background mail queue is running the message is only
+    enqueued and delivered by a worker thread; otherwise it is sent inline.
+    
     Args:
         to_email: Recipient email address
         subject: Email subject
@@ -24,29 +31,24 @@ def send_email(to_email, subject, body, html_body=None):
     
     # If SMTP is configured, send actual email
     if smtp_host:
+        mailer = current_app.extensions.get('mailer')
+        if mailer is not None:
+            if mailer.enqueue(to_email, subject, body, html_body):
+                return True
+            # Queue full - fall back to logging
+            log_email_to_file(to_email, subject, body, html_body)
+            return True
+        
         try:
             import smtplib
-            from email.mime.text import MIMEText
-            from email.mime.multipart import MIMEMultipart
+            from mailer import build_message
             
             smtp_port = current_app.config.get('SMTP_PORT', 587)
             smtp_user = current_app.config.get('SMTP_USER')
             smtp_pass = current_app.config.get('SMTP_PASS')
             smtp_from = current_app.config.get('SMTP_FROM', 'noreply@ecoreborn.example')
             
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = smtp_from
-            msg['To'] = to_email
-            
-            # Attach plain text
-            part1 = MIMEText(body, 'plain')
-            msg.attach(part1)
-            
-            # Attach HTML if provided
-            if html_body:
-                part2 = MIMEText(html_body, 'html')
-                msg.attach(part2)
+            msg = build_message(smtp_from, to_email, subject, body, html_body)
             
             # Send email
             with smtplib.SMTP(smtp_host, smtp_port) as server:
@@ -115,39 +117,49 @@ def allowed_file(filename, allowed_extensions=None):
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
 
-def save_uploaded_file(file_storage, upload_folder):
+def save_uploaded_file(file_storage, upload_folder, max_bytes=None):
     """
-    Save uploaded file securely.
+    Save uploaded file securely in the content-addressed upload store.
+    
+    The file is written in fixed-size chunks to a temporary file in
+    ``upload_folder`` (already done during parsing for requests handled
+    by uploads.StreamingRequest) and renamed to ``ab/cd/<sha256>``, so
+    memory use does not depend on the upload size. An identical file
+    that is already stored is reused instead of written again.
     
     Args:
         file_storage: FileStorage object from request.files
         upload_folder: Directory to save files
+        max_bytes: Maximum file size (RequestEntityTooLarge if exceeded)
     
     Returns:
-        Filename if successful, None otherwise
+        uploads.StoredUpload (display filename, sha256, size, deduplicated),
+        or None if no file was uploaded
+    
+    Raises:
+        UploadRejected: If the extension is not allowed or the file's
+            leading bytes do not match it
     """
     if not file_storage or file_storage.filename == '':
         return None
     
     if not allowed_file(file_storage.filename):
-        return None
+        raise UploadRejected('This file type is not allowed.')
     
-    # Secure the filename
+    # Secure the filename (kept for display; storage is by hash)
     filename = secure_filename(file_storage.filename)
     
-    # Add timestamp to prevent collisions
-    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-    name, ext = os.path.splitext(filename)
-    filename = f"{name}_{timestamp}{ext}"
+    from uploads import StoredUpload, store_blob, upload_stream
+    upload = upload_stream(file_storage, upload_folder, max_bytes)
     
-    # Ensure upload directory exists
-    os.makedirs(upload_folder, exist_ok=True)
+    # Reject files whose content does not match their extension
+    if not upload.content_matches(filename):
+        upload.discard()
+        raise UploadRejected('File content does not match its extension.')
     
-    # Save file
-    filepath = os.path.join(upload_folder, filename)
-    file_storage.save(filepath)
+    sha256, deduplicated = store_blob(upload, upload_folder)
     
-    return filename
+    return StoredUpload(filename, sha256, upload.size, deduplicated)
 
 
 def sanitize_filename(filename):
@@ -172,31 +184,6 @@ def get_client_ip(request):
         return request.remote_addr
 
 
-def generate_sitemap_xml(base_url, routes):
-    """
-    Generate sitemap.xml content.
-    
-    Args:
-        base_url: Base URL of the site
-        routes: List of tuples (path, priority, changefreq)
-    
-    Returns:
-        XML string
-    """
-    xml = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    xml += '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-    
-    for path, priority, changefreq in routes:
-        xml += '  <url>\n'
-        xml += f'    <loc>{base_url}{path}</loc>\n'
-        xml += f'    <priority>{priority}</priority>\n'
-        xml += f'    <changefreq>{changefreq}</changefreq>\n'
-        xml += '  </url>\n'
-    
-    xml += '</urlset>'
-    return xml
-
-
 def create_password_reset_email(reset_url, user_name):
     """Create password reset email content."""
     subject = "Password Reset Request - Ecoreborn"